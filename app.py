@@ -1,15 +1,103 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
 
-from main import history_question, math_question, generate_quizzes
-from models import HistoryTestCases, HistoryTestCase, MathTestCase
+from typing import Optional
+import math
+
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from dotenv import load_dotenv
+
+# Load .env before the modules below read their settings
+load_dotenv()
+
+from main import (
+    estimate_request_tokens,
+    history_question,
+    history_question_stream,
+    math_question,
+    generate_quizzes,
+    generate_quizzes_stream,
+)
+from models import (
+    CombinedQuizzesResponse,
+    HistoryQuizzesResponse,
+    HistoryTestCases,
+    HistoryTestCase,
+    JobRequest,
+    MathQuizResponse,
+    MathTestCase,
+)
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from cache import get_cache
+from cascade import get_model_cascade
+from dedup import get_deduplicator
+from hedging import get_hedging_policy
+from jobs import get_job_runner
+from metrics import collect_stats, register_stats
+from model_router import get_model_router
+from quiz_generator import GENERATOR_TYPES, get_generator
+from quiz_pool import MATH_KEY, get_quiz_pool, history_key
+from quiz_store import QuizFilter, get_quiz_store
+from scheduler import SchedulerOverloaded, get_scheduler
+from singleflight import get_single_flight
+from streaming import MEDIA_TYPES, StreamFormat, encode_stream
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build the model client, the shared quiz generators and their chains before serving
+    requests, keep quizzes for the default topics pre-generated and run quiz jobs while
+    the server runs.
+    """
+    for name in GENERATOR_TYPES:
+        get_generator(name)
+    pool = get_quiz_pool()
+    if pool is not None:
+        pool.start([history_key(case.content, case.keywords) for case in HistoryTestCases().cases] + [MATH_KEY])
+    runner = get_job_runner()
+    if runner is not None:
+        runner.start()  # Resumes the items a previous run left pending
+    yield
+    if runner is not None:
+        await runner.stop()
+    if pool is not None:
+        await pool.stop()
+    store = get_quiz_store()
+    if store is not None:
+        store.close()
+
+# Publish the component counters alongside the stage histograms on /metrics
+register_stats("quiz_cache", lambda: {"shared": get_cache().stats()} if get_cache() is not None else {})
+register_stats("quiz_coalescing", lambda: {"shared": get_single_flight().stats()})
+register_stats("quiz_verification", lambda: {"math": get_generator("math").verifier.stats()})
+register_stats("quiz_dedup", lambda: {"shared": get_deduplicator().stats()})
+register_stats("llm_hedging", lambda: {"shared": get_hedging_policy().stats()} if get_hedging_policy() is not None else {})
+register_stats("llm_cascade", lambda: {"shared": get_model_cascade().stats()} if get_model_cascade() is not None else {})
+register_stats("quiz_repair", lambda: {name: get_generator(name).repairer.stats() for name in GENERATOR_TYPES})
+register_stats("quiz_planner", lambda: {name: get_generator(name).planner.stats() for name in GENERATOR_TYPES})
+register_stats("llm_deployments", lambda: get_model_router().stats() if get_model_router() is not None else {})
+register_stats("quiz_scheduler", lambda: {"shared": get_scheduler().stats()} if get_scheduler() is not None else {})
+register_stats("quiz_jobs", lambda: {"shared": get_job_runner().stats()} if get_job_runner() is not None else {})
+register_stats("quiz_pool", lambda: {"shared": get_quiz_pool().stats()} if get_quiz_pool() is not None else {})
+register_stats("quiz_store", lambda: {"shared": get_quiz_store().stats()} if get_quiz_store() is not None else {})
 
 app = FastAPI(
     title="Quiz Generation API",
     description="An API for generating history and math quizzes based on provided test cases.",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+def respond(response: BaseModel) -> ORJSONResponse:
+    """
+    Encode an already validated response model with orjson, skipping FastAPI's second validation pass.
+    """
+    return ORJSONResponse(content=response.model_dump(mode="json"))
+
 async def handle_request(func, *args, **kwargs):
     """
     Handle requests and catch exceptions.
@@ -22,47 +110,66 @@ async def handle_request(func, *args, **kwargs):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/generate/history/", response_model=dict, 
+async def admit(tokens: int, priority: Optional[str]) -> None:
+    """
+    Wait for the request's turn under the tokens-per-minute budget.
+
+    Raises:
+        HTTPException: 429 with a Retry-After header if the budget cannot admit the request soon enough.
+    """
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return
+    try:
+        await scheduler.acquire(tokens, scheduler.classify(tokens, priority))
+    except SchedulerOverloaded as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+
+# Lets callers mark their requests as "interactive" or "bulk"; expensive requests default to bulk
+PriorityHeader = Header(None, alias="X-Priority", description="\"interactive\" or \"bulk\"; requests with a large estimated token cost default to bulk.")
+
+@app.post("/generate/history/", response_model=HistoryQuizzesResponse,
           description="Generate history quizzes based on provided test cases.")
-async def generate_history_quizzes(test_cases: HistoryTestCases):
+async def generate_history_quizzes(test_cases: HistoryTestCases, priority: Optional[str] = PriorityHeader):
     """
     Generate history quizzes based on provided test cases.
 
     Args:
         test_cases (HistoryTestCases): A collection of history test cases.
+        priority (Optional[str]): The X-Priority header.
 
     Returns:
-        JSONResponse: A response containing the generated history quizzes.
+        ORJSONResponse: A response containing the generated history quizzes.
     """
     history_test_cases = [test_case.dict() for test_case in test_cases.cases]
+    await admit(sum(estimate_request_tokens("history", test_case) for test_case in history_test_cases), priority)
     quizzes = await handle_request(history_question, history_test_cases)
-    return JSONResponse(content={"quizzes": quizzes})
+    return respond(HistoryQuizzesResponse(quizzes=quizzes))
 
-@app.post("/generate/math/", response_model=dict, 
-          description="Generate a math quiz based on the provided test case.")
-def generate_math_quiz(test_case: MathTestCase):
+@app.post("/generate/math/", response_model=MathQuizResponse,
+          description="Generate a math quiz based on the provided test case. Set mode to \"local\" to build it without an LLM call.")
+async def generate_math_quiz(test_case: MathTestCase, priority: Optional[str] = PriorityHeader):
     """
     Generate a math quiz based on the provided test case.
 
     Args:
         test_case (MathTestCase): A single math test case.
+        priority (Optional[str]): The X-Priority header.
 
     Returns:
-        JSONResponse: A response containing the generated math quiz.
+        ORJSONResponse: A response containing the generated math quiz.
     """
-    try:
-        quiz_result = math_question(test_case.dict())
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    return JSONResponse(content={"quiz": quiz_result})
+    await admit(estimate_request_tokens("math", test_case.dict()), priority)
+    quiz_result = await handle_request(math_question, test_case.dict())
+    return respond(MathQuizResponse(quiz=quiz_result))
 
-@app.post("/generate/quizzes/", response_model=dict, 
+@app.post("/generate/quizzes/", response_model=CombinedQuizzesResponse,
           description="Generate both history and math quizzes based on the provided test cases.")
 async def generate_quizzes_endpoint(
     history_test_case: HistoryTestCase, 
     math_test_case: MathTestCase, 
-    num_quizzes: int = 3
+    num_quizzes: int = 3,
+    priority: Optional[str] = PriorityHeader,
 ):
     """
     Generate both history and math quizzes based on the provided test cases.
@@ -71,17 +178,225 @@ async def generate_quizzes_endpoint(
         history_test_case (HistoryTestCase): The test case for the history quiz.
         math_test_case (MathTestCase): The test case for the math quiz.
         num_quizzes (int): The number of quizzes to generate for each subject (default is 3).
+        priority (Optional[str]): The X-Priority header.
 
     Returns:
-        JSONResponse: A response containing the generated history and math quizzes.
+        ORJSONResponse: A response containing the generated history and math quizzes.
     """
+    await admit(
+        estimate_request_tokens("history", history_test_case.dict(), num_quizzes)
+        + estimate_request_tokens("math", math_test_case.dict(), num_quizzes),
+        priority,
+    )
     history_quiz_result, math_quiz_result = await handle_request(
         generate_quizzes,
         history_test_case.dict(),
         math_test_case.dict(),
         num_quizzes
     )
-    return JSONResponse(content={
-        "history_quiz": history_quiz_result,
-        "math_quiz": math_quiz_result
-    })
+    return respond(CombinedQuizzesResponse(history_quiz=history_quiz_result, math_quiz=math_quiz_result))
+
+@app.post("/generate/history/stream/",
+          description="Stream history quizzes as NDJSON or server-sent events, one event per test case as soon as it completes.")
+async def stream_history_quizzes(
+    test_cases: HistoryTestCases,
+    format: StreamFormat = "ndjson",
+    priority: Optional[str] = PriorityHeader,
+):
+    """
+    Stream history quizzes based on provided test cases.
+
+    Args:
+        test_cases (HistoryTestCases): A collection of history test cases.
+        format (StreamFormat): "ndjson" (default) or "sse".
+        priority (Optional[str]): The X-Priority header.
+
+    Returns:
+        StreamingResponse: One {"index", "quiz"} event per test case, in completion order.
+    """
+    history_test_cases = [test_case.dict() for test_case in test_cases.cases]
+    await admit(sum(estimate_request_tokens("history", test_case) for test_case in history_test_cases), priority)
+
+    async def events():
+        async for index, quiz in history_question_stream(history_test_cases):
+            yield {"index": index, "quiz": quiz}
+
+    return StreamingResponse(encode_stream(events(), format), media_type=MEDIA_TYPES[format])
+
+@app.post("/generate/quizzes/stream/",
+          description="Stream history and math quizzes as NDJSON or server-sent events, one event per quiz as soon as it is complete.")
+async def stream_quizzes(
+    history_test_case: HistoryTestCase,
+    math_test_case: MathTestCase,
+    num_quizzes: int = 3,
+    format: StreamFormat = "ndjson",
+    priority: Optional[str] = PriorityHeader,
+):
+    """
+    Stream both history and math quizzes based on the provided test cases.
+
+    Args:
+        history_test_case (HistoryTestCase): The test case for the history quiz.
+        math_test_case (MathTestCase): The test case for the math quiz.
+        num_quizzes (int): The number of quizzes to generate for each subject (default is 3).
+        format (StreamFormat): "ndjson" (default) or "sse".
+        priority (Optional[str]): The X-Priority header.
+
+    Returns:
+        StreamingResponse: One {"subject", "quiz"} event per quiz, as soon as the model has finished it.
+    """
+    await admit(
+        estimate_request_tokens("history", history_test_case.dict(), num_quizzes)
+        + estimate_request_tokens("math", math_test_case.dict(), num_quizzes),
+        priority,
+    )
+    async def events():
+        async for subject, quiz in generate_quizzes_stream(
+            history_test_case.dict(), math_test_case.dict(), num_quizzes
+        ):
+            yield {"subject": subject, "quiz": quiz}
+
+    return StreamingResponse(encode_stream(events(), format), media_type=MEDIA_TYPES[format])
+
+def require_jobs():
+    """
+    Return the job runner, or raise a 404 if the job API is disabled.
+    """
+    runner = get_job_runner()
+    if runner is None:
+        raise HTTPException(status_code=404, detail="Quiz jobs are disabled (QUIZ_JOBS_ENABLED=false).")
+    return runner
+
+@app.post("/jobs/", response_model=dict, status_code=202,
+          description="Submit a large batch of history and math test cases as a background job; returns the job id at once.")
+def submit_job(job: JobRequest):
+    """
+    Queue one quiz per test case for background generation.
+
+    Args:
+        job (JobRequest): The history and math test cases.
+
+    Returns:
+        dict: The job id and its initial progress.
+    """
+    if not job.history_cases and not job.math_cases:
+        raise HTTPException(status_code=422, detail="A job needs at least one test case.")
+    return require_jobs().submit(
+        [test_case.dict() for test_case in job.history_cases],
+        [test_case.dict() for test_case in job.math_cases],
+    )
+
+@app.get("/jobs/{job_id}", response_model=dict,
+         description="Report a job's progress with the results finished so far. Pass the returned next_after as after to get only newer results.")
+def get_job(job_id: str, after: int = 0, limit: int = Query(100, ge=1, le=1000)):
+    """
+    Report the progress and partial results of a job.
+
+    Args:
+        job_id (str): The job id returned on submission.
+        after (int): Only results finished after this position in completion order.
+        limit (int): Maximum results returned.
+
+    Returns:
+        dict: The job's status and item counts, its finished items in completion order and next_after.
+    """
+    runner = require_jobs()
+    job = runner.store.job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    results = runner.store.results(job_id, after, limit)
+    next_after = results[-1]["seq"] if results else after
+    for result in results:
+        del result["seq"]
+    return {**job, "results": results, "next_after": next_after}
+
+@app.get("/jobs/{job_id}/stream",
+         description="Stream a job's results as NDJSON or server-sent events as they finish, followed by its final progress.")
+def stream_job(job_id: str, format: StreamFormat = "ndjson"):
+    """
+    Stream the results of a job, including the ones already finished.
+
+    Args:
+        job_id (str): The job id returned on submission.
+        format (StreamFormat): "ndjson" (default) or "sse".
+
+    Returns:
+        StreamingResponse: One {"index", "subject", "status", "quiz"} event per item in completion order,
+        then {"job": progress} once the job is complete.
+    """
+    runner = require_jobs()
+    if runner.store.job(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return StreamingResponse(encode_stream(runner.events(job_id), format), media_type=MEDIA_TYPES[format])
+
+def require_store():
+    """
+    Return the quiz store, or raise a 404 if storing quizzes is disabled.
+    """
+    store = get_quiz_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="The quiz store is disabled (QUIZ_STORE_ENABLED=false).")
+    return store
+
+@app.get("/quizzes/", response_model=dict,
+         description="Page through stored quizzes, newest first. Pass the returned next_cursor as cursor to get the next page.")
+def list_quizzes(
+    topic: Optional[str] = None,
+    keyword: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    generator: Optional[str] = None,
+    since: Optional[float] = Query(None, description="Only quizzes created at or after this Unix time."),
+    until: Optional[float] = Query(None, description="Only quizzes created before this Unix time."),
+    cursor: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=1000),
+):
+    """
+    Page through stored quizzes matching the given filters.
+
+    Returns:
+        dict: The stored quizzes of this page with their metadata, and the cursor of the next page (None on the last page).
+    """
+    filters = QuizFilter(topic, keyword, difficulty, generator, since, until)
+    quizzes, next_cursor = require_store().query(filters, cursor, limit)
+    return {"quizzes": quizzes, "next_cursor": next_cursor}
+
+@app.get("/quizzes/export",
+         description="Export all stored quizzes matching the filters as JSON Lines.")
+def export_quizzes(
+    topic: Optional[str] = None,
+    keyword: Optional[str] = None,
+    difficulty: Optional[str] = None,
+    generator: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+):
+    """
+    Stream every stored quiz matching the given filters for offline reuse.
+
+    Returns:
+        StreamingResponse: One stored quiz with its metadata per line, newest first.
+    """
+    filters = QuizFilter(topic, keyword, difficulty, generator, since, until)
+    return StreamingResponse(require_store().export(filters), media_type=MEDIA_TYPES["ndjson"])
+
+@app.get("/stats", response_model=dict,
+         description="Report the counters of every component, the same ones /metrics exports.")
+def stats():
+    """
+    Report the component counters for this worker.
+
+    Returns:
+        dict: Per component (e.g. "quiz_cache", "quiz_dedup", "llm_deployments"), its stats dict per
+        label value; a component that is disabled reports an empty dict.
+    """
+    return collect_stats()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Expose per-stage latency histograms, token counters and component counters in Prometheus format.
+
+    Returns:
+        Response: The Prometheus text exposition of this worker's metrics.
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,16 @@
+"""
+Offline benchmarks for the quiz generator.
+
+Run them from the repository root, e.g. ``python -m benchmarks.bench_chain_reuse``.
+"""
+import os
+
+# Generators created without a model build the shared AzureChatOpenAI client; give it placeholder
+# settings so the benchmarks can run without credentials. No request ever reaches Azure.
+for _name, _value in {
+    "LLM_MODEL_API_KEY": "benchmark",
+    "LLM_MODEL_API_VERSION": "2024-06-01",
+    "LLM_MODEL_ENDPOINT": "https://benchmark.invalid",
+    "LLM_MODEL_DEPLOYMENT": "benchmark",
+}.items():
+    os.environ.setdefault(_name, _value)
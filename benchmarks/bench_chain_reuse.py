@@ -0,0 +1,97 @@
+"""
+Micro-benchmark: per-request chain construction versus the precompiled, shared chains.
+
+The "legacy" path reproduces what every call used to do: create a new generator, run
+ChatPromptTemplate.from_template, pipe prompt | model | parser and regenerate the format
+instructions. The "registry" path reuses the generator from quiz_generator.get_generator.
+Both use a fake chat model so only the local CPU and allocation cost is measured.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import benchmarks  # noqa: F401  (placeholder Azure settings)
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+
+from prompts import HISTORY_SINGLE_QUIZ_PROMPT
+from quiz_generator import HistoryQuizGenerator, get_generator, set_generator
+
+SAMPLE_QUIZ = json.dumps({
+    "question": "Who posted the Ninety-five Theses in 1517?",
+    "options": [
+        {"content": "Martin Luther", "reason": "He posted them in Wittenberg.", "isCorrect": True},
+        {"content": "John Calvin", "reason": "Calvin was active later, in Geneva.", "isCorrect": False},
+        {"content": "Pope Leo X", "reason": "He was the pope Luther criticized.", "isCorrect": False},
+        {"content": "Henry VIII", "reason": "He broke with Rome for other reasons.", "isCorrect": False},
+    ],
+})
+
+TEST_CASE = {"content": "Reformation", "keywords": ["Martin Luther", "Roman Catholic Church"]}
+
+def legacy_request(model, invoke: bool):
+    """
+    Reproduce the pre-registry request path: new generator, new chain, new format instructions.
+    """
+    generator = HistoryQuizGenerator(llm_model=model)
+    prompt_template = ChatPromptTemplate.from_template(HISTORY_SINGLE_QUIZ_PROMPT)
+    chain = prompt_template | generator.azure_model | generator.quiz_parser
+    inputs = {**TEST_CASE, "format_instructions": generator.quiz_parser.get_format_instructions()}
+    if invoke:
+        chain.invoke(inputs)
+
+def registry_request(model, invoke: bool):
+    """
+    The current request path: reuse the shared generator and its compiled chain.
+    """
+    generator = get_generator("history")
+    if invoke:
+        generator.quiz_chain.invoke(TEST_CASE)
+
+def measure(func, model, iterations: int, invoke: bool) -> dict:
+    """
+    Run func repeatedly and return per-call wall time, CPU time and allocated bytes.
+    """
+    func(model, invoke)  # warm-up
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for _ in range(iterations):
+        func(model, invoke)
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(min(iterations, 200)):
+        func(model, invoke)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename") if stat.size_diff > 0)
+
+    return {
+        "wall_us": wall / iterations * 1e6,
+        "cpu_us": cpu / iterations * 1e6,
+        "alloc_bytes": allocated / min(iterations, 200),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args()
+
+    model = FakeListChatModel(responses=[SAMPLE_QUIZ])
+    set_generator("history", HistoryQuizGenerator(llm_model=model))
+
+    for invoke in (False, True):
+        label = "setup + invoke" if invoke else "setup only"
+        legacy = measure(legacy_request, model, args.iterations, invoke)
+        shared = measure(registry_request, model, args.iterations, invoke)
+        print(f"[{label}] per request over {args.iterations} iterations")
+        for key in ("wall_us", "cpu_us", "alloc_bytes"):
+            saved = legacy[key] - shared[key]
+            share = saved / legacy[key] * 100 if legacy[key] else 0.0
+            print(f"  {key:<12} legacy={legacy[key]:>12.1f}  registry={shared[key]:>12.1f}  saved={share:5.1f}%")
+
+if __name__ == "__main__":
+    main()
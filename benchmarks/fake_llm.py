@@ -0,0 +1,178 @@
+"""
+A fake chat model that stands in for Azure OpenAI in offline benchmarks.
+
+It answers the quiz prompts with schema-valid Quiz/Quizzes JSON and simulates the parts of a
+real deployment that matter for load testing: time to first token, a token throughput while
+streaming, transient API errors and occasionally malformed (truncated) JSON.
+"""
+from typing import Any, AsyncIterator, Iterator, List, Optional
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from math_engine import LocalMathQuizEngine
+from metrics import estimate_tokens
+
+# The full and compact templates ask to "Generate"/"Write {num_quizzes} different ..." when several are requested
+NUM_QUIZZES = re.compile(r"(?:enerate|Write) (\d+) different")
+CONTENT = re.compile(r'(?:Based on the following content|Content): "(.*?)"')
+
+# Vocabulary for the fake quiz wording
+WORDS = (
+    "treaty reform council army merchant crown rebellion charter harvest bishop navy province "
+    "tariff senate guild frontier dynasty railway printing press colony garrison parliament "
+    "famine alliance blockade pamphlet ministry assembly border envoy fortress coinage census "
+    "monastery canal uprising decree militia archive cathedral embargo"
+).split()
+
+
+class FakeLLMError(Exception):
+    """
+    A simulated transient API failure, e.g. a 429 or 500 from the deployment.
+    """
+
+
+class FakeQuizChatModel(BaseChatModel):
+    """
+    Chat model that generates quiz JSON locally with configurable latency and failure rates.
+
+    Latency is modelled as a log-normally distributed time to first token followed by a
+    steady token rate, so longer answers (more quizzes per call) take proportionally longer,
+    as they do against a real deployment.
+    """
+
+    ttft_ms: float = 300.0
+    """Median time to first token in milliseconds."""
+    ttft_sigma: float = 0.4
+    """Spread of the log-normal time to first token; 0 makes it constant."""
+    tokens_per_second: float = 400.0
+    """Completion token throughput while streaming."""
+    chunk_tokens: int = 8
+    """Tokens per streamed chunk."""
+    error_rate: float = 0.0
+    """Share of calls that fail with FakeLLMError."""
+    malformed_rate: float = 0.0
+    """Share of calls that return truncated, unparseable JSON."""
+    seed: Optional[int] = None
+    """Seed for reproducible latencies, failures and quizzes."""
+
+    _random: random.Random = PrivateAttr()
+    _math_engine: LocalMathQuizEngine = PrivateAttr()
+    _serial: Iterator[int] = PrivateAttr()
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._random = random.Random(self.seed)
+        self._math_engine = LocalMathQuizEngine(seed=self.seed)
+        self._serial = itertools.count(1)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-quiz"
+
+    def respond(self, messages: List[BaseMessage]) -> str:
+        """
+        Build the answer to a quiz prompt.
+
+        Args:
+            messages (List[BaseMessage]): The rendered prompt.
+
+        Returns:
+            str: Quiz JSON for a single-quiz prompt, Quizzes JSON for a multiple-quiz prompt,
+            truncated JSON at the configured malformed rate.
+
+        Raises:
+            FakeLLMError: At the configured error rate.
+        """
+        if self._random.random() < self.error_rate:
+            raise FakeLLMError("Simulated transient API error (429 Too Many Requests)")
+
+        prompt = "\n".join(str(message.content) for message in messages)
+        math = "mathematics education" in prompt or "math word problems" in prompt
+        match = NUM_QUIZZES.search(prompt)
+        if match:
+            quizzes = [self._quiz(prompt, math) for _ in range(int(match.group(1)))]
+            text = json.dumps({"quizzes": quizzes})
+        else:
+            text = json.dumps(self._quiz(prompt, math))
+
+        if self._random.random() < self.malformed_rate:
+            text = text[: self._random.randint(1, len(text) - 1)]
+        return text
+
+    def _quiz(self, prompt: str, math: bool) -> dict:
+        if math:
+            return self._math_engine.create_quiz()
+        match = CONTENT.search(prompt)
+        topic = match.group(1) if match else "history"
+        serial = next(self._serial)
+        correct = self._random.randrange(4)
+        return {
+            "question": f"Which statement about {self._phrase()} during {topic} is accurate? (variant {serial})",
+            "difficulty": self._random.choice(["easy", "medium", "hard"]),
+            "options": [
+                {
+                    "content": f"The {self._phrase()} shaped the {self._phrase()}",
+                    "reason": "This matches the historical record." if i == correct
+                    else "This contradicts the historical record.",
+                    "isCorrect": i == correct,
+                }
+                for i in range(4)
+            ],
+        }
+
+    def _phrase(self) -> str:
+        # Random wording keeps distinct fake quizzes from looking like near-duplicates
+        return " ".join(self._random.sample(WORDS, 2))
+
+    def _ttft(self) -> float:
+        return self.ttft_ms / 1000 * self._random.lognormvariate(0, self.ttft_sigma)
+
+    def _chunks(self, messages: List[BaseMessage]) -> Iterator[AIMessageChunk]:
+        """
+        Split the answer into chunks of chunk_tokens tokens; the last one carries the usage.
+        """
+        text = self.respond(messages)
+        step = self.chunk_tokens * 4  # estimate_tokens counts ~4 characters per token
+        pieces = [text[i:i + step] for i in range(0, len(text), step)]
+        prompt_tokens = estimate_tokens("".join(str(message.content) for message in messages))
+        completion_tokens = estimate_tokens(text)
+        for i, piece in enumerate(pieces):
+            usage = None
+            if i == len(pieces) - 1:
+                usage = {
+                    "input_tokens": prompt_tokens,
+                    "output_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                }
+            yield AIMessageChunk(content=piece, usage_metadata=usage)
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        text = "".join(chunk.message.content for chunk in self._stream(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        text = "".join([chunk.message.content async for chunk in self._astream(messages)])
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._ttft())
+        for i, chunk in enumerate(self._chunks(messages)):
+            if i:
+                time.sleep(self.chunk_tokens / self.tokens_per_second)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._ttft())
+        for i, chunk in enumerate(self._chunks(messages)):
+            if i:
+                await asyncio.sleep(self.chunk_tokens / self.tokens_per_second)
+            yield ChatGenerationChunk(message=chunk)
@@ -0,0 +1,264 @@
+"""
+Load test: drive main.py and the FastAPI routes at increasing concurrency against a fake LLM.
+
+Every scenario runs in-process with benchmarks.fake_llm.FakeQuizChatModel in place of Azure
+OpenAI, with the response cache and request coalescing disabled so that every request reaches
+the model. For each scenario and concurrency level it reports p50/p95/p99 latency,
+requests per second, the error rate and the peak RSS of the process.
+
+Compare against the stored baseline (exit code 1 on a regression):
+
+    python -m benchmarks.load_test
+
+Record a new baseline after an intentional change:
+
+    python -m benchmarks.load_test --update-baseline
+"""
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import benchmarks  # noqa: F401  (placeholder Azure settings)
+
+# Measure live generation; pre-generated quizzes would hide the request path being benchmarked
+os.environ.setdefault("QUIZ_POOL_ENABLED", "false")
+os.environ.setdefault("QUIZ_JOBS_ENABLED", "false")
+# Keep storing generated quizzes, as the server does, but not in the working directory
+os.environ.setdefault("QUIZ_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="quiz-load-test-"), "quiz_store.sqlite3"))
+
+import httpx
+import numpy as np
+
+import main
+from app import app
+from benchmarks.fake_llm import FakeQuizChatModel
+from quiz_generator import HistoryQuizGenerator, MathQuizGenerator, set_generator
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+TOPICS = [
+    ("Reformation", ["Martin Luther", "Roman Catholic Church"]),
+    ("World War II", ["J. Robert Oppenheimer"]),
+    ("Civil War", ["slavery"]),
+]
+
+# What the generators return in place of a quiz when generation fails
+ERROR_PLACEHOLDER = "Error generating quiz"
+
+Scenario = Callable[[httpx.AsyncClient, int], Awaitable[None]]
+
+
+def history_cases(request: int) -> List[dict]:
+    """
+    Three history test cases, made unique per request so that no two requests share a prompt.
+    """
+    return [{"content": f"{content} {request}", "keywords": keywords} for content, keywords in TOPICS]
+
+
+def check(result) -> None:
+    """
+    Count a response as failed if it contains the placeholder the generators return on errors.
+    """
+    if ERROR_PLACEHOLDER in str(result):
+        raise RuntimeError("Response contains an error placeholder")
+
+
+async def history_question(client: httpx.AsyncClient, request: int) -> None:
+    check(await main.history_question(history_cases(request)))
+
+
+async def generate_quizzes(client: httpx.AsyncClient, request: int) -> None:
+    check(await main.generate_quizzes(history_cases(request)[0], {"bypass_cache": True}, 3))
+
+
+async def api_history(client: httpx.AsyncClient, request: int) -> None:
+    response = await client.post("/generate/history/", json={"cases": history_cases(request)})
+    response.raise_for_status()
+    check(response.text)
+
+
+async def api_quizzes(client: httpx.AsyncClient, request: int) -> None:
+    response = await client.post(
+        "/generate/quizzes/",
+        params={"num_quizzes": 3},
+        json={"history_test_case": history_cases(request)[0], "math_test_case": {"bypass_cache": True}},
+    )
+    response.raise_for_status()
+    check(response.text)
+
+
+async def api_quizzes_stream(client: httpx.AsyncClient, request: int) -> None:
+    async with client.stream(
+        "POST",
+        "/generate/quizzes/stream/",
+        params={"num_quizzes": 3},
+        json={"history_test_case": history_cases(request)[0], "math_test_case": {"bypass_cache": True}},
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            check(line)
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "history_question": history_question,
+    "generate_quizzes": generate_quizzes,
+    "api_history": api_history,
+    "api_quizzes": api_quizzes,
+    "api_quizzes_stream": api_quizzes_stream,
+}
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of this process so far, in MiB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+async def run_level(scenario: Scenario, concurrency: int, requests: int) -> dict:
+    """
+    Run a scenario for a number of requests with a fixed number of concurrent clients.
+
+    Returns:
+        dict: Latency percentiles in milliseconds, requests per second, error rate and peak RSS.
+    """
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+
+    async def client_loop(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        while (request := next(counter)) < requests:
+            start = time.perf_counter()
+            try:
+                await scenario(client, request)
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()):  # main.py prints every result and error
+            await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000 if latencies else (float("nan"),) * 3
+    return {
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "rps": round(len(latencies) / elapsed, 2),
+        "error_rate": round(errors / requests, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    List the regressions of results against a baseline.
+
+    A result regresses when its p95 latency, error rate or peak RSS grew, or its throughput
+    dropped, by more than the tolerance.
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        checks = [
+            ("p95_ms", current["p95_ms"] > previous["p95_ms"] * (1 + tolerance)),
+            ("rps", current["rps"] < previous["rps"] * (1 - tolerance)),
+            ("error_rate", current["error_rate"] > previous["error_rate"] + tolerance / 10),
+            ("peak_rss_mb", current["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + tolerance)),
+        ]
+        for metric, regressed in checks:
+            if regressed:
+                regressions.append(f"{key} {metric}: {previous[metric]} -> {current[metric]}")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> dict:
+    model = FakeQuizChatModel(
+        ttft_ms=args.ttft_ms,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+    set_generator("history", HistoryQuizGenerator(llm_model=model))
+    set_generator("math", MathQuizGenerator(llm_model=model))
+
+    results = {}
+    for name in args.scenarios:
+        for concurrency in args.concurrency:
+            requests = max(args.min_requests, concurrency * args.requests_per_client)
+            result = await run_level(SCENARIOS[name], concurrency, requests)
+            results[f"{name}@{concurrency}"] = result
+            print(
+                f"{name:<20} c={concurrency:<4} p50={result['p50_ms']:>8.1f}ms p95={result['p95_ms']:>8.1f}ms "
+                f"p99={result['p99_ms']:>8.1f}ms rps={result['rps']:>8.2f} errors={result['error_rate']:.2%} "
+                f"rss={result['peak_rss_mb']:.1f}MiB"
+            )
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    parser.add_argument("--min-requests", type=int, default=20)
+    parser.add_argument("--ttft-ms", type=float, default=200.0)
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    # The fake model settings are part of the baseline; results are only comparable under the same ones
+    settings = {key: getattr(args, key) for key in (
+        "requests_per_client", "min_requests", "ttft_ms", "tokens_per_second", "error_rate", "malformed_rate", "seed"
+    )}
+    results = asyncio.run(run(args))
+
+    if args.update_baseline:
+        stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+        if stored.get("settings") != settings:
+            stored = {"settings": settings, "results": {}}
+        stored["results"].update(results)
+        args.baseline.write_text(json.dumps(stored, indent=2) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("settings") != settings:
+        print("Baseline was recorded with different fake model settings; not comparing.")
+        return
+    regressions = compare(results, baseline["results"], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main_cli()
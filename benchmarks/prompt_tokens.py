@@ -0,0 +1,131 @@
+"""
+Prompt-size benchmark: prompt tokens per generator for the full and the compact prompt mode.
+
+For each generator and request type the rendered prompt is counted with the tokenizer of the
+GPT-4o family (tiktoken), or with metrics.estimate_tokens when its encoding is not available. The
+"static prefix" column is the part of the prompt that is identical for every request of the
+generator, which provider-side prompt caching can reuse.
+
+With --validity N, N single-quiz and N multiple-quiz requests per generator and mode are
+generated and checked: a response is valid if it matches the schema and every quiz has four
+options with exactly one correct answer. The run exits with 1 if the compact mode is less
+valid than the full mode by more than --tolerance. By default the requests go to the fake
+model in benchmarks/fake_llm.py, which only exercises the pipeline; pass --live to measure
+against the deployment configured in .env.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+import benchmarks  # noqa: F401  (placeholder Azure settings)
+
+from pydantic import ValidationError
+
+from benchmarks.fake_llm import FakeQuizChatModel
+from metrics import estimate_tokens
+from quiz_generator import GENERATOR_TYPES, get_azure_model
+from schema import Quiz
+
+MODES = ("full", "compact")
+NUM_QUIZZES = 3
+TEST_CASES = [
+    {"content": "Reformation", "keywords": ["Martin Luther", "Roman Catholic Church"]},
+    {"content": "World War II", "keywords": ["J. Robert Oppenheimer"]},
+]
+
+def _load_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:  # Not installed, or the encoding cannot be downloaded
+        return None
+
+_encoding = _load_encoding()
+
+def count_tokens(text: str) -> int:
+    return len(_encoding.encode(text)) if _encoding is not None else estimate_tokens(text)
+
+
+def render(generator, test_case: dict, num_quizzes=None) -> str:
+    prompt = generator.quiz_prompt if num_quizzes is None else generator.quizzes_prompt
+    values = {**test_case, "num_quizzes": num_quizzes}
+    return prompt.invoke({name: values.get(name, "") for name in prompt.input_variables}).to_string()
+
+
+def common_prefix(texts) -> str:
+    return os.path.commonprefix(list(texts))
+
+
+def measure_tokens(name: str, mode: str) -> dict:
+    """
+    Count the prompt tokens of one generator in one prompt mode.
+    """
+    generator = GENERATOR_TYPES[name](prompt_mode=mode)
+    cases = TEST_CASES if name == "history" else [{}]
+    prompts = [render(generator, case) for case in cases] + [render(generator, case, NUM_QUIZZES) for case in cases]
+    return {
+        "single": count_tokens(prompts[0]),
+        "multiple": count_tokens(prompts[len(cases)]),
+        "static_prefix": count_tokens(common_prefix(prompts)),
+    }
+
+
+def is_valid(quiz) -> bool:
+    try:
+        quiz = Quiz.model_validate(quiz)
+    except ValidationError:
+        return False
+    return len(quiz.options) == 4 and sum(option.isCorrect for option in quiz.options) == 1
+
+
+async def measure_validity(name: str, mode: str, model, requests: int) -> float:
+    """
+    Share of valid quizzes over single-quiz and multiple-quiz requests of one generator in one mode.
+    """
+    generator = GENERATOR_TYPES[name](llm_model=model, prompt_mode=mode)
+    case = TEST_CASES[0] if name == "history" else {}
+    singles = [generator.acreate_quiz(**case, bypass_cache=True) for _ in range(requests)]
+    multiples = [generator.acreate_quizzes(**case, num_quizzes=NUM_QUIZZES, bypass_cache=True) for _ in range(requests)]
+    results = await asyncio.gather(*singles, *multiples)
+    quizzes = list(results[:requests])
+    for response in results[requests:]:
+        quizzes += response.quizzes[:NUM_QUIZZES] + [None] * (NUM_QUIZZES - len(response.quizzes))  # Missing quizzes count as invalid
+    return sum(is_valid(quiz) for quiz in quizzes) / len(quizzes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--validity", type=int, default=0, metavar="N", help="Requests per request type, generator and mode.")
+    parser.add_argument("--live", action="store_true", help="Check validity against the configured deployment.")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Allowed drop of the valid share in compact mode.")
+    args = parser.parse_args()
+
+    print(f"Prompt tokens ({'o200k_base' if _encoding is not None else 'estimated as characters / 4'})")
+    print(f"{'generator':<10}{'request':<10}" + "".join(f"{mode:>10}" for mode in MODES) + f"{'saved':>9}")
+    for name in GENERATOR_TYPES:
+        tokens = {mode: measure_tokens(name, mode) for mode in MODES}
+        for request in ("single", "multiple"):
+            full, compact = tokens["full"][request], tokens["compact"][request]
+            saved = (full - compact) / full * 100 if full else 0.0
+            print(f"{name:<10}{request:<10}{full:>10}{compact:>10}{saved:>8.1f}%")
+        print(f"{name:<10}{'static prefix':<20}" + "".join(
+            f"  {mode}={tokens[mode]['static_prefix']} ({tokens[mode]['static_prefix'] / tokens[mode]['multiple']:.0%} of multiple)"
+            for mode in MODES
+        ))
+
+    if not args.validity:
+        return
+    model = get_azure_model() if args.live else FakeQuizChatModel(ttft_ms=20, tokens_per_second=20000, seed=0)
+    regressed = False
+    for name in GENERATOR_TYPES:
+        validity = {mode: asyncio.run(measure_validity(name, mode, model, args.validity)) for mode in MODES}
+        drop = validity["full"] - validity["compact"]
+        verdict = "REGRESSION" if drop > args.tolerance else "ok"
+        regressed |= drop > args.tolerance
+        print(f"validity {name:<8} full={validity['full']:.1%} compact={validity['compact']:.1%} {verdict}")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Serialization benchmark: parse plus serialize cost per quiz at realistic batch sizes.
+
+For responses of 1, 3, 10 and 50 quizzes it times the path from the model's JSON text to the
+HTTP response body:
+
+    dict + JSONResponse    JsonOutputParser, schema validation, jsonable_encoder and the
+                           stdlib JSON encoder (how responses were built before)
+    model + ORJSONResponse Quizzes.model_validate_json, then model_dump(mode="json") encoded
+                           with orjson (the current path)
+
+    python -m benchmarks.serialization --repeat 200
+"""
+import argparse
+import json
+import random
+import time
+
+import benchmarks  # noqa: F401  (placeholder Azure settings)
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import JsonOutputParser
+
+from benchmarks.fake_llm import WORDS
+from schema import Quizzes
+
+BATCH_SIZES = (1, 3, 10, 50)
+
+
+def sample_response(num_quizzes: int) -> str:
+    """
+    Model output for num_quizzes quizzes of realistic length.
+    """
+    def text(words: int) -> str:
+        return " ".join(random.choices(WORDS, k=words))
+
+    return json.dumps({"quizzes": [
+        {
+            "question": text(25) + "?",
+            "options": [
+                {"content": text(6), "reason": text(30), "isCorrect": i == 0}
+                for i in range(4)
+            ],
+            "difficulty": random.choice(["easy", "medium", "hard"]),
+        }
+        for _ in range(num_quizzes)
+    ]})
+
+
+def dict_path(parser: JsonOutputParser, content: str) -> bytes:
+    response = parser.invoke(AIMessage(content=content))
+    Quizzes.model_validate(response)
+    return JSONResponse(content=jsonable_encoder(response)).body
+
+
+def model_path(content: str) -> bytes:
+    response = Quizzes.model_validate_json(content)
+    return ORJSONResponse(content=response.model_dump(mode="json")).body
+
+
+def time_per_quiz(func, num_quizzes: int, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat / num_quizzes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="Runs per batch size and path.")
+    args = parser.parse_args()
+
+    random.seed(0)
+    json_parser = JsonOutputParser(pydantic_object=Quizzes)
+    print(f"{'quizzes':>8}{'dict + JSONResponse':>24}{'model + ORJSONResponse':>26}{'speed-up':>10}")
+    for num_quizzes in BATCH_SIZES:
+        content = sample_response(num_quizzes)
+        assert json.loads(dict_path(json_parser, content)) == json.loads(model_path(content))
+        before = time_per_quiz(lambda: dict_path(json_parser, content), num_quizzes, args.repeat)
+        after = time_per_quiz(lambda: model_path(content), num_quizzes, args.repeat)
+        print(f"{num_quizzes:>8}{before * 1e6:>21.1f}µs{after * 1e6:>23.1f}µs{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Startup benchmark: how long a fresh worker process takes to import the app and serve its first request.
+
+Each run starts a new interpreter that imports app, runs the FastAPI lifespan (building the
+model client and the generators) and sends one request for a locally generated math quiz,
+which needs no model call. The pool, the job runner and the quiz store are disabled so that
+no background work competes with startup. Reported are the medians over --runs runs of
+
+    import           importing app
+    startup          running the lifespan hook
+    first_request    the first request after startup
+    ready            process start to the first response, including interpreter startup
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import benchmarks
+
+STAGES = ("import", "startup", "first_request", "ready")
+
+
+def child() -> None:
+    """
+    Measure one cold start in this process and print the timings as JSON.
+    """
+    start = time.perf_counter()
+    from fastapi.testclient import TestClient
+    import app
+    imported = time.perf_counter()
+    with TestClient(app.app) as client:
+        started = time.perf_counter()
+        response = client.post("/generate/math/", json={"mode": "local"})
+        response.raise_for_status()
+        answered = time.perf_counter()
+    print(json.dumps({
+        "import": imported - start,
+        "startup": started - imported,
+        "first_request": answered - started,
+    }))
+
+
+def measure() -> dict:
+    """
+    Time one cold start in a new interpreter.
+    """
+    env = {
+        **os.environ,
+        "QUIZ_POOL_ENABLED": "false",
+        "QUIZ_JOBS_ENABLED": "false",
+        "QUIZ_STORE_ENABLED": "false",
+    }
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child"],
+        env=env, capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(benchmarks.__file__))),
+    ).stdout
+    ready = time.perf_counter() - start
+    return {**json.loads(output.strip().splitlines()[-1]), "ready": ready}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts to measure.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child()
+        return
+
+    runs = [measure() for _ in range(args.runs)]
+    print(f"{'stage':<16}{'median':>10}{'max':>10}")
+    for stage in STAGES:
+        values = [run[stage] for run in runs]
+        print(f"{stage:<16}{statistics.median(values) * 1000:>8.0f}ms{max(values) * 1000:>8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Generate quizzes for every row of a JSONL or CSV file and append them to a JSONL file.
+
+Each input row is one request: a history row has "content" and "keywords" (separated by ";" in
+CSV files), a math row has "subject" set to "math" and an optional "mode". Any row may set
+"num_quizzes" (default 1) and an "id" (default: its row number). Every finished row is written
+to the output straight away as {"id", "subject", "content", "keywords", "quizzes"}, so the output
+doubles as the checkpoint: rerunning the same command skips the rows already in it and
+retries the ones that failed.
+
+    python bulk_generate.py topics.jsonl quizzes.jsonl --concurrency 16
+"""
+from typing import Iterator, List, Optional, Set, TextIO, Tuple
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from quiz_generator import get_generator
+from scheduler import admit_bulk
+from schema import Quiz
+
+# The question of the placeholder the generators return when generation fails
+ERROR_QUESTION = "Error generating quiz"
+
+
+def read_rows(path: str) -> Iterator[Tuple[str, dict]]:
+    """
+    Stream the rows of a JSONL or CSV file, one at a time.
+
+    Args:
+        path (str): The input file; files ending in .csv are read as CSV with a header row.
+
+    Yields:
+        Tuple[str, dict]: The row id and the row.
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(file)
+        else:
+            rows = (json.loads(line) for line in file if line.strip())
+        for number, row in enumerate(rows):
+            if isinstance(row.get("keywords"), str):
+                row["keywords"] = [keyword.strip() for keyword in row["keywords"].split(";") if keyword.strip()]
+            row_id = row.get("id")
+            yield str(number if row_id is None else row_id), row
+
+
+def completed_ids(path: str) -> Set[str]:
+    """
+    Read the ids of the rows already in the output file.
+
+    A last line left incomplete by an interrupted run is cut off so that appending continues
+    on a clean line.
+
+    Args:
+        path (str): The output file.
+
+    Returns:
+        Set[str]: The ids of the finished rows.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as file:
+        complete = 0
+        for line in file:
+            try:
+                done.add(str(json.loads(line)["id"]))
+            except (ValueError, KeyError):
+                break
+            complete += len(line)
+        file.truncate(complete)
+    return done
+
+
+async def generate_row(row: dict) -> List[Quiz]:
+    """
+    Generate the quizzes for one row, once the shared scheduler admits it as bulk work.
+
+    Raises:
+        RuntimeError: If the generator returned its error placeholder or fewer quizzes than asked
+            for, so that the row is retried on the next run.
+    """
+    subject = row.get("subject") or "history"
+    num_quizzes = int(row.get("num_quizzes") or 1)
+    generator = get_generator(subject)
+    if subject == "math":
+        kwargs = {"mode": row.get("mode") or "llm"}
+    else:
+        kwargs = {"content": row["content"], "keywords": row.get("keywords") or []}
+    if kwargs.get("mode", "llm") == "llm":
+        await admit_bulk(generator.estimate_cost(kwargs, num_quizzes if num_quizzes > 1 else None))
+    if num_quizzes == 1:
+        quizzes = [await generator.acreate_quiz(**kwargs)]
+    else:
+        quizzes = (await generator.acreate_quizzes(num_quizzes=num_quizzes, **kwargs)).quizzes
+    if not quizzes or any(quiz.question == ERROR_QUESTION for quiz in quizzes):
+        raise RuntimeError("The generator returned its error placeholder")
+    if len(quizzes) < num_quizzes:
+        raise RuntimeError(f"The generator returned {len(quizzes)} of {num_quizzes} quizzes")
+    return quizzes
+
+
+class Progress:
+    """
+    Counts finished rows and prints the throughput and the estimated time left.
+    """
+
+    def __init__(self, total: int, skipped: int, stream: TextIO = sys.stderr):
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.failed = 0
+        self.quizzes = 0
+        self.start = time.monotonic()
+        self.stream = stream
+
+    def line(self) -> str:
+        elapsed = time.monotonic() - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.skipped - self.done - self.failed
+        eta = time.strftime("%H:%M:%S", time.gmtime(remaining / rate)) if rate else "--:--:--"
+        return (
+            f"{self.skipped + self.done}/{self.total} rows, {self.failed} failed, "
+            f"{rate:.2f} rows/s, {self.quizzes / elapsed if elapsed > 0 else 0.0:.2f} quizzes/s, ETA {eta}"
+        )
+
+    def show(self, final: bool = False) -> None:
+        end = "\n" if final or not self.stream.isatty() else ""
+        prefix = "\r" if self.stream.isatty() else ""
+        print(prefix + self.line(), end=end, file=self.stream, flush=True)
+
+
+async def run(
+    input_path: str,
+    output_path: str,
+    concurrency: int = 8,
+    progress_seconds: float = 5.0,
+    limit: Optional[int] = None,
+) -> Progress:
+    """
+    Generate the quizzes for every row that is not yet in the output file.
+
+    The rows are read lazily into a queue of twice the concurrency, so memory stays bounded
+    however large the input is. Failed rows are reported and left out of the output, so the
+    next run retries them.
+
+    Args:
+        input_path (str): The JSONL or CSV input.
+        output_path (str): The JSONL output, appended to.
+        concurrency (int): Rows generated at once.
+        progress_seconds (float): Seconds between progress lines.
+        limit (Optional[int]): Stop after this many rows of the input.
+
+    Returns:
+        Progress: The final counters.
+    """
+    done_ids = completed_ids(output_path)
+    total = sum(1 for _ in read_rows(input_path))
+    if limit is not None:
+        total = min(total, limit)
+    progress = Progress(total, skipped=0)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    with open(output_path, "a", encoding="utf-8") as output:
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                row_id, row = item
+                try:
+                    quizzes = await generate_row(row)
+                except Exception as e:
+                    progress.failed += 1
+                    print(f"Error generating row {row_id}: {e}", file=sys.stderr)
+                    continue
+                record = {
+                    "id": row_id,
+                    "subject": row.get("subject") or "history",
+                    "content": row.get("content"),
+                    "keywords": row.get("keywords"),
+                    "quizzes": [quiz.model_dump(mode="json") for quiz in quizzes],
+                }
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+                progress.done += 1
+                progress.quizzes += len(quizzes)
+
+        async def report() -> None:
+            while True:
+                await asyncio.sleep(progress_seconds)
+                progress.show()
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        reporter = asyncio.create_task(report())
+        try:
+            for number, (row_id, row) in enumerate(read_rows(input_path)):
+                if limit is not None and number >= limit:
+                    break
+                if row_id in done_ids:
+                    progress.skipped += 1
+                    continue
+                await queue.put((row_id, row))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            reporter.cancel()
+            for task in workers:
+                task.cancel()
+    progress.show(final=True)
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="JSONL or CSV file with one request per row.")
+    parser.add_argument("output", help="JSONL file the results are appended to; also the checkpoint.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Rows generated at once.")
+    parser.add_argument("--progress-seconds", type=float, default=5.0, help="Seconds between progress lines.")
+    parser.add_argument("--limit", type=int, help="Only process the first N rows of the input.")
+    args = parser.parse_args()
+    # Load .env before the generators read their settings
+    load_dotenv()
+    try:
+        progress = asyncio.run(run(args.input, args.output, args.concurrency, args.progress_seconds, args.limit))
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume.", file=sys.stderr)
+        sys.exit(130)
+    sys.exit(1 if progress.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from pydantic import BaseModel
+
+from prompts import PROMPT_VERSION
+
+
+def make_cache_key(prompt_text: str, deployment: str) -> str:
+    """
+    Build a content-addressed cache key for a rendered prompt.
+
+    Args:
+        prompt_text (str): The fully rendered prompt sent to the model.
+        deployment (str): The model deployment that would answer the prompt.
+
+    Returns:
+        str: A SHA-256 hex digest covering the prompt version, deployment and prompt text.
+    """
+    digest = hashlib.sha256()
+    for part in (PROMPT_VERSION, deployment, prompt_text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class QuizCache(ABC):
+    """
+    A base class for quiz response caches.
+
+    Backends store parsed quiz responses under a content-addressed key and count hits and misses.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        """
+        Initializes the cache.
+
+        Args:
+            ttl (float): Number of seconds an entry stays valid.
+            max_entries (int): Maximum number of entries before the least recently used are evicted.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached response and record a hit or miss.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Optional[Any]: The cached response, or None if it is missing or expired.
+        """
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a response.
+
+        Args:
+            key (str): The cache key.
+            value (Any): The response to store; a JSON-serializable value or a pydantic model.
+        """
+        self._set(key, value)
+
+    def stats(self) -> dict:
+        """
+        Report the cache counters.
+
+        Returns:
+            dict: The backend name, hits, misses, hit rate and current number of entries.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Any]:
+        """
+        Backend lookup. Must return None for missing or expired entries.
+        """
+        pass
+
+    @abstractmethod
+    def _set(self, key: str, value: Any) -> None:
+        """
+        Backend store.
+        """
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+
+class MemoryCache(QuizCache):
+    """
+    An in-process LRU cache with per-entry TTL.
+    """
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 1024):
+        super().__init__(ttl, max_entries)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(QuizCache):
+    """
+    A disk-backed cache that several worker processes can share.
+
+    The database runs in WAL mode so readers in one worker do not block writers in another.
+    Entries expire after the TTL and the least recently used entries are pruned once the
+    table grows past max_entries.
+    """
+
+    # Number of writes between pruning passes
+    PRUNE_INTERVAL = 64
+
+    def __init__(self, path: str = "quiz_cache.sqlite3", ttl: float = 3600, max_entries: int = 100_000):
+        super().__init__(ttl, max_entries)
+        self.path = path
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS quiz_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS quiz_cache_accessed ON quiz_cache (accessed_at)")
+
+    def _get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM quiz_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM quiz_cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE quiz_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO quiz_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value.model_dump(mode="json") if isinstance(value, BaseModel) else value), now + self.ttl, now),
+            )
+            self._writes += 1
+            if self._writes % self.PRUNE_INTERVAL == 0:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        """
+        Drop expired entries, then the least recently used ones above max_entries.
+        """
+        self._conn.execute("DELETE FROM quiz_cache WHERE expires_at < ?", (now,))
+        overflow = self._conn.execute("SELECT COUNT(*) FROM quiz_cache").fetchone()[0] - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM quiz_cache WHERE key IN "
+                "(SELECT key FROM quiz_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM quiz_cache").fetchone()[0]
+
+
+# Process-wide cache shared by the registered generators
+_shared_cache: Optional[QuizCache] = None
+_shared_cache_loaded = False
+
+def get_cache() -> Optional[QuizCache]:
+    """
+    Return the process-wide cache configured from the environment, creating it on first use.
+
+    QUIZ_CACHE_BACKEND selects "memory" (default), "sqlite" or "none";
+    QUIZ_CACHE_TTL, QUIZ_CACHE_MAX_ENTRIES and QUIZ_CACHE_PATH tune the backend.
+
+    Returns:
+        Optional[QuizCache]: The shared cache, or None if caching is disabled.
+    """
+    global _shared_cache, _shared_cache_loaded
+    if not _shared_cache_loaded:
+        backend = os.getenv("QUIZ_CACHE_BACKEND", "memory").lower()
+        ttl = float(os.getenv("QUIZ_CACHE_TTL", "3600"))
+        if backend == "memory":
+            _shared_cache = MemoryCache(ttl, int(os.getenv("QUIZ_CACHE_MAX_ENTRIES", "1024")))
+        elif backend == "sqlite":
+            _shared_cache = SQLiteCache(
+                os.getenv("QUIZ_CACHE_PATH", "quiz_cache.sqlite3"),
+                ttl,
+                int(os.getenv("QUIZ_CACHE_MAX_ENTRIES", "100000")),
+            )
+        elif backend != "none":
+            raise ValueError(f"Unknown QUIZ_CACHE_BACKEND: {backend}")
+        _shared_cache_loaded = True
+    return _shared_cache
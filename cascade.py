@@ -0,0 +1,183 @@
+from typing import Dict, Optional
+import os
+import threading
+
+from langchain_core.language_models import BaseChatModel
+
+from schema import Quiz
+
+# Why a response or quiz from the fast model was escalated, in the order the checks run
+ISSUES = ("schema", "correct_options", "distinct_options", "empty_reason")
+
+# Options every quiz must have
+NUM_OPTIONS = 4
+
+
+def quality_issue(quiz: Quiz) -> Optional[str]:
+    """
+    Find the first reason a quiz that matches the schema cannot be served as generated.
+
+    The quiz must have exactly four distinct options, exactly one of them correct, each with a
+    non-empty reason.
+
+    Args:
+        quiz (Quiz): A parsed quiz.
+
+    Returns:
+        Optional[str]: One of ISSUES other than "schema", or None if the quiz passes.
+    """
+    options = quiz.options
+    if sum(1 for option in options if option.isCorrect) != 1:
+        return "correct_options"
+    if len({" ".join(option.content.lower().split()) for option in options} - {""}) != NUM_OPTIONS:
+        return "distinct_options"
+    if any(not option.reason.strip() for option in options):
+        return "empty_reason"
+    return None
+
+
+class ModelCascade:
+    """
+    Sends requests to a fast, cheap model first and escalates to the strong model only what fails.
+
+    Each response of the fast model goes through a local quality gate (see quality_issue). A single
+    quiz that passes is served as is; a failing one is requested again from the strong model. Of a
+    multiple-quiz response only the passing quizzes are kept and the fan-out top-up requests the
+    missing ones from the strong model. The savings are estimated against sending every request
+    to the strong model.
+    """
+
+    def __init__(self, model: BaseChatModel, cost_ratio: Optional[float] = None):
+        """
+        Initializes the cascade.
+
+        Args:
+            model (BaseChatModel): The fast model tried first.
+            cost_ratio (Optional[float]): Price of a fast model token relative to a strong model token
+                (QUIZ_CASCADE_COST_RATIO, default 1.0), used to weigh the token savings.
+        """
+        self.model = model
+        self.deployment = (
+            getattr(model, "deployment_name", None)
+            or getattr(model, "model_name", None)
+            or type(model).__name__
+        )
+        self.cost_ratio = cost_ratio if cost_ratio is not None else float(os.getenv("QUIZ_CASCADE_COST_RATIO", "1.0"))
+        self._lock = threading.Lock()
+        self.served: Dict[str, int] = {"fast": 0, "strong": 0}
+        self.escalated = 0
+        self.quizzes_passed = 0
+        self.quizzes_failed = 0
+        self.issues: Dict[str, int] = {issue: 0 for issue in ISSUES}
+        self.seconds: Dict[str, float] = {"fast": 0.0, "strong": 0.0}
+        self.tokens: Dict[str, int] = {"fast": 0, "strong": 0}
+        self.wasted_tokens = 0
+
+    def gate(self, response, multiple: bool, seconds: float, tokens: int):
+        """
+        Check a response of the fast model and keep what can be served.
+
+        Args:
+            response: The parsed Quiz or Quizzes, None if the response did not match the schema.
+            multiple (bool): Whether the response holds multiple quizzes.
+            seconds (float): The latency of the fast model call.
+            tokens (int): The prompt and completion tokens of the call.
+
+        Returns:
+            The response with only the passing quizzes, or None if the request must be escalated.
+        """
+        quizzes = [] if response is None else response.quizzes if multiple else [response]
+        passed = []
+        with self._lock:
+            self.seconds["fast"] += seconds
+            self.tokens["fast"] += tokens
+            if response is None:
+                self.issues["schema"] += 1
+            for quiz in quizzes:
+                issue = quality_issue(quiz)
+                if issue is None:
+                    passed.append(quiz)
+                else:
+                    self.issues[issue] += 1
+            self.quizzes_passed += len(passed)
+            self.quizzes_failed += len(quizzes) - len(passed)
+            if not passed:
+                self.escalated += 1
+                self.wasted_tokens += tokens
+                return None
+            self.served["fast"] += 1
+        return response.model_copy(update={"quizzes": passed}) if multiple else response
+
+    def record_strong(self, seconds: float, tokens: int) -> None:
+        """
+        Record a call served by the strong model, either escalated or a top-up of failed quizzes.
+        """
+        with self._lock:
+            self.served["strong"] += 1
+            self.seconds["strong"] += seconds
+            self.tokens["strong"] += tokens
+
+    def stats(self) -> dict:
+        """
+        Report the share of requests served per tier and the estimated savings.
+
+        The strong model's mean latency and tokens per call stand in for what the requests served
+        by the fast model would have cost; the fast calls that were escalated count against the savings.
+
+        Returns:
+            dict: Requests served and mean latency per tier, escalations, the quizzes that passed and
+            failed the gate per issue, and the latency and token savings.
+        """
+        with self._lock:
+            total = sum(self.served.values())
+            strong = self.served["strong"]
+            strong_seconds = self.seconds["strong"] / strong if strong else 0.0
+            strong_tokens = self.tokens["strong"] / strong if strong else 0.0
+            fast_calls = self.served["fast"] + self.escalated
+            stats = {
+                "served_fast": self.served["fast"],
+                "served_strong": strong,
+                "fast_share": self.served["fast"] / total if total else 0.0,
+                "escalated": self.escalated,
+                "escalation_rate": self.escalated / fast_calls if fast_calls else 0.0,
+                "quizzes_passed": self.quizzes_passed,
+                "quizzes_failed": self.quizzes_failed,
+                "fast_mean_seconds": self.seconds["fast"] / fast_calls if fast_calls else 0.0,
+                "strong_mean_seconds": strong_seconds,
+                "latency_saved_seconds": self.served["fast"] * strong_seconds - self.seconds["fast"],
+                "fast_tokens": self.tokens["fast"],
+                "strong_tokens": self.tokens["strong"],
+                "wasted_fast_tokens": self.wasted_tokens,
+                "tokens_saved": round(self.served["fast"] * strong_tokens - self.tokens["fast"] * self.cost_ratio),
+            }
+            for issue in ISSUES:
+                stats[f"failed_{issue}"] = self.issues[issue]
+        return stats
+
+
+# Process-wide cascade shared by the registered generators
+_shared_cascade: Optional[ModelCascade] = None
+
+def get_model_cascade() -> Optional[ModelCascade]:
+    """
+    Return the process-wide model cascade, creating it on first use.
+
+    LLM_FAST_MODEL_DEPLOYMENT enables the cascade and names the fast deployment; its endpoint,
+    key and API version default to the LLM_MODEL_* settings and can be overridden with
+    LLM_FAST_MODEL_ENDPOINT, LLM_FAST_MODEL_API_KEY and LLM_FAST_MODEL_API_VERSION.
+
+    Returns:
+        Optional[ModelCascade]: The shared cascade, or None if it is disabled.
+    """
+    global _shared_cascade
+    if _shared_cascade is None and os.getenv("LLM_FAST_MODEL_DEPLOYMENT"):
+        from langchain_openai.chat_models import AzureChatOpenAI  # Only loaded when the cascade is enabled
+
+        _shared_cascade = ModelCascade(AzureChatOpenAI(
+            openai_api_key=os.getenv("LLM_FAST_MODEL_API_KEY", os.getenv("LLM_MODEL_API_KEY")),
+            openai_api_version=os.getenv("LLM_FAST_MODEL_API_VERSION", os.getenv("LLM_MODEL_API_VERSION")),
+            azure_endpoint=os.getenv("LLM_FAST_MODEL_ENDPOINT", os.getenv("LLM_MODEL_ENDPOINT")),
+            azure_deployment=os.getenv("LLM_FAST_MODEL_DEPLOYMENT"),
+            validate_base_url=False,
+        ))
+    return _shared_cascade
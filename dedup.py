@@ -0,0 +1,278 @@
+from collections import OrderedDict, deque
+from functools import partial
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import os
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from quiz_store import QuizStore, get_quiz_store
+from schema import Quiz
+
+# Words that carry no content and would make unrelated questions look alike
+STOPWORDS = frozenset(
+    "a an and are as at be by did does for from has have how in is it its of on or the this "
+    "that to was were what when where which who whom whose why with".split()
+)
+
+# Modulus of the MinHash permutations: the largest prime below 2**32. With the hashes reduced
+# modulo it, a * hash + b stays below PRIME**2 < 2**64, so the uint64 arithmetic never wraps
+PRIME = 4294967291
+
+# The generator type, content and sorted distinct keywords that quizzes were generated for
+Topic = Tuple[str, str, Tuple[str, ...]]
+
+
+def _field(quiz: Any, name: str) -> Any:
+    return quiz.get(name) if isinstance(quiz, dict) else getattr(quiz, name, None)
+
+
+def shingles(quiz: Any, size: int = 2) -> np.ndarray:
+    """
+    Hash the word n-grams of a quiz's question and option texts.
+
+    Args:
+        quiz (Any): A schema.Quiz or a dict in its shape.
+        size (int): Words per shingle.
+
+    Returns:
+        np.ndarray: The distinct 32-bit shingle hashes.
+    """
+    texts = [_field(quiz, "question") or ""] + [_field(option, "content") or "" for option in _field(quiz, "options") or []]
+    grams = set()
+    for text in texts:
+        # Shingle each text on its own so that reordering the options changes nothing
+        words = [word for word in re.findall(r"\w+", str(text).lower()) if word not in STOPWORDS]
+        grams.update(" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1)))
+    return np.fromiter((zlib.crc32(gram.encode()) for gram in grams), dtype=np.uint64, count=len(grams))
+
+
+class MinHasher:
+    """
+    Computes MinHash signatures whose agreement estimates the Jaccard similarity of shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 120, seed: int = 1):
+        generator = np.random.default_rng(seed)
+        self.a = generator.integers(1, PRIME, size=num_perm, dtype=np.uint64)[:, None]
+        self.b = generator.integers(0, PRIME, size=num_perm, dtype=np.uint64)[:, None]
+        self.num_perm = num_perm
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        if not len(hashes):
+            return np.full(self.num_perm, PRIME, dtype=np.uint64)
+        return ((self.a * (hashes[None, :] % PRIME) + self.b) % PRIME).min(axis=1)
+
+
+class NearDuplicateIndex:
+    """
+    LSH index over the MinHash signatures of one topic's quizzes.
+
+    Signatures are split into bands; quizzes that agree on a whole band share a bucket and
+    become candidates, so a lookup only compares against a handful of quizzes instead of the
+    whole history. Candidates are confirmed by the estimated Jaccard similarity.
+    """
+
+    def __init__(self, bands: int, rows: int, max_entries: int):
+        self.bands = bands
+        self.rows = rows
+        self.max_entries = max_entries
+        self.buckets: Dict[Tuple[int, bytes], List[int]] = {}
+        self.signatures: Dict[int, np.ndarray] = {}
+        self.order: Deque[int] = deque()
+        self.next_id = 0
+
+    def _keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, row.tobytes()) for band, row in enumerate(signature.reshape(self.bands, self.rows))]
+
+    def best_match(self, signature: np.ndarray) -> float:
+        """
+        Estimated Jaccard similarity of the closest indexed quiz, 0 if no bucket is shared.
+        """
+        candidates = {entry for key in self._keys(signature) for entry in self.buckets.get(key, ())}
+        if not candidates:
+            return 0.0
+        matrix = np.stack([self.signatures[entry] for entry in candidates])
+        return float((matrix == signature).mean(axis=1).max())
+
+    def add(self, signature: np.ndarray) -> None:
+        entry, self.next_id = self.next_id, self.next_id + 1
+        self.signatures[entry] = signature
+        self.order.append(entry)
+        for key in self._keys(signature):
+            self.buckets.setdefault(key, []).append(entry)
+        if len(self.order) > self.max_entries:
+            self._evict(self.order.popleft())
+
+    def _evict(self, entry: int) -> None:
+        for key in self._keys(self.signatures.pop(entry)):
+            bucket = self.buckets[key]
+            bucket.remove(entry)
+            if not bucket:
+                del self.buckets[key]
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+
+class QuizDeduplicator:
+    """
+    Drops generated quizzes that are reworded copies of another quiz for the same topic.
+
+    Each quiz is compared with the earlier quizzes of its own response and with the quizzes
+    previously generated for the topic, using MinHash signatures over word pairs of the
+    question and option texts and an LSH index per topic for sub-linear lookups.
+
+    The indexes live in memory and belong to one process. With a history loader, e.g. the quiz
+    store's, an index starts out with the topic's stored quizzes the first time the topic is
+    seen, so quizzes generated before a restart or by other processes are not repeated either.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.45,
+        num_perm: int = 120,
+        bands: int = 40,
+        max_entries_per_topic: int = 5000,
+        max_topics: int = 1024,
+        history: Optional[Callable[[Topic], List[Any]]] = None,
+    ):
+        """
+        Initializes the deduplicator.
+
+        Args:
+            threshold (float): Estimated Jaccard similarity from which a quiz counts as a near-duplicate.
+            num_perm (int): MinHash signature length.
+            bands (int): LSH bands; num_perm must be divisible by it. With 40 bands of 3 rows, a quiz at
+                similarity 0.45 becomes a candidate 98% of the time, one at 0.15 only 10% of the time.
+            max_entries_per_topic (int): Quizzes remembered per topic before the oldest are forgotten.
+            max_topics (int): Topics remembered before the least recently used are forgotten.
+            history (Optional[Callable[[Topic], List[Any]]]): Loads the earlier quizzes of a topic,
+                newest first; None starts every topic empty.
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries_per_topic = max_entries_per_topic
+        self.max_topics = max_topics
+        self.hasher = MinHasher(num_perm)
+        self.history = history
+        self.indexes: "OrderedDict[str, NearDuplicateIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+        self.seeded = 0
+        self.seconds = 0.0
+
+    def _load(self, topic: Topic) -> List[np.ndarray]:
+        """
+        Compute the signatures of a topic's earlier quizzes, oldest first.
+        """
+        try:
+            quizzes = self.history(topic)
+        except Exception as e:
+            print(f"Error loading earlier quizzes for deduplication: {e}")
+            return []
+        return [self.hasher.signature(shingles(quiz)) for quiz in reversed(quizzes)]
+
+    def _index(self, topic: Topic, history: Optional[List[np.ndarray]]) -> NearDuplicateIndex:
+        index = self.indexes.get(topic)
+        if index is None:
+            index = self.indexes[topic] = NearDuplicateIndex(self.bands, self.rows, self.max_entries_per_topic)
+            for signature in history or ():
+                index.add(signature)
+            self.seeded += len(history or ())
+            if len(self.indexes) > self.max_topics:
+                self.indexes.popitem(last=False)
+        else:
+            self.indexes.move_to_end(topic)
+        return index
+
+    def filter(self, topic: Topic, quizzes: list, response_only: bool = False) -> list:
+        """
+        Remove near-duplicates from freshly generated quizzes and remember the rest for the topic.
+
+        Args:
+            topic (Topic): Identifies the quizzes that must not repeat each other.
+            quizzes (list): schema.Quiz quizzes or dicts in their shape, in response order.
+            response_only (bool): Compare the quizzes only with each other, not with the topic's
+                earlier quizzes, e.g. for a last top-up that the topic's history would otherwise empty.
+
+        Returns:
+            list: The quizzes that are not near-duplicates, in their original order.
+        """
+        start = time.perf_counter()
+        # Loaded outside the lock; if another call creates the index first, its history wins
+        history = self._load(topic) if self.history is not None and topic not in self.indexes else None
+        signatures = [self.hasher.signature(shingles(quiz)) if isinstance(quiz, (dict, Quiz)) else None for quiz in quizzes]
+        kept = []
+        with self._lock:
+            index = self._index(topic, history)
+            compared = NearDuplicateIndex(self.bands, self.rows, len(quizzes) or 1) if response_only else index
+            for quiz, signature in zip(quizzes, signatures):
+                if signature is None:
+                    kept.append(quiz)
+                    continue
+                if compared.best_match(signature) >= self.threshold:
+                    self.duplicates += 1
+                    continue
+                compared.add(signature)
+                if compared is not index:
+                    index.add(signature)
+                kept.append(quiz)
+            self.checked += len(quizzes)
+            self.seconds += time.perf_counter() - start
+        return kept
+
+    def stats(self) -> dict:
+        """
+        Report the deduplication counters.
+
+        Returns:
+            dict: Quizzes checked and dropped as near-duplicates, the duplicate rate, the quizzes
+            remembered and loaded from the history, and the time spent.
+        """
+        return {
+            "checked": self.checked,
+            "duplicates": self.duplicates,
+            "duplicate_rate": self.duplicates / self.checked if self.checked else 0.0,
+            "topics": len(self.indexes),
+            "remembered": sum(len(index) for index in self.indexes.values()),
+            "seeded": self.seeded,
+            "dedup_seconds": self.seconds,
+        }
+
+
+def _stored_quizzes(store: QuizStore, limit: int, topic: Topic) -> List[dict]:
+    generator, content, keywords = topic
+    return store.topic_quizzes(generator, content, keywords, limit)
+
+
+# Process-wide deduplicator shared by the registered generators
+_shared_deduplicator: Optional[QuizDeduplicator] = None
+
+def get_deduplicator() -> QuizDeduplicator:
+    """
+    Return the process-wide near-duplicate filter, creating it on first use.
+
+    QUIZ_DEDUP_THRESHOLD sets the similarity from which quizzes count as near-duplicates.
+    With the quiz store enabled, each topic is seeded with its QUIZ_DEDUP_HISTORY (default
+    1000, 0 disables seeding) most recently stored quizzes the first time it is seen.
+
+    Returns:
+        QuizDeduplicator: The shared deduplicator.
+    """
+    global _shared_deduplicator
+    if _shared_deduplicator is None:
+        store = get_quiz_store()
+        limit = int(os.getenv("QUIZ_DEDUP_HISTORY", "1000"))
+        history = None
+        if store is not None and limit > 0:
+            history = partial(_stored_quizzes, store, limit)
+        _shared_deduplicator = QuizDeduplicator(float(os.getenv("QUIZ_DEDUP_THRESHOLD", "0.45")), history=history)
+    return _shared_deduplicator
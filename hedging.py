@@ -0,0 +1,196 @@
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+import asyncio
+import math
+import os
+import time
+
+
+class LatencyWindow:
+    """
+    The latencies of the most recent calls, kept sorted so any percentile is a lookup.
+    """
+
+    def __init__(self, size: int):
+        self._recent: Deque[float] = deque()
+        self._sorted: List[float] = []
+        self.size = size
+
+    def add(self, seconds: float) -> None:
+        if len(self._recent) == self.size:
+            oldest = self._recent.popleft()
+            del self._sorted[bisect_left(self._sorted, oldest)]
+        self._recent.append(seconds)
+        insort(self._sorted, seconds)
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def percentile(self, percentile: float) -> float:
+        index = min(len(self._sorted) - 1, math.ceil(percentile / 100 * len(self._sorted)) - 1)
+        return self._sorted[max(0, index)]
+
+
+class HedgingPolicy:
+    """
+    Sends a backup request when a model call takes longer than most recent calls of its kind.
+
+    A few model calls stall far longer than the rest and set the tail latency. For each kind of
+    call (e.g. single history quizzes) the policy learns the latency percentile from a window of
+    recent calls; a call still running at that point gets a backup copy, the first acceptable
+    response wins and the other call is cancelled. Backups are sent only while their estimated
+    tokens stay within a budget relative to the tokens of all calls, so a slow deployment cannot
+    double the spend.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        budget: Optional[float] = None,
+        min_samples: int = 20,
+        window: int = 500,
+    ):
+        """
+        Initializes the policy.
+
+        Args:
+            percentile (float): Latency percentile of recent calls after which a backup is sent (QUIZ_HEDGE_PERCENTILE).
+            budget (Optional[float]): Extra tokens that backups may spend, as a share of the tokens of
+                all calls (QUIZ_HEDGE_BUDGET, default 0.05).
+            min_samples (int): Calls of a kind observed before its calls are hedged.
+            window (int): Recent calls per kind the percentile is computed over.
+        """
+        self.percentile = percentile
+        self.budget = budget if budget is not None else float(os.getenv("QUIZ_HEDGE_BUDGET", "0.05"))
+        self.min_samples = min_samples
+        self.window = window
+        self._latencies: Dict[str, LatencyWindow] = {}
+        self.calls = 0
+        self.hedged = 0
+        self.backup_wins = 0
+        self.over_budget = 0
+        self.tokens = 0
+        self.backup_tokens = 0
+
+    def delay(self, kind: str) -> Optional[float]:
+        """
+        Seconds after which a call of this kind gets a backup, or None while too few calls were observed.
+        """
+        latencies = self._latencies.get(kind)
+        if latencies is None or len(latencies) < self.min_samples:
+            return None
+        return latencies.percentile(self.percentile)
+
+    def observe(self, kind: str, seconds: float) -> None:
+        """
+        Record the latency of a completed call.
+        """
+        self._latencies.setdefault(kind, LatencyWindow(self.window)).add(seconds)
+
+    def _within_budget(self, cost: int) -> bool:
+        return self.backup_tokens + cost <= self.budget * self.tokens
+
+    async def run(
+        self,
+        kind: str,
+        call: Callable[[], Awaitable[Any]],
+        cost: int,
+        accept: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Run a call, sending a backup copy if it is slower than the learned percentile.
+
+        Args:
+            kind (str): Calls of the same kind share a latency distribution.
+            call (Callable[[], Awaitable[Any]]): Starts one attempt of the call.
+            cost (int): The estimated tokens of one attempt.
+            accept (Optional[Callable[[Any], bool]]): Whether a result may win the race; a result that
+                is not accepted is only returned if the other attempt fails or is not accepted either.
+
+        Returns:
+            Any: The result of the winning attempt.
+        """
+        self.calls += 1
+        self.tokens += cost
+        delay = self.delay(kind)
+        start = time.perf_counter()
+        if delay is None:
+            result = await call()
+            self.observe(kind, time.perf_counter() - start)
+            return result
+
+        primary = asyncio.ensure_future(call())
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                if self._within_budget(cost):
+                    self.hedged += 1
+                    self.backup_tokens += cost
+                    self.tokens += cost
+                    pending.add(asyncio.ensure_future(call()))
+                else:
+                    self.over_budget += 1
+            fallback, error = None, None
+            while True:
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    result = task.result()
+                    if accept is None or len(pending) + len(done) == 1 or accept(result):
+                        if task is not primary:
+                            self.backup_wins += 1
+                        self.observe(kind, time.perf_counter() - start)
+                        return result
+                    fallback = fallback or (result,)
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if fallback is not None:
+                return fallback[0]
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """
+        Report the hedging counters.
+
+        Returns:
+            dict: Calls, backups sent and how often they won, backups skipped for the budget, the
+            share of tokens spent on backups and the current backup delay per kind of call.
+        """
+        stats = {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+            "backup_wins": self.backup_wins,
+            "win_rate": self.backup_wins / self.hedged if self.hedged else 0.0,
+            "over_budget": self.over_budget,
+            "backup_token_share": self.backup_tokens / self.tokens if self.tokens else 0.0,
+        }
+        for kind in self._latencies:
+            stats[f"{kind}_delay_seconds"] = self.delay(kind) or 0.0
+        return stats
+
+
+# Process-wide policy shared by the registered generators
+_shared_policy: Optional[HedgingPolicy] = None
+
+def get_hedging_policy() -> Optional[HedgingPolicy]:
+    """
+    Return the process-wide hedging policy, creating it on first use.
+
+    QUIZ_HEDGE_PERCENTILE (e.g. 95) enables hedging and sets the latency percentile after which a
+    backup request is sent; QUIZ_HEDGE_BUDGET caps the extra tokens.
+
+    Returns:
+        Optional[HedgingPolicy]: The shared policy, or None if hedging is disabled.
+    """
+    global _shared_policy
+    if _shared_policy is None and os.getenv("QUIZ_HEDGE_PERCENTILE"):
+        _shared_policy = HedgingPolicy(float(os.getenv("QUIZ_HEDGE_PERCENTILE")))
+    return _shared_policy
@@ -1,18 +1,94 @@
+from typing import AsyncIterator, Dict, List, Optional
 import gradio as gr
-import requests
+import httpx
 import json
 
 API_BASE_URL = "http://localhost:8080"  # Ensure this port matches your FastAPI application
 
-def generate_history_quizzes(test_cases):
+# Generation can take a while; connecting to the API should not
+TIMEOUT = httpx.Timeout(120.0, connect=5.0)
+# Connections kept open to the API and shared by all UI users
+LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+# Shared HTTP client, created on first use on Gradio's event loop
+_client: Optional[httpx.AsyncClient] = None
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the connection-pooled HTTP client shared by all handlers.
+
+    Returns:
+        httpx.AsyncClient: The client for API_BASE_URL.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(base_url=API_BASE_URL, timeout=TIMEOUT, limits=LIMITS)
+    return _client
+
+def format_quiz(quiz: dict, number: int) -> str:
     """
-    Generate history quizzes based on the provided test cases.
+    Format one quiz with its options, their correctness and reasons.
 
     Args:
-        test_cases (str): JSON formatted string containing history test cases.
+        quiz (dict): The quiz as returned by the API.
+        number (int): The number shown before the question.
 
     Returns:
-        str: Formatted string of generated history quizzes or error message.
+        str: The formatted quiz, followed by a blank line.
+    """
+    lines = [f"Quiz {number}: {quiz['question']}"]
+    for option in quiz['options']:
+        correctness = "Correct" if option['isCorrect'] else "Incorrect"
+        lines.append(f"- {option['content']} ({correctness}): {option['reason']}")
+    return "\n".join(lines) + "\n\n"
+
+def format_quizzes(quizzes: List[Optional[dict]]) -> str:
+    """
+    Format quizzes in order; quizzes that are not ready yet are shown as pending.
+
+    Args:
+        quizzes (List[Optional[dict]]): The quizzes, None for those still being generated.
+
+    Returns:
+        str: The formatted quizzes.
+    """
+    return "".join(
+        format_quiz(quiz, idx + 1) if quiz is not None else f"Quiz {idx + 1}: generating...\n\n"
+        for idx, quiz in enumerate(quizzes)
+    )
+
+async def stream_events(path: str, payload: dict, params: Optional[dict] = None) -> AsyncIterator[dict]:
+    """
+    Post a request to an NDJSON streaming route and yield its events as they arrive.
+
+    Args:
+        path (str): The route, e.g. "/generate/history/stream/".
+        payload (dict): The JSON request body.
+        params (Optional[dict]): Query parameters.
+
+    Yields:
+        dict: Each streamed event.
+
+    Raises:
+        RuntimeError: If the API responds with an error.
+    """
+    async with get_client().stream("POST", path, json=payload, params={**(params or {}), "format": "ndjson"}) as response:
+        if response.status_code != 200:
+            await response.aread()
+            raise RuntimeError(response.text)
+        async for line in response.aiter_lines():
+            if line:
+                yield json.loads(line)
+
+async def generate_history_quizzes(test_cases) -> AsyncIterator[str]:
+    """
+    Generate history quizzes based on the provided test cases, showing each one as soon as it is ready.
+
+    Args:
+        test_cases (str): JSON formatted string containing history test cases.
+
+    Yields:
+        str: Formatted string of the history quizzes generated so far or error message.
     """
     try:
         # Convert input JSON string to Python dictionary
@@ -23,113 +99,89 @@ def generate_history_quizzes(test_cases):
             test_cases_json = [test_cases_json]
 
     except json.JSONDecodeError:
-        return "Error: Invalid JSON format. Please check your input."
+        yield "Error: Invalid JSON format. Please check your input."
+        return
 
-    # Send request to generate history quizzes
-    response = requests.post(
-        f"{API_BASE_URL}/generate/history/",
-        json={"cases": test_cases_json}
-    )
-    
-    if response.status_code == 200:
-        quizzes = response.json().get("quizzes", [])
-        formatted_quizzes = ""
-        for idx, quiz in enumerate(quizzes):
-            formatted_quizzes += f"Quiz {idx + 1}: {quiz['question']}\n"
-            for option in quiz['options']:
-                correctness = "Correct" if option['isCorrect'] else "Incorrect"
-                formatted_quizzes += f"- {option['content']} ({correctness}): {option['reason']}\n"
-            formatted_quizzes += "\n"
-        return formatted_quizzes
-    else:
-        return f"Error: {response.text}"
+    # Quizzes arrive in completion order; keep them in the order of the test cases
+    quizzes: List[Optional[dict]] = [None] * len(test_cases_json)
+    yield format_quizzes(quizzes)
+    try:
+        async for event in stream_events("/generate/history/stream/", {"cases": test_cases_json}):
+            quizzes[event["index"]] = event["quiz"]
+            yield format_quizzes(quizzes)
+    except (httpx.HTTPError, RuntimeError) as e:
+        yield f"Error: {e}"
 
-def generate_math_quiz(test_case):
+async def generate_math_quiz(test_case) -> AsyncIterator[str]:
     """
     Generate a math quiz based on the provided test case.
 
     Args:
         test_case (str): JSON formatted string containing a math test case.
 
-    Returns:
-        str: Formatted string of the generated math quiz or error message.
+    Yields:
+        str: A progress note, then the formatted math quiz or error message.
     """
     try:
         # Convert input JSON string to Python dictionary
         test_case_json = json.loads(test_case)
     except json.JSONDecodeError:
-        return "Error: Invalid JSON format. Please check your input."
+        yield "Error: Invalid JSON format. Please check your input."
+        return
+
+    yield format_quizzes([None])
+    try:
+        response = await get_client().post("/generate/math/", json=test_case_json)
+    except httpx.HTTPError as e:
+        yield f"Error: {e}"
+        return
 
-    # Send request to generate math quiz
-    response = requests.post(
-        f"{API_BASE_URL}/generate/math/",
-        json=test_case_json
-    )
-    
     if response.status_code == 200:
-        quiz = response.json().get("quiz", {})
-        formatted_quiz = f"Quiz: {quiz['question']}\n"
-        for option in quiz['options']:
-            correctness = "Correct" if option['isCorrect'] else "Incorrect"
-            formatted_quiz += f"- {option['content']} ({correctness}): {option['reason']}\n"
-        return formatted_quiz
+        yield format_quiz(response.json().get("quiz", {}), 1)
     else:
-        return f"Error: {response.text}"
+        yield f"Error: {response.text}"
 
-def generate_combined_quizzes(history_test_case, math_test_case, num_quizzes):
+async def generate_combined_quizzes(history_test_case, math_test_case, num_quizzes) -> AsyncIterator[str]:
     """
-    Generate combined history and math quizzes based on the provided test cases.
+    Generate combined history and math quizzes based on the provided test cases, showing each
+    quiz as soon as the model has finished it.
 
     Args:
         history_test_case (str): JSON formatted string containing history test case.
         math_test_case (str): JSON formatted string containing math test case.
         num_quizzes (int): Number of quizzes to generate.
 
-    Returns:
-        str: Formatted string of generated combined quizzes or error message.
+    Yields:
+        str: Formatted string of the combined quizzes generated so far or error message.
     """
     try:
         # Convert input JSON strings to Python dictionaries
         history_test_case_json = json.loads(history_test_case)
         math_test_case_json = json.loads(math_test_case)
     except json.JSONDecodeError:
-        return "Error: Invalid JSON format. Please check your input."
-
-    # Send request to generate combined quizzes
-    response = requests.post(
-        f"{API_BASE_URL}/generate/quizzes/?num_quizzes={num_quizzes}",
-        json={
-            "history_test_case": history_test_case_json,
-            "math_test_case": math_test_case_json
-        }
-    )
-    
-    if response.status_code == 200:
-        data = response.json()
-        history_quizzes = data.get("history_quiz", [])
-        math_quizzes = data.get("math_quiz", [])
-
-        formatted_output = "History Quizzes:\n"
-        for idx, quiz in enumerate(history_quizzes['quizzes']):
-            formatted_output += f"Quiz {idx + 1}: {quiz['question']}\n"
-            for option in quiz['options']:
-                correctness = "Correct" if option['isCorrect'] else "Incorrect"
-                formatted_output += f"- {option['content']} ({correctness}): {option['reason']}\n"
-            formatted_output += "\n"
-
-        formatted_output += "-" * 300 + "\n\n"  # Separator line
-
-        formatted_output += "Math Quizzes:\n"
-        for idx, quiz in enumerate(math_quizzes['quizzes']):
-            formatted_output += f"Quiz {idx + 1}: {quiz['question']}\n"
-            for option in quiz['options']:
-                correctness = "Correct" if option['isCorrect'] else "Incorrect"
-                formatted_output += f"- {option['content']} ({correctness}): {option['reason']}\n"
-            formatted_output += "\n"
-
-        return formatted_output
-    else:
-        return f"Error: {response.text}"
+        yield "Error: Invalid JSON format. Please check your input."
+        return
+
+    quizzes: Dict[str, List[dict]] = {"history": [], "math": []}
+
+    def render() -> str:
+        return (
+            "History Quizzes:\n" + format_quizzes(quizzes["history"])
+            + "-" * 300 + "\n\n"  # Separator line
+            + "Math Quizzes:\n" + format_quizzes(quizzes["math"])
+        )
+
+    yield render()
+    try:
+        async for event in stream_events(
+            "/generate/quizzes/stream/",
+            {"history_test_case": history_test_case_json, "math_test_case": math_test_case_json},
+            params={"num_quizzes": int(num_quizzes)},
+        ):
+            quizzes[event["subject"]].append(event["quiz"])
+            yield render()
+    except (httpx.HTTPError, RuntimeError) as e:
+        yield f"Error: {e}"
 
 # Create Gradio interface
 with gr.Blocks() as demo:
@@ -0,0 +1,381 @@
+from typing import Any, AsyncIterator, List, Optional, Tuple
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from pydantic import BaseModel
+
+from main import estimate_request_tokens, history_question, math_question
+from scheduler import admit_bulk, get_scheduler
+from schema import Quiz
+
+
+class JobStore:
+    """
+    Keeps quiz jobs and the state of each of their items in SQLite.
+
+    Every item is one test case that produces one quiz. An item stays pending until its quiz
+    is written together with a per-job sequence number, so readers can page through the
+    finished items of a running job in completion order, and a restarted runner picks up
+    exactly the items that are still pending.
+    """
+
+    def __init__(self, path: str = "quiz_jobs.sqlite3"):
+        """
+        Initializes the store and creates the tables if needed.
+
+        Args:
+            path (str): The SQLite database file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                total INTEGER NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS job_items (
+                job_id TEXT NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+                idx INTEGER NOT NULL,
+                subject TEXT NOT NULL,
+                test_case TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                seq INTEGER,
+                quiz TEXT,
+                finished_at REAL,
+                PRIMARY KEY (job_id, idx)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS job_items_pending ON job_items (status, job_id, idx);
+            CREATE INDEX IF NOT EXISTS job_items_seq ON job_items (job_id, seq);
+            """
+        )
+
+    def create(self, items: List[Tuple[str, dict]]) -> str:
+        """
+        Store a new job with all of its items pending.
+
+        Args:
+            items (List[Tuple[str, dict]]): The subject ("history" or "math") and test case of each item.
+
+        Returns:
+            str: The job id.
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("INSERT INTO jobs (id, total, created_at) VALUES (?, ?, ?)", (job_id, len(items), time.time()))
+            self._conn.executemany(
+                "INSERT INTO job_items (job_id, idx, subject, test_case) VALUES (?, ?, ?, ?)",
+                [(job_id, index, subject, json.dumps(test_case)) for index, (subject, test_case) in enumerate(items)],
+            )
+            self._conn.execute("COMMIT")
+        return job_id
+
+    def pending(self) -> List[tuple]:
+        """
+        List the items that have no result yet, oldest job first.
+
+        Returns:
+            List[tuple]: (job id, index, subject, test case, attempts) per pending item.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT i.job_id, i.idx, i.subject, i.test_case, i.attempts FROM job_items i "
+                "JOIN jobs j ON j.id = i.job_id WHERE i.status = 'pending' ORDER BY j.created_at, i.idx"
+            ).fetchall()
+        return [(job_id, index, subject, json.loads(test_case), attempts) for job_id, index, subject, test_case, attempts in rows]
+
+    def retry(self, job_id: str, index: int) -> None:
+        """
+        Count a failed attempt of an item that stays pending.
+        """
+        with self._lock:
+            self._conn.execute("UPDATE job_items SET attempts = attempts + 1 WHERE job_id = ? AND idx = ?", (job_id, index))
+
+    def finish(self, job_id: str, index: int, status: str, quiz: Any) -> None:
+        """
+        Store the result of an item and give it the next sequence number of its job.
+
+        Args:
+            job_id (str): The job id.
+            index (int): The item's position in the job.
+            status (str): "done" or "failed".
+            quiz (Any): The generated quiz or the error placeholder.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_items SET status = ?, quiz = ?, attempts = attempts + 1, finished_at = ?, "
+                "seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM job_items WHERE job_id = ?) "
+                "WHERE job_id = ? AND idx = ?",
+                (status, json.dumps(quiz.model_dump() if isinstance(quiz, BaseModel) else quiz), time.time(), job_id, job_id, index),
+            )
+
+    def job(self, job_id: str) -> Optional[dict]:
+        """
+        Report the progress of a job.
+
+        Returns:
+            Optional[dict]: The job's status, item counts and creation time, or None if it does not exist.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT total, created_at FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+        total, created_at = row
+        pending = counts.get("pending", 0)
+        return {
+            "job_id": job_id,
+            "status": "running" if pending else "completed",
+            "total": total,
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "pending": pending,
+            "created_at": created_at,
+        }
+
+    def results(self, job_id: str, after: int = 0, limit: int = 100) -> List[dict]:
+        """
+        Fetch the finished items of a job in completion order.
+
+        Args:
+            job_id (str): The job id.
+            after (int): Only items finished after the one with this sequence number.
+            limit (int): Maximum items returned.
+
+        Returns:
+            List[dict]: The sequence number, index, subject, status and quiz of each finished item.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, idx, subject, status, quiz FROM job_items WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (job_id, after, limit),
+            ).fetchall()
+        return [
+            {"seq": seq, "index": index, "subject": subject, "status": status, "quiz": json.loads(quiz)}
+            for seq, index, subject, status, quiz in rows
+        ]
+
+    def counts(self) -> dict:
+        with self._lock:
+            jobs = self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            items = dict(self._conn.execute("SELECT status, COUNT(*) FROM job_items GROUP BY status").fetchall())
+        return {"jobs": jobs, **{f"items_{status}": items.get(status, 0) for status in ("pending", "done", "failed")}}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobRunner:
+    """
+    Runs quiz jobs in the background on a bounded pool of workers.
+
+    Items go through the same paths as the API (quiz pool, generators and quiz store). When an
+    admission scheduler is configured, every item is admitted as bulk work, so jobs only use the
+    token budget interactive requests leave over. Results are written to the JobStore as soon as
+    each item finishes; on start the runner resumes the items a previous process left pending.
+    """
+
+    def __init__(self, store: JobStore, workers: Optional[int] = None, max_attempts: int = 2, store_retry_seconds: float = 1.0):
+        """
+        Initializes the runner.
+
+        Args:
+            store (JobStore): Where jobs and their results are kept.
+            workers (Optional[int]): Items generated concurrently (QUIZ_JOB_WORKERS, default 4).
+            max_attempts (int): Attempts per item before it is marked as failed.
+            store_retry_seconds (float): Pause after a failed write to the store before the worker goes on.
+        """
+        self.store = store
+        self.workers = workers or int(os.getenv("QUIZ_JOB_WORKERS", "4"))
+        self.max_attempts = max_attempts
+        self.store_retry_seconds = store_retry_seconds
+        self.submitted = 0
+        self.resumed = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.store_errors = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._progress = asyncio.Event()
+
+    def submit(self, history_cases: List[dict], math_cases: List[dict]) -> dict:
+        """
+        Store a new job and queue its items.
+
+        Args:
+            history_cases (List[dict]): History test cases, one quiz each.
+            math_cases (List[dict]): Math test cases, one quiz each.
+
+        Returns:
+            dict: The new job's progress.
+        """
+        items = [("history", case) for case in history_cases] + [("math", case) for case in math_cases]
+        job_id = self.store.create(items)
+        self.submitted += 1
+        if self._queue is not None:
+            for index, (subject, test_case) in enumerate(items):
+                self._queue.put_nowait((job_id, index, subject, test_case, 0))
+        return self.store.job(job_id)
+
+    def start(self) -> None:
+        """
+        Queue the items left pending by a previous run and start the workers on the running loop.
+        """
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        for item in self.store.pending():
+            self._queue.put_nowait(item)
+            self.resumed += 1
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """
+        Cancel the workers; unfinished items stay pending in the store.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks, self._queue = [], None
+
+    async def _worker(self) -> None:
+        while True:
+            job_id, index, subject, test_case, attempts = await self._queue.get()
+            try:
+                await self._run(job_id, index, subject, test_case, attempts)
+            except Exception as e:
+                # The item stays pending in the store; it is tried again while it has attempts
+                # left and is resumed after a restart otherwise
+                print(f"Error storing item {index} of job {job_id}: {e}")
+                self.store_errors += 1
+                await asyncio.sleep(self.store_retry_seconds)
+                if attempts + 1 < self.max_attempts:
+                    self._queue.put_nowait((job_id, index, subject, test_case, attempts + 1))
+
+    async def _run(self, job_id: str, index: int, subject: str, test_case: dict, attempts: int) -> None:
+        """
+        Generate one item and store its result, or queue it again if it failed and has attempts left.
+        """
+        quiz = await self._generate(subject, test_case)
+        if _field(quiz, "options"):
+            self.store.finish(job_id, index, "done", quiz)
+            self.completed += 1
+        elif attempts + 1 < self.max_attempts:
+            self.store.retry(job_id, index)
+            self.retried += 1
+            self._queue.put_nowait((job_id, index, subject, test_case, attempts + 1))
+            return
+        else:
+            self.store.finish(job_id, index, "failed", quiz)
+            self.failed += 1
+        self._notify()
+
+    async def _generate(self, subject: str, test_case: dict) -> Any:
+        """
+        Generate the quiz of one item, waiting for the scheduler to admit it as bulk work.
+        """
+        try:
+            if get_scheduler() is not None:
+                await admit_bulk(estimate_request_tokens(subject, test_case))
+            if subject == "history":
+                return (await history_question([test_case], max_concurrency=1))[0]
+            return await math_question(test_case)
+        except Exception as e:
+            print(f"Error generating {subject} quiz for a job: {e}")
+            return Quiz(question="Error generating quiz", options=[])
+
+    def _notify(self) -> None:
+        # Wake every stream waiting for progress and give later waiters a fresh event
+        self._progress.set()
+        self._progress = asyncio.Event()
+
+    async def events(self, job_id: str, poll_seconds: float = 1.0) -> AsyncIterator[dict]:
+        """
+        Stream a job's finished items as they complete, then its final progress.
+
+        Args:
+            job_id (str): The job id.
+            poll_seconds (float): How often the store is checked when no progress is signalled,
+                e.g. while another process runs the job.
+
+        Yields:
+            dict: {"index", "subject", "status", "quiz"} per finished item, then {"job": progress}.
+        """
+        after = 0
+        while True:
+            progress = self._progress
+            job = self.store.job(job_id)
+            results = self.store.results(job_id, after)
+            for result in results:
+                after = result.pop("seq")
+                yield result
+            if job["status"] == "completed" and not results:
+                yield {"job": job}
+                return
+            if not results:
+                try:
+                    await asyncio.wait_for(progress.wait(), poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stats(self) -> dict:
+        """
+        Report the job counters.
+
+        Returns:
+            dict: Jobs submitted, items resumed after a restart, completed, failed and retried,
+            failed writes to the store, items queued, and the job and item totals in the store.
+        """
+        return {
+            "submitted": self.submitted,
+            "resumed": self.resumed,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "store_errors": self.store_errors,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "workers": len(self._tasks),
+            **self.store.counts(),
+        }
+
+
+def _field(quiz: Any, name: str) -> Any:
+    return quiz.get(name) if isinstance(quiz, dict) else getattr(quiz, name, None)
+
+
+# Process-wide job runner; its workers are started by the FastAPI lifespan
+_shared_runner: Optional[JobRunner] = None
+_shared_runner_loaded = False
+
+def get_job_runner() -> Optional[JobRunner]:
+    """
+    Return the process-wide job runner, creating it on first use.
+
+    QUIZ_JOBS_PATH sets the database file (default quiz_jobs.sqlite3); QUIZ_JOBS_ENABLED=false
+    disables the job API. Run the jobs of one database file in a single process, since every
+    runner resumes all pending items on start.
+
+    Returns:
+        Optional[JobRunner]: The shared runner, or None if jobs are disabled.
+    """
+    global _shared_runner, _shared_runner_loaded
+    if not _shared_runner_loaded:
+        if os.getenv("QUIZ_JOBS_ENABLED", "true").lower() not in ("0", "false", "no"):
+            _shared_runner = JobRunner(JobStore(os.getenv("QUIZ_JOBS_PATH", "quiz_jobs.sqlite3")))
+        _shared_runner_loaded = True
+    return _shared_runner
@@ -1,10 +1,14 @@
-from quiz_generator import HistoryQuizGenerator, MathQuizGenerator
+from quiz_generator import get_generator
+from quiz_pool import MATH_KEY, PoolKey, get_quiz_pool, history_key
+from quiz_store import get_quiz_store
 from schema import Quiz, Quizzes
-import nest_asyncio
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
 import asyncio
+import os
 from time import time
 
-nest_asyncio.apply()
+# Maximum number of history quiz LLM calls in flight for a single request
+HISTORY_MAX_CONCURRENCY = int(os.getenv("HISTORY_MAX_CONCURRENCY", "8"))
 
 # Sample history test cases
 history_test_case_1 = {
@@ -26,24 +30,107 @@ history_test_case_3 = {
 math_test_case_1 = {}
 
 
-async def history_question(history_test_case: dict) -> Quiz:
+def pool_key(subject: str, test_case: dict) -> Optional[PoolKey]:
+    """
+    Return the quiz pool key that can serve a test case, or None if it must be generated live.
+
+    Test cases that bypass the cache or ask for locally generated math quizzes are never served
+    from the pool.
+    """
+    if get_quiz_pool() is None or test_case.get("bypass_cache") or test_case.get("mode", "llm") != "llm":
+        return None
+    if subject == "history":
+        return history_key(test_case["content"], test_case["keywords"], test_case.get("difficulty"))
+    return MATH_KEY
+
+def generator_args(test_case: dict) -> dict:
+    """
+    Drop the test case fields that only select a pre-generated quiz.
+    """
+    return {name: value for name, value in test_case.items() if name != "difficulty"}
+
+def store_quizzes(subject: str, test_case: dict, quizzes: list) -> None:
+    """
+    Keep live-generated quizzes in the quiz store for later lookup and export.
+    """
+    store = get_quiz_store()
+    if store is not None:
+        store.record(subject, quizzes, test_case.get("content", ""), test_case.get("keywords", []))
+
+def estimate_request_tokens(subject: str, test_case: dict, num_quizzes: Optional[int] = None) -> int:
+    """
+    Estimate the LLM tokens a test case will use, leaving out quizzes the pool can serve.
+
+    Args:
+        subject (str): "history" or "math".
+        test_case (dict): The test case the quizzes are requested for.
+        num_quizzes (Optional[int]): The number of quizzes for a multiple-quiz request, None for a single quiz.
+
+    Returns:
+        int: The estimated prompt and completion tokens; 0 if no LLM call is expected.
+    """
+    if test_case.get("mode", "llm") != "llm":
+        return 0
+    key = pool_key(subject, test_case)
+    live = (num_quizzes or 1) - (get_quiz_pool().depth(key) if key is not None else 0)
+    if live <= 0:
+        return 0
+    return get_generator(subject).estimate_cost(generator_args(test_case), live if num_quizzes else None)
+
+async def take_or_generate(subject: str, test_case: dict, num_quizzes: int, generate: Callable[[int], Awaitable[Quizzes]]) -> Quizzes:
+    """
+    Serve quizzes from the pool and generate only the ones it cannot provide.
+
+    Args:
+        subject (str): "history" or "math".
+        test_case (dict): The test case the quizzes are requested for.
+        num_quizzes (int): The number of quizzes requested.
+        generate (Callable[[int], Awaitable]): Generates a given number of quizzes live.
+
+    Returns:
+        Quizzes: The pooled quizzes followed by the generated ones.
+    """
+    key = pool_key(subject, test_case)
+    pooled = get_quiz_pool().take_many(key, num_quizzes) if key is not None else []
+    if len(pooled) == num_quizzes:
+        return Quizzes(quizzes=pooled)
+    generated = await generate(num_quizzes - len(pooled))
+    store_quizzes(subject, test_case, generated.quizzes)
+    return Quizzes(quizzes=pooled + generated.quizzes)
+
+
+async def history_question(history_test_case: dict, max_concurrency: int = HISTORY_MAX_CONCURRENCY) -> List[Quiz]:
     """
     Generate history quizzes based on provided test cases asynchronously.
 
     Args:
         history_test_case (dict): A dictionary containing the test cases for history quizzes.
+        max_concurrency (int): Maximum number of LLM calls in flight at once.
 
     Returns:
-        Quiz: A list of generated history quizzes.
+        List[Quiz]: The generated history quizzes, in the same order as the test cases.
     """
-    # Create asynchronous tasks for generating history quizzes and wait for all tasks to complete
-    history_tasks = [
-        asyncio.to_thread(HistoryQuizGenerator().create_quiz, **test_case)
-        for test_case in history_test_case
-    ]
+    # Serve popular topics from the quiz pool; only the rest reach the LLM
+    history_quizzes = []
+    for test_case in history_test_case:
+        key = pool_key("history", test_case)
+        history_quizzes.append(get_quiz_pool().take(key) if key is not None else None)
+    live_cases = [test_case for test_case, quiz in zip(history_test_case, history_quizzes) if quiz is None]
+
+    # Run the remaining test cases through one batch call, capped at max_concurrency
+    results = iter(await get_generator("history").acreate_quiz_batch(
+        live_cases, max_concurrency=max_concurrency
+    ) if live_cases else [])
 
-    # Wait for all history quiz generation tasks to complete
-    history_quizzes = await asyncio.gather(*history_tasks)
+    for index, test_case in enumerate(history_test_case):
+        if history_quizzes[index] is not None:
+            continue
+        result = next(results)
+        if isinstance(result, Exception):
+            print(f"Error generating history quiz for {test_case['content']}: {result}")
+            result = Quiz(question="Error generating quiz", options=[])  # Keep the failed case's slot with an error message
+        store_quizzes("history", test_case, [result])
+        history_quizzes[index] = result
 
     # Print the generated quiz results
     # for quiz_result in quizzes:
@@ -51,9 +138,9 @@ async def history_question(history_test_case: dict) -> Quiz:
         
     return history_quizzes
 
-def math_question(math_test_case: dict) -> Quiz:
+async def math_question(math_test_case: dict) -> Quiz:
     """
-    Generate a math quiz based on the provided test case.
+    Generate a math quiz based on the provided test case asynchronously.
 
     Args:
         math_test_case (dict): A dictionary containing the test case for the math quiz.
@@ -61,12 +148,16 @@ def math_question(math_test_case: dict) -> Quiz:
     Returns:
         Quiz: The generated math quiz.
     """
-    math_quiz = MathQuizGenerator().create_quiz(**math_test_case)
+    key = pool_key("math", math_test_case)
+    math_quiz = get_quiz_pool().take(key) if key is not None else None
+    if math_quiz is None:
+        math_quiz = await get_generator("math").acreate_quiz(**math_test_case)
+        store_quizzes("math", math_test_case, [math_quiz])
     # print(f"\n\nQuiz: {quiz_result}\n\n")
     
     return math_quiz
 
-async def generate_quizzes(history_test_case: dict, math_test_case: dict, num_quizzes: int): 
+async def generate_quizzes(history_test_case: dict, math_test_case: dict, num_quizzes: int) -> Tuple[Quizzes, Quizzes]:
     """
     Generate both history and math quizzes asynchronously based on provided test cases.
 
@@ -76,19 +167,17 @@ async def generate_quizzes(history_test_case: dict, math_test_case: dict, num_qu
         num_quizzes (int): The number of quizzes to generate for both subjects.
 
     Returns:
-        Tuple[Quiz, Quiz]: A tuple containing the generated history and math quizzes.
+        Tuple[Quizzes, Quizzes]: A tuple containing the generated history and math quizzes.
     """
-    kwargs = {"num_quizzes": num_quizzes}
-    
-    # Create asynchronous tasks for generating history and math quizzes
-    history_task = asyncio.to_thread(
-        HistoryQuizGenerator().create_quizzes,
-        **{**history_test_case, **kwargs}
+    # Create asynchronous tasks for generating history and math quizzes; pooled quizzes are served first
+    history_task = take_or_generate(
+        "history", history_test_case, num_quizzes,
+        lambda count: get_generator("history").acreate_quizzes(**generator_args(history_test_case), num_quizzes=count),
     )
     
-    math_task = asyncio.to_thread(
-        MathQuizGenerator().create_quizzes,
-        **{**math_test_case, **kwargs}
+    math_task = take_or_generate(
+        "math", math_test_case, num_quizzes,
+        lambda count: get_generator("math").acreate_quizzes(**math_test_case, num_quizzes=count),
     )
     
     # Wait for all quiz generation tasks to complete
@@ -100,6 +189,82 @@ async def generate_quizzes(history_test_case: dict, math_test_case: dict, num_qu
 
     return history_quiz_result, math_quiz_result 
 
+async def history_question_stream(history_test_case: dict, max_concurrency: int = HISTORY_MAX_CONCURRENCY) -> AsyncIterator[Tuple[int, Quiz]]:
+    """
+    Generate history quizzes asynchronously, yielding each one as soon as it is ready.
+
+    Args:
+        history_test_case (dict): A dictionary containing the test cases for history quizzes.
+        max_concurrency (int): Maximum number of LLM calls in flight at once.
+
+    Yields:
+        Tuple[int, Quiz]: The index of the test case and its generated quiz, in completion order.
+    """
+    generator = get_generator("history")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def generate(index: int, test_case: dict) -> Tuple[int, Quiz]:
+        key = pool_key("history", test_case)
+        quiz = get_quiz_pool().take(key) if key is not None else None
+        if quiz is not None:
+            return index, quiz
+        async with semaphore:
+            quiz = await generator.acreate_quiz(**generator_args(test_case))
+        store_quizzes("history", test_case, [quiz])
+        return index, quiz
+
+    tasks = [asyncio.create_task(generate(index, test_case)) for index, test_case in enumerate(history_test_case)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop outstanding work if the client disconnects
+        for task in tasks:
+            task.cancel()
+
+async def generate_quizzes_stream(history_test_case: dict, math_test_case: dict, num_quizzes: int) -> AsyncIterator[Tuple[str, Quiz]]:
+    """
+    Generate both history and math quizzes asynchronously, yielding each quiz as soon as it is complete.
+
+    Args:
+        history_test_case (dict): A dictionary containing the test cases for history quiz.
+        math_test_case (dict): A dictionary containing the test case for the math quiz.
+        num_quizzes (int): The number of quizzes to generate for both subjects.
+
+    Yields:
+        Tuple[str, Quiz]: The subject ("history" or "math") and a generated quiz.
+    """
+    kwargs = {"num_quizzes": num_quizzes}
+    streams = {
+        "history": get_generator("history").astream_quizzes(**{**generator_args(history_test_case), **kwargs}),
+        "math": get_generator("math").astream_quizzes(**{**math_test_case, **kwargs}),
+    }
+    queue = asyncio.Queue()
+
+    async def produce(subject: str, stream: AsyncIterator[dict]) -> None:
+        test_case = history_test_case if subject == "history" else math_test_case
+        try:
+            async for quiz in stream:
+                store_quizzes(subject, test_case, [quiz])
+                await queue.put((subject, quiz))
+        except Exception as e:
+            print(f"Error streaming {subject} quizzes: {e}")
+            await queue.put((subject, Quiz(question="Error generating quiz", options=[])))
+        await queue.put((subject, None))  # Signal that this subject is finished
+
+    tasks = [asyncio.create_task(produce(subject, stream)) for subject, stream in streams.items()]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            subject, quiz = await queue.get()
+            if quiz is None:
+                remaining -= 1
+            else:
+                yield subject, quiz
+    finally:
+        for task in tasks:
+            task.cancel()
+
 if __name__ == "__main__":
     async def main():
         """
@@ -121,7 +286,7 @@ if __name__ == "__main__":
             await history_question(history_test_cases)
             
             # 2. Generate a math quiz
-            math_question(math_test_case_1)
+            await math_question(math_test_case_1)
             
             # 3. Generate both history and math quizzes (Bonus)
             # await generate_quizzes(history_test_case_1, math_test_case_1, 3)
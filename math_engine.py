@@ -0,0 +1,287 @@
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import Callable, List, Optional, Tuple
+import random
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """
+    A real-life setting for a two-variable linear word problem.
+    """
+    intro: str
+    x_item: Tuple[str, str]  # singular, plural
+    y_item: Tuple[str, str]  # singular, plural
+    verb_plural: str
+    verb_singular: str
+    unit: str  # format string for a quantity, e.g. "${}"
+    measure: str  # what x and y measure, e.g. "price in dollars"
+
+    def count(self, number: int, item: Tuple[str, str]) -> str:
+        return f"{number} {item[0] if number == 1 else item[1]}"
+
+    def statement(self, a: int, b: int, c: int) -> str:
+        return (
+            f"{self.count(a, self.x_item)} and {self.count(b, self.y_item)} "
+            f"{self.verb_plural} {self.unit.format(c)} in total."
+        )
+
+
+SCENARIOS = [
+    Scenario(
+        "A school fair sells adult and child tickets.",
+        ("adult ticket", "adult tickets"), ("child ticket", "child tickets"),
+        "cost", "costs", "${}", "price in dollars",
+    ),
+    Scenario(
+        "A fruit stand sells apples and pears at fixed prices.",
+        ("apple", "apples"), ("pear", "pears"),
+        "cost", "costs", "${}", "price in dollars",
+    ),
+    Scenario(
+        "A bakery packs muffins and cookies into gift boxes.",
+        ("muffin", "muffins"), ("cookie", "cookies"),
+        "weigh", "weighs", "{} grams", "weight in grams",
+    ),
+    Scenario(
+        "A workshop builds chairs and tables.",
+        ("chair", "chairs"), ("table", "tables"),
+        "take", "takes", "{} hours", "building time in hours",
+    ),
+    Scenario(
+        "A stationery store sells notebooks and pens.",
+        ("notebook", "notebooks"), ("pen", "pens"),
+        "cost", "costs", "${}", "price in dollars",
+    ),
+    Scenario(
+        "A delivery van carries large and small parcels.",
+        ("large parcel", "large parcels"), ("small parcel", "small parcels"),
+        "weigh", "weighs", "{} kilograms", "weight in kilograms",
+    ),
+]
+
+# Problem shape and number ranges per difficulty level:
+# (kind, coefficient range, solution range)
+LEVELS = {
+    "easy": ("given", (1, 5), (1, 10)),
+    "medium": ("system", (1, 6), (1, 15)),
+    "hard": ("system", (2, 9), (2, 25)),
+}
+
+
+def format_value(value: Fraction) -> str:
+    """
+    Render an exact value as an integer or a reduced fraction.
+    """
+    return str(value.numerator) if value.denominator == 1 else f"{value.numerator}/{value.denominator}"
+
+
+# A distractor is an (x, y, reason) triple; y is None for single-variable problems.
+Distractor = Tuple[Fraction, Optional[Fraction], str]
+
+
+class LocalMathQuizEngine:
+    """
+    Generates math word problems without calling a language model.
+
+    Each quiz is a linear word problem with a non-negative integer solution. Incorrect
+    options come from modeled calculation mistakes (sign slips, substitution errors,
+    unscaled constants, swapped variables), and every option carries the step-by-step
+    working that leads to it.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        """
+        Initializes the engine.
+
+        Args:
+            seed (Optional[int]): Seed for reproducible quizzes.
+        """
+        self.random = random.Random(seed)
+
+    def create_quiz(self, level: Optional[str] = None) -> dict:
+        """
+        Create a single math quiz.
+
+        Args:
+            level (Optional[str]): "easy", "medium" or "hard"; picked at random when omitted.
+
+        Returns:
+            dict: A quiz in the schema.Quiz shape.
+        """
+        level = level or self.random.choice(list(LEVELS))
+        kind, coefficient_range, solution_range = LEVELS[level]
+        scenario = self.random.choice(SCENARIOS)
+        if kind == "given":
+            quiz = self._given_quiz(scenario, coefficient_range, solution_range)
+        else:
+            quiz = self._system_quiz(scenario, coefficient_range, solution_range)
+        quiz["difficulty"] = level
+        return quiz
+
+    def create_quizzes(self, num_quizzes: int) -> dict:
+        """
+        Create multiple math quizzes, cycling through the difficulty levels for variety.
+
+        Args:
+            num_quizzes (int): The number of quizzes to generate.
+
+        Returns:
+            dict: The quizzes in the schema.Quizzes shape.
+        """
+        levels = list(LEVELS)
+        return {"quizzes": [self.create_quiz(levels[i % len(levels)]) for i in range(num_quizzes)]}
+
+    def _given_quiz(self, scenario: Scenario, coefficient_range: tuple, solution_range: tuple) -> dict:
+        """
+        One equation a*x + b*y = c where y is given; solve for x.
+        """
+        a, b = (self.random.randint(*coefficient_range) for _ in range(2))
+        x, y = (self.random.randint(*solution_range) for _ in range(2))
+        c = a * x + b * y
+        question = (
+            f"{scenario.intro} {scenario.statement(a, b, c)} "
+            f"One {scenario.y_item[0]} {scenario.verb_singular} {scenario.unit.format(y)}. "
+            f"Using the equation {a}x + {b}y = {c} with y = {y}, what is the {scenario.measure} "
+            f"of one {scenario.x_item[0]} (x)?"
+        )
+        rest = c - b * y
+        correct_reason = (
+            f"Substitute y = {y}: {a}x + {b}*{y} = {c}, so {a}x = {c} - {b * y} = {rest} "
+            f"and x = {rest}/{a} = {x}."
+        )
+        patterns: List[Callable[[], Optional[Distractor]]] = [
+            lambda: (
+                Fraction(c + b * y, a), None,
+                f"{a}x = {c} + {b * y} = {c + b * y}, so x = {format_value(Fraction(c + b * y, a))}. "
+                f"This is a sign slip: {b}*{y} must be subtracted from both sides, not added.",
+            ),
+            lambda: None if a == 1 else (
+                Fraction(rest), None,
+                f"{a}x = {c} - {b * y} = {rest}, then x = {rest}. "
+                f"This forgets to divide by the coefficient {a} of x.",
+            ),
+            lambda: None if b == 1 else (
+                Fraction(c - y, a), None,
+                f"{a}x = {c} - {y} = {c - y}, so x = {format_value(Fraction(c - y, a))}. "
+                f"This substitutes y = {y} but drops its coefficient {b}.",
+            ),
+        ]
+        fallbacks = [
+            lambda step=step: (
+                Fraction(x + step), None,
+                f"{a}x = {c} - {b * y} computed as {rest + a * step}, so x = {x + step}. "
+                f"This is an arithmetic slip in the subtraction; {c} - {b * y} = {rest}.",
+            )
+            for step in (1, 2, -1, 3)
+        ]
+        return self._assemble(question, (Fraction(x), None), correct_reason, patterns, fallbacks)
+
+    def _system_quiz(self, scenario: Scenario, coefficient_range: tuple, solution_range: tuple) -> dict:
+        """
+        Two equations a1*x + b1*y = c1 and a2*x + b2*y = c2 with a unique integer solution.
+        """
+        while True:
+            a1, b1, a2, b2 = (self.random.randint(*coefficient_range) for _ in range(4))
+            if a1 * b2 - a2 * b1 != 0:
+                break
+        x, y = (self.random.randint(*solution_range) for _ in range(2))
+        c1, c2 = a1 * x + b1 * y, a2 * x + b2 * y
+        question = (
+            f"{scenario.intro} {scenario.statement(a1, b1, c1)} {scenario.statement(a2, b2, c2)} "
+            f"What is the {scenario.measure} of one {scenario.x_item[0]} (x) "
+            f"and one {scenario.y_item[0]} (y)?"
+        )
+
+        # Eliminate x: multiply the first equation by a2 and the second by a1, then subtract.
+        d, n = b1 * a2 - b2 * a1, c1 * a2 - c2 * a1
+        order = "the second from the first"
+        if d < 0:
+            d, n, order = -d, -n, "the first from the second"
+        rest = c1 - b1 * y
+        correct_reason = (
+            f"Multiply the first equation by {a2} and the second by {a1}, then subtract {order}: "
+            f"{d}y = {n}, so y = {y}. Substitute into {a1}x + {b1}y = {c1}: "
+            f"{a1}x = {c1} - {b1 * y} = {rest}, so x = {x}."
+        )
+
+        def substitute(y_value: Fraction) -> Fraction:
+            return (c1 - b1 * y_value) / a1
+
+        unscaled_y = Fraction(c1 * a2 - c2, b1 * a2 - b2 * a1)
+        patterns: List[Callable[[], Optional[Distractor]]] = [
+            lambda: (
+                Fraction(c1 + b1 * y, a1), Fraction(y),
+                f"Elimination gives y = {y}, but then {a1}x = {c1} + {b1 * y} = {c1 + b1 * y}, "
+                f"so x = {format_value(Fraction(c1 + b1 * y, a1))}. "
+                f"This is a sign slip: {b1}y must be subtracted from both sides, not added.",
+            ),
+            lambda: None if a1 == 1 else (
+                Fraction(rest), Fraction(y),
+                f"Elimination gives y = {y} and {a1}x = {c1} - {b1 * y} = {rest}, then x = {rest}. "
+                f"This is a substitution error: it forgets to divide by the coefficient {a1} of x.",
+            ),
+            lambda: None if a1 == 1 else (
+                substitute(unscaled_y), unscaled_y,
+                f"Scaling the second equation by {a1} but leaving its constant {c2} unscaled gives "
+                f"y = ({c1}*{a2} - {c2})/{b1 * a2 - b2 * a1} = {format_value(unscaled_y)}, "
+                f"then x = {format_value(substitute(unscaled_y))}. Every term, including the constant, must be multiplied.",
+            ),
+            lambda: None if x == y or a1 * y + b1 * x == c1 else (
+                Fraction(y), Fraction(x),
+                f"The system is solved correctly but the values are swapped (x = {y}, y = {x}). "
+                f"Check: {a1}*{y} + {b1}*{x} = {a1 * y + b1 * x}, not {c1}.",
+            ),
+        ]
+        fallbacks = [
+            lambda step=step: (
+                substitute(Fraction(y + step)), Fraction(y + step),
+                f"An arithmetic slip in the elimination step gives y = {y + step} instead of {y}; "
+                f"substituting it gives x = {format_value(substitute(Fraction(y + step)))}. "
+                f"Check: {a2}x + {b2}y would not equal {c2}.",
+            )
+            for step in (1, -1, 2, -2, 3)
+        ] + [
+            lambda step=step: (
+                Fraction(x + step), Fraction(y),
+                f"Elimination gives y = {y}, but {a1}x = {c1} - {b1 * y} is computed as {rest + a1 * step}, "
+                f"so x = {format_value(Fraction(rest + a1 * step, a1))}. "
+                f"This is an arithmetic slip in the subtraction; {c1} - {b1 * y} = {rest}.",
+            )
+            for step in (1, 2, 3)
+        ]
+        return self._assemble(question, (Fraction(x), Fraction(y)), correct_reason, patterns, fallbacks)
+
+    def _assemble(
+        self,
+        question: str,
+        answer: Tuple[Fraction, Optional[Fraction]],
+        correct_reason: str,
+        patterns: List[Callable[[], Optional[Distractor]]],
+        fallbacks: List[Callable[[], Optional[Distractor]]],
+    ) -> dict:
+        """
+        Pick three distinct, non-negative distractors and shuffle them with the correct answer.
+        """
+        self.random.shuffle(patterns)
+        seen = {answer}
+        options = [{"content": self._content(*answer), "reason": correct_reason, "isCorrect": True}]
+        for pattern in patterns + fallbacks:
+            if len(options) == 4:
+                break
+            distractor = pattern()
+            if distractor is None:
+                continue
+            x, y, reason = distractor
+            if (x, y) in seen or x < 0 or (y is not None and y < 0):
+                continue
+            seen.add((x, y))
+            options.append({"content": self._content(x, y), "reason": reason, "isCorrect": False})
+        self.random.shuffle(options)
+        return {"question": question, "options": options}
+
+    @staticmethod
+    def _content(x: Fraction, y: Optional[Fraction]) -> str:
+        if y is None:
+            return f"x = {format_value(x)}"
+        return f"x = {format_value(x)}, y = {format_value(y)}"
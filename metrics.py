@@ -0,0 +1,122 @@
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator
+import time
+
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+
+# Latency buckets from sub-millisecond local stages up to slow LLM completions
+STAGE_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0,
+)
+
+STAGE_SECONDS = Histogram(
+    "quiz_stage_seconds",
+    "Time spent in each stage of quiz generation.",
+    ["generator", "stage"],
+    buckets=STAGE_BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "quiz_stage_errors",
+    "Quiz generation failures by stage.",
+    ["generator", "stage"],
+)
+LLM_TOKENS = Counter(
+    "quiz_llm_tokens",
+    "Prompt and completion tokens per generator type.",
+    ["generator", "kind"],
+)
+VALIDATION_RESULTS = Counter(
+    "quiz_validation",
+    "Parsed responses that did or did not match the quiz schema.",
+    ["generator", "result"],
+)
+
+
+@contextmanager
+def stage_timer(generator: str, stage: str) -> Iterator[None]:
+    """
+    Time a block as one stage of quiz generation and count it as an error if it raises.
+
+    Args:
+        generator (str): The generator type, e.g. "history".
+        stage (str): The stage name, e.g. "render" or "parse".
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(generator, stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(generator, stage).observe(time.perf_counter() - start)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text when the provider does not report usage.
+    """
+    return max(1, len(text) // 4)
+
+
+class StatsCollector:
+    """
+    Exposes the stats() counters of the cache, coalescer and other components as Prometheus gauges.
+
+    The stats functions are only called when /metrics is scraped, so nothing is recorded on the
+    request path.
+    """
+
+    def __init__(self, prefix: str, stats: Callable[[], Dict[str, dict]]):
+        """
+        Initializes the collector.
+
+        Args:
+            prefix (str): Metric name prefix, e.g. "quiz_cache".
+            stats (Callable[[], Dict[str, dict]]): Returns the stats dict per label value (e.g. per generator type).
+        """
+        self.prefix = prefix
+        self.stats = stats
+
+    def describe(self):
+        # Without describe() the registry would call collect() at registration, building the
+        # components at import time; the metric names are only known once they exist
+        return []
+
+    def collect(self):
+        families: Dict[str, GaugeMetricFamily] = {}
+        for component, values in self.stats().items():
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{self.prefix}_{key}"
+                if name not in families:
+                    families[name] = GaugeMetricFamily(name, f"{self.prefix} {key.replace('_', ' ')}", labels=["component"])
+                families[name].add_metric([component], value)
+        yield from families.values()
+
+
+# The registered stats functions by metric prefix, also served as JSON on /stats
+_registered_stats: Dict[str, Callable[[], Dict[str, dict]]] = {}
+
+def register_stats(prefix: str, stats: Callable[[], Dict[str, dict]]) -> None:
+    """
+    Publish component counters on /metrics and /stats.
+
+    Args:
+        prefix (str): Metric name prefix.
+        stats (Callable[[], Dict[str, dict]]): Returns the stats dict per label value.
+    """
+    REGISTRY.register(StatsCollector(prefix, stats))
+    _registered_stats[prefix] = stats
+
+
+def collect_stats() -> Dict[str, Dict[str, dict]]:
+    """
+    Gather the counters of every registered component.
+
+    Returns:
+        Dict[str, Dict[str, dict]]: The stats dict per label value, keyed by metric prefix.
+    """
+    return {prefix: stats() for prefix, stats in _registered_stats.items()}
@@ -0,0 +1,378 @@
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional
+import asyncio
+import json
+import os
+import threading
+import time
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.language_models.chat_models import agenerate_from_stream, generate_from_stream
+from langchain_core.messages import BaseMessage, BaseMessageChunk
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from metrics import estimate_tokens
+
+# Completion tokens reserved against a deployment's budget until the real count is known
+EXPECTED_COMPLETION_TOKENS = 512
+
+# Length of the window the tokens-per-minute budgets are measured over
+TPM_WINDOW_SECONDS = 60.0
+
+
+class RouterOverloadedError(RuntimeError):
+    """
+    Raised when no deployment has capacity for a request within the queue timeout.
+    """
+
+
+class Deployment:
+    """
+    One chat model deployment behind the router, with its budgets and health.
+    """
+
+    def __init__(self, name: str, model: BaseChatModel, weight: float = 1.0, max_concurrency: int = 8, tpm: int = 0):
+        """
+        Initializes the deployment.
+
+        Args:
+            name (str): The deployment name used in stats.
+            model (BaseChatModel): The chat model that calls the deployment.
+            weight (float): Relative share of the traffic; a deployment with weight 2 is loaded twice as much.
+            max_concurrency (int): Calls in flight at once.
+            tpm (int): Tokens per minute budget; 0 means unlimited.
+        """
+        self.name = name
+        self.model = model
+        self.weight = weight
+        self.max_concurrency = max_concurrency
+        self.tpm = tpm
+        self.in_flight = 0
+        self.usage: Deque[List[float]] = deque()  # [time, tokens] per call in the TPM window
+        self.tokens_in_window = 0.0
+        self.ejected_until = 0.0
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    def tokens_used(self, now: float) -> float:
+        """
+        Tokens used and reserved in the last minute.
+        """
+        while self.usage and self.usage[0][0] <= now - TPM_WINDOW_SECONDS:
+            self.tokens_in_window -= self.usage.popleft()[1]
+        return self.tokens_in_window
+
+    def load(self, cost: float, now: float) -> Optional[float]:
+        """
+        Weighted utilization of the deployment once a call of the given cost is added.
+
+        Returns:
+            Optional[float]: The load, or None if the deployment is ejected or out of capacity.
+        """
+        if self.ejected_until > now or self.in_flight >= self.max_concurrency:
+            return None
+        used = self.tokens_used(now)
+        if self.tpm and used and used + cost > self.tpm:
+            return None
+        tokens = (used + cost) / self.tpm if self.tpm else 0.0
+        return max((self.in_flight + 1) / self.max_concurrency, tokens) / self.weight
+
+    def stats(self, now: float) -> dict:
+        used = self.tokens_used(now)
+        return {
+            "weight": self.weight,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "tokens_last_minute": round(used),
+            "tpm": self.tpm,
+            "utilization": max(self.in_flight / self.max_concurrency, used / self.tpm if self.tpm else 0.0),
+            "healthy": self.ejected_until <= now,
+            "ejected_seconds": max(0.0, self.ejected_until - now),
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+        }
+
+
+class ModelRouter(BaseChatModel):
+    """
+    A chat model that spreads calls over several deployments.
+
+    Each call goes to the healthy deployment with the lowest weighted utilization, counting both
+    calls in flight against its concurrency limit and tokens used in the last minute against its
+    tokens-per-minute budget. When every deployment is at capacity the call waits for one to free
+    up. A deployment that answers with 429 or a 5xx error, or cannot be reached, is ejected for an
+    exponentially growing backoff (or its Retry-After) and the call is retried on another one, as
+    long as no output has been streamed yet.
+    """
+
+    model_name: str = "model-router"
+    max_retries: int = 3
+    backoff_seconds: float = 1.0
+    max_backoff_seconds: float = 60.0
+    queue_timeout: float = 30.0
+
+    _deployments: List[Deployment] = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, deployments: List[Deployment], **kwargs):
+        """
+        Initializes the router.
+
+        Args:
+            deployments (List[Deployment]): The deployments to route between.
+            **kwargs: Overrides for max_retries, backoff_seconds, max_backoff_seconds and queue_timeout.
+        """
+        if not deployments:
+            raise ValueError("ModelRouter needs at least one deployment")
+        kwargs.setdefault("model_name", ",".join(sorted(deployment.name for deployment in deployments)))
+        super().__init__(**kwargs)
+        self._deployments = deployments
+
+    @property
+    def _llm_type(self) -> str:
+        return "model-router"
+
+    def _cost(self, messages: List[BaseMessage]) -> float:
+        return estimate_tokens("".join(str(message.content) for message in messages)) + EXPECTED_COMPLETION_TOKENS
+
+    def _try_acquire(self, cost: float) -> tuple:
+        """
+        Reserve the least loaded deployment for a call.
+
+        Returns:
+            tuple: The deployment and its usage entry, or (None, None) if none has capacity.
+        """
+        now = time.monotonic()
+        with self._lock:
+            best, best_load = None, None
+            for deployment in self._deployments:
+                load = deployment.load(cost, now)
+                if load is not None and (best_load is None or load < best_load):
+                    best, best_load = deployment, load
+            if best is None:
+                return None, None
+            best.in_flight += 1
+            best.requests += 1
+            entry = [now, cost]
+            best.usage.append(entry)
+            best.tokens_in_window += cost
+            return best, entry
+
+    def _acquire(self, cost: float) -> tuple:
+        deadline = time.monotonic() + self.queue_timeout
+        while True:
+            deployment, entry = self._try_acquire(cost)
+            if deployment is not None:
+                return deployment, entry
+            if time.monotonic() >= deadline:
+                raise RouterOverloadedError("No model deployment has capacity for the request")
+            time.sleep(0.05)
+
+    async def _aacquire(self, cost: float) -> tuple:
+        deadline = time.monotonic() + self.queue_timeout
+        while True:
+            deployment, entry = self._try_acquire(cost)
+            if deployment is not None:
+                return deployment, entry
+            if time.monotonic() >= deadline:
+                raise RouterOverloadedError("No model deployment has capacity for the request")
+            await asyncio.sleep(0.05)
+
+    def _release(self, deployment: Deployment, entry: List[float], messages: List[BaseMessage], chunks: List[BaseMessageChunk]) -> None:
+        """
+        Free the deployment's slot and replace the reserved tokens with the ones actually used.
+        """
+        usage = [chunk.usage_metadata for chunk in chunks if getattr(chunk, "usage_metadata", None)]
+        if usage:
+            tokens = sum(item["total_tokens"] for item in usage)
+        elif chunks:
+            tokens = self._cost(messages) - EXPECTED_COMPLETION_TOKENS + estimate_tokens(
+                "".join(str(chunk.content) for chunk in chunks)
+            )
+        else:
+            tokens = 0
+        with self._lock:
+            deployment.in_flight -= 1
+            if deployment.usage and entry[0] >= deployment.usage[0][0]:
+                deployment.tokens_in_window += tokens - entry[1]
+                entry[1] = tokens
+
+    def _succeeded(self, deployment: Deployment) -> None:
+        with self._lock:
+            deployment.consecutive_failures = 0
+
+    def _failed(self, deployment: Deployment, error: Exception) -> bool:
+        """
+        Count a failed call and eject the deployment if the error is worth retrying elsewhere.
+
+        Returns:
+            bool: Whether the call should be retried.
+        """
+        status = getattr(error, "status_code", None)
+        retryable = status == 429 or (status is not None and status >= 500) or (
+            status is None and type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+        )
+        now = time.monotonic()
+        with self._lock:
+            deployment.failures += 1
+            if not retryable or deployment.ejected_until > now:
+                return retryable  # Calls that were in flight when it was ejected do not extend the backoff
+            deployment.consecutive_failures += 1
+            backoff = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (deployment.consecutive_failures - 1))
+            deployment.ejected_until = now + max(backoff, _retry_after(error))
+            deployment.ejections += 1
+        print(f"Ejecting model deployment {deployment.name} after error: {error}")
+        return True
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        cost = self._cost(messages)
+        for attempt in range(self.max_retries + 1):
+            deployment, entry = self._acquire(cost)
+            chunks = []
+            try:
+                for chunk in deployment.model.stream(messages, stop=stop, **kwargs):
+                    chunks.append(chunk)
+                    generation = ChatGenerationChunk(message=chunk)
+                    if run_manager:
+                        run_manager.on_llm_new_token(str(chunk.content), chunk=generation)
+                    yield generation
+                self._succeeded(deployment)
+                return
+            except Exception as e:
+                if chunks or attempt == self.max_retries or not self._failed(deployment, e):
+                    raise
+            finally:
+                self._release(deployment, entry, messages, chunks)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        cost = self._cost(messages)
+        for attempt in range(self.max_retries + 1):
+            deployment, entry = await self._aacquire(cost)
+            chunks = []
+            try:
+                async for chunk in deployment.model.astream(messages, stop=stop, **kwargs):
+                    chunks.append(chunk)
+                    generation = ChatGenerationChunk(message=chunk)
+                    if run_manager:
+                        await run_manager.on_llm_new_token(str(chunk.content), chunk=generation)
+                    yield generation
+                self._succeeded(deployment)
+                return
+            except Exception as e:
+                if chunks or attempt == self.max_retries or not self._failed(deployment, e):
+                    raise
+            finally:
+                self._release(deployment, entry, messages, chunks)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await agenerate_from_stream(self._astream(messages, stop, run_manager, **kwargs))
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Report the utilization and health of each deployment.
+
+        Returns:
+            Dict[str, dict]: Per deployment: weight, calls in flight, tokens used in the last minute,
+            their budgets, utilization, health, and request, failure and ejection counts.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {deployment.name: deployment.stats(now) for deployment in self._deployments}
+
+
+def _retry_after(error: Exception) -> float:
+    """
+    Seconds the provider asked us to wait, read from the Retry-After header of the error's response.
+    """
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after", 0)) if response is not None else 0.0
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+def deployments_from_env() -> List[Deployment]:
+    """
+    Build the deployments listed in LLM_MODEL_DEPLOYMENTS.
+
+    The variable holds a JSON list of objects with a "deployment" name and optional "endpoint",
+    "api_key", "api_version", "weight", "max_concurrency" and "tpm" fields; missing connection
+    fields fall back to the LLM_MODEL_* variables of the single deployment setup.
+
+    Returns:
+        List[Deployment]: The configured deployments.
+    """
+    configs = json.loads(os.getenv("LLM_MODEL_DEPLOYMENTS", "[]"))
+    if not configs:
+        return []
+    from langchain_openai.chat_models import AzureChatOpenAI  # Only loaded when deployments are configured
+
+    deployments = []
+    for config in configs:
+        model = AzureChatOpenAI(
+            openai_api_key=config.get("api_key", os.getenv("LLM_MODEL_API_KEY")),
+            openai_api_version=config.get("api_version", os.getenv("LLM_MODEL_API_VERSION")),
+            azure_endpoint=config.get("endpoint", os.getenv("LLM_MODEL_ENDPOINT")),
+            azure_deployment=config["deployment"],
+            validate_base_url=False,
+            max_retries=0,  # The router retries on another deployment instead
+        )
+        deployments.append(Deployment(
+            config.get("name", config["deployment"]),
+            model,
+            weight=float(config.get("weight", 1.0)),
+            max_concurrency=int(config.get("max_concurrency", 8)),
+            tpm=int(config.get("tpm", 0)),
+        ))
+    return deployments
+
+
+# Process-wide router shared by the registered generators
+_shared_router: Optional[ModelRouter] = None
+
+def get_model_router() -> Optional[ModelRouter]:
+    """
+    Return the process-wide model router, creating it on first use.
+
+    LLM_MODEL_DEPLOYMENTS lists the deployments to route between; when it is unset the
+    generators call the single LLM_MODEL_* deployment directly.
+
+    Returns:
+        Optional[ModelRouter]: The shared router, or None if no deployments are listed.
+    """
+    global _shared_router
+    if _shared_router is None and os.getenv("LLM_MODEL_DEPLOYMENTS"):
+        _shared_router = ModelRouter(deployments_from_env())
+    return _shared_router
@@ -1,9 +1,13 @@
-from typing import List
+from typing import List, Literal, Optional
 from pydantic import BaseModel
 
+from schema import Quiz, Quizzes
+
 class HistoryTestCase(BaseModel):
     content: str = "Reformation"  
     keywords: list[str] = ["Martin Luther", "Roman Catholic Church"] 
+    bypass_cache: bool = False  # Skip the response cache and always call the model
+    difficulty: Optional[Literal["easy", "medium", "hard"]] = None  # Preferred difficulty of a pre-generated quiz
 
 class HistoryTestCases(BaseModel):
     cases: List[HistoryTestCase] = [
@@ -13,4 +17,19 @@ class HistoryTestCases(BaseModel):
     ]
 
 class MathTestCase(BaseModel):
-    pass
+    bypass_cache: bool = False  # Skip the response cache and always call the model
+    mode: Literal["llm", "local"] = "llm"  # "local" builds the quiz without an LLM call
+
+class JobRequest(BaseModel):
+    history_cases: List[HistoryTestCase] = []  # One history quiz per case
+    math_cases: List[MathTestCase] = []  # One math quiz per case
+
+class HistoryQuizzesResponse(BaseModel):
+    quizzes: List[Quiz]  # One quiz per test case, in input order
+
+class MathQuizResponse(BaseModel):
+    quiz: Quiz
+
+class CombinedQuizzesResponse(BaseModel):
+    history_quiz: Quizzes
+    math_quiz: Quizzes
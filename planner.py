@@ -0,0 +1,152 @@
+from typing import Any, List, Optional
+import math
+import os
+import re
+
+
+def _field(quiz: Any, name: str) -> Any:
+    return quiz.get(name) if isinstance(quiz, dict) else getattr(quiz, name, None)
+
+
+def question_key(quiz: Any) -> str:
+    """
+    Normalize a quiz question for duplicate detection.
+
+    Args:
+        quiz (Any): A schema.Quiz or a dict in its shape.
+
+    Returns:
+        str: The lower-cased question with punctuation and repeated whitespace removed.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", (_field(quiz, "question") or "").lower()).split())
+
+
+class FanOutPlanner:
+    """
+    Splits a request for many quizzes into parallel sub-requests and learns how large they should be.
+
+    Output length dominates completion latency, so one call for N quizzes takes roughly N times as
+    long as a call for one. The planner keeps each sub-request small enough to finish within a
+    target time: it tracks the observed seconds, completion tokens and token throughput per
+    generated quiz and sizes the chunks from them.
+    """
+
+    def __init__(
+        self,
+        chunk_size: Optional[int] = None,
+        min_chunk_size: int = 1,
+        max_chunk_size: int = 10,
+        target_seconds: Optional[float] = None,
+        max_chunks: int = 8,
+        top_up_rounds: int = 2,
+        smoothing: float = 0.2,
+    ):
+        """
+        Initializes the planner.
+
+        Args:
+            chunk_size (Optional[int]): Initial quizzes per sub-request (QUIZ_FANOUT_CHUNK_SIZE, default 4).
+            min_chunk_size (int): Smallest chunk size the planner adapts to.
+            max_chunk_size (int): Largest chunk size the planner adapts to.
+            target_seconds (Optional[float]): Latency a sub-request should stay within (QUIZ_FANOUT_TARGET_SECONDS, default 10).
+            max_chunks (int): Maximum number of parallel sub-requests for one request.
+            top_up_rounds (int): How often a shortfall after de-duplication is requested again.
+            smoothing (float): Weight of the newest observation in the moving averages.
+        """
+        self.chunk_size = chunk_size or int(os.getenv("QUIZ_FANOUT_CHUNK_SIZE", "4"))
+        self.min_chunk_size = min_chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.target_seconds = target_seconds or float(os.getenv("QUIZ_FANOUT_TARGET_SECONDS", "10"))
+        self.max_chunks = max_chunks
+        self.top_up_rounds = top_up_rounds
+        self.smoothing = smoothing
+        self.seconds_per_quiz: Optional[float] = None
+        self.tokens_per_quiz: Optional[float] = None
+        self.tokens_per_second: Optional[float] = None
+        self.fan_outs = 0
+        self.sub_requests = 0
+        self.duplicates_removed = 0
+        self.top_ups = 0
+        self.shortfalls = 0
+
+    def plan(self, num_quizzes: int) -> List[int]:
+        """
+        Split a quiz count into evenly sized chunks of at most the current chunk size.
+
+        Args:
+            num_quizzes (int): The number of quizzes requested.
+
+        Returns:
+            List[int]: The number of quizzes to request from each sub-request.
+        """
+        chunks = min(self.max_chunks, max(1, math.ceil(num_quizzes / self.chunk_size)))
+        base, extra = divmod(num_quizzes, chunks)
+        return [base + (1 if i < extra else 0) for i in range(chunks) if base or i < extra]
+
+    def observe(self, num_quizzes: int, seconds: float, completion_tokens: Optional[int] = None) -> None:
+        """
+        Record a finished model call and re-size the chunks.
+
+        Args:
+            num_quizzes (int): The number of quizzes the call returned.
+            seconds (float): The call's latency.
+            completion_tokens (Optional[int]): Tokens generated by the call, if known.
+        """
+        if num_quizzes <= 0 or seconds <= 0:
+            return
+        self.seconds_per_quiz = self._smooth(self.seconds_per_quiz, seconds / num_quizzes)
+        if completion_tokens:
+            self.tokens_per_quiz = self._smooth(self.tokens_per_quiz, completion_tokens / num_quizzes)
+            self.tokens_per_second = self._smooth(self.tokens_per_second, completion_tokens / seconds)
+
+        if self.tokens_per_quiz and self.tokens_per_second:
+            per_quiz = self.tokens_per_quiz / self.tokens_per_second
+        else:
+            per_quiz = self.seconds_per_quiz
+        self.chunk_size = max(self.min_chunk_size, min(self.max_chunk_size, int(self.target_seconds / per_quiz)))
+
+    def merge(self, quizzes: list, fresh: list, num_quizzes: int) -> list:
+        """
+        Append new quizzes whose questions are not already present, up to the requested count.
+
+        Args:
+            quizzes (list): The quizzes collected so far.
+            fresh (list): Quizzes from a finished sub-request.
+            num_quizzes (int): The number of quizzes requested.
+
+        Returns:
+            list: The merged quizzes.
+        """
+        seen = {question_key(quiz) for quiz in quizzes}
+        for quiz in fresh:
+            key = question_key(quiz)
+            if key in seen:
+                self.duplicates_removed += 1
+                continue
+            if len(quizzes) < num_quizzes:
+                seen.add(key)
+                quizzes.append(quiz)
+        return quizzes
+
+    def _smooth(self, average: Optional[float], value: float) -> float:
+        return value if average is None else (1 - self.smoothing) * average + self.smoothing * value
+
+    def stats(self) -> dict:
+        """
+        Report the planner state and counters.
+
+        Returns:
+            dict: The current chunk size, the learned per-quiz latency and throughput, and fan-out counters,
+            including the requests that ended with fewer quizzes than asked for.
+        """
+        return {
+            "chunk_size": self.chunk_size,
+            "seconds_per_quiz": self.seconds_per_quiz,
+            "tokens_per_quiz": self.tokens_per_quiz,
+            "tokens_per_second": self.tokens_per_second,
+            "fan_outs": self.fan_outs,
+            "sub_requests": self.sub_requests,
+            "duplicates_removed": self.duplicates_removed,
+            "top_ups": self.top_ups,
+            "shortfalls": self.shortfalls,
+        }
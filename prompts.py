@@ -1,3 +1,6 @@
+# Bump whenever a template changes so cached responses for the old wording are not reused
+PROMPT_VERSION = "2"
+
 HISTORY_SINGLE_QUIZ_PROMPT = """
 You are an expert in history education. Based on the following content: "{content}" 
 and the keywords: {keywords}, generate a single history quiz question. 
@@ -20,8 +23,9 @@ requiring solving for two variables in a system of linear equations.
 
 1. The problem can involve solving for one variable when another variable is given (e.g., x + 2y = 10, where y = 3). 
    Ensure to provide similar examples in your problem statement.
+   Name the two unknowns x and y and state the equations in the problem statement (e.g., "Using the equations 2x + 3y = 24 and x + y = 10, ...").
 2. Ensure that the problem is logically sound and does not contain negative numbers.
-3. Provide four options for the solution, ensuring that there is always one correct answer, which is not necessarily the first option.
+3. Provide four options for the solution, each stating the values of the unknowns in the form "x = 4, y = 3" (or only "x = 4" when y is given), ensuring that there is always one correct answer, which is not necessarily the first option.
 4. Each option should include a detailed explanation. For incorrect options, provide the specific incorrect calculation steps (e.g., "x = 10 - 2*3 = 5", but this ignores the sign change) and explain why these lead to the wrong result. For the correct option, show the correct steps and the reasoning behind the correct answer.
 5. When generating multiple problems, ensure there is a differentiation in difficulty levels and introduce variety in the problems.
 
@@ -32,4 +36,61 @@ The response should be in the following JSON format:
 MATH_MULTIPLE_QUIZZES_PROMPT = MATH_SINGLE_QUIZ_PROMPT.replace(
     "Generate a math word problem",
     "Generate {num_quizzes} different math word problems. These problems must incorporate varying levels of complexity and **must not** include any indication of difficulty level while ensuring logical consistency without negative numbers."
-)
\ No newline at end of file
+)
+
+# Compact templates: shorter instructions and a minimal schema (see quiz_generator.get_compact_format_instructions).
+# Everything that is the same for every request of a generator comes first and the request's variables
+# come last, so single and multiple-quiz prompts share one static prefix that provider-side prompt
+# caching can reuse.
+HISTORY_COMPACT_PREFIX = """You write multiple-choice history quiz questions.
+Each question has exactly four options with one correct answer, which is not always the first option.
+Each option has a short reason why it is correct or incorrect.
+Each question has a difficulty: easy, medium or hard.
+A question is JSON of this shape:
+{format_instructions}
+Reply with JSON only.
+"""
+
+HISTORY_COMPACT_SINGLE_QUIZ_PROMPT = HISTORY_COMPACT_PREFIX + """
+Content: "{content}"
+Keywords: {keywords}
+Write one question and reply with the question object.
+"""
+
+HISTORY_COMPACT_MULTIPLE_QUIZZES_PROMPT = HISTORY_COMPACT_PREFIX + """
+Content: "{content}"
+Keywords: {keywords}
+Write {num_quizzes} different questions that mix the difficulty levels and reply with {{"quizzes": [question objects]}}.
+"""
+
+MATH_COMPACT_PREFIX = """You write multiple-choice math word problems about real-life situations.
+Each problem is solved with a system of two linear equations in x and y, stated in the question (e.g. x + 2y = 10, 3x + y = 15).
+Use no negative numbers and keep the problem logically sound.
+Each problem has exactly four options stating x and y (e.g. "x = 4, y = 3"); exactly one is correct and it is not always the first.
+Each option's reason shows the calculation: the correct working for the correct option, the specific wrong step for the others.
+A problem is JSON of this shape:
+{format_instructions}
+Reply with JSON only.
+"""
+
+MATH_COMPACT_SINGLE_QUIZ_PROMPT = MATH_COMPACT_PREFIX + """
+Write one problem and reply with the problem object.
+"""
+
+MATH_COMPACT_MULTIPLE_QUIZZES_PROMPT = MATH_COMPACT_PREFIX + """
+Write {num_quizzes} different problems of varying complexity, without stating their difficulty, and reply with {{"quizzes": [problem objects]}}.
+"""
+
+# Appended when a large request is split into parallel parts, so that the parts differ from each other
+FAN_OUT_PART_HINT = """
+This request is part {part} of a larger set generated in parallel. Avoid the most obvious questions 
+on this topic and cover different facts, people, events or situations than a first set would.
+"""
+
+# Sent when a response is not valid JSON for its schema and could not be repaired locally
+JSON_FIX_UP_PROMPT = """The text below was meant to be JSON of this shape:
+{format_instructions}
+Fix it so that it is valid JSON of that shape, keeping its content. Reply with the JSON only.
+
+{text}
+"""
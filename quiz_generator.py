@@ -1,32 +1,132 @@
 from abc import ABC, abstractmethod
-from typing import List
+from functools import lru_cache, partial
+from typing import AsyncIterator, Dict, List, Literal, Optional, Type, Union, get_args, get_origin
 
+from pydantic import BaseModel, ValidationError
+
+from cache import QuizCache, get_cache, make_cache_key
+from cascade import ModelCascade, get_model_cascade
+from dedup import QuizDeduplicator, Topic, get_deduplicator
+from hedging import HedgingPolicy, get_hedging_policy
+from math_engine import LocalMathQuizEngine
+from model_router import get_model_router
+from metrics import LLM_TOKENS, STAGE_SECONDS, VALIDATION_RESULTS, estimate_tokens, stage_timer
+from planner import FanOutPlanner, question_key
+from repair import ResponseRepairer, strip_code_fence
+from verification import MathQuizVerifier
+from singleflight import SingleFlight, get_single_flight
 from schema import Quiz, Quizzes
 from prompts import (
     HISTORY_SINGLE_QUIZ_PROMPT,
     HISTORY_MULTIPLE_QUIZZES_PROMPT,
+    HISTORY_COMPACT_SINGLE_QUIZ_PROMPT,
+    HISTORY_COMPACT_MULTIPLE_QUIZZES_PROMPT,
     MATH_SINGLE_QUIZ_PROMPT,
     MATH_MULTIPLE_QUIZZES_PROMPT,
+    MATH_COMPACT_SINGLE_QUIZ_PROMPT,
+    MATH_COMPACT_MULTIPLE_QUIZZES_PROMPT,
+    FAN_OUT_PART_HINT,
+    JSON_FIX_UP_PROMPT,
 )
 
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage, BaseMessage, BaseMessageChunk, HumanMessage
+from langchain_core.prompt_values import ChatPromptValue
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
-from langchain_openai.chat_models import AzureChatOpenAI
+from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_core.utils.json import parse_json_markdown
+from langchain_core.language_models import BaseChatModel
 
 from dotenv import load_dotenv
+import asyncio
 import os
+import time
 
-# Load environment variables from .env file
-load_dotenv()
+# The shared chat model, built on first use
+_azure_model: Optional[BaseChatModel] = None
 
-# Initialize AzureChatOpenAI with the specified configuration
-azure_model = AzureChatOpenAI(
-    openai_api_key=os.getenv('LLM_MODEL_API_KEY'),
-    openai_api_version=os.getenv('LLM_MODEL_API_VERSION'),
-    azure_endpoint=os.getenv('LLM_MODEL_ENDPOINT'),
-    azure_deployment=os.getenv('LLM_MODEL_DEPLOYMENT'),
-    validate_base_url=False,
-)
+def get_azure_model() -> BaseChatModel:
+    """
+    Return the process-wide chat model, creating it on first use.
+
+    The settings are read from the environment and the .env file only when a model is first
+    needed, so importing this module neither loads langchain_openai nor needs credentials.
+
+    Returns:
+        BaseChatModel: A ModelRouter across the deployments listed in LLM_MODEL_DEPLOYMENTS, if any,
+        otherwise an AzureChatOpenAI client for the LLM_MODEL_* settings.
+    """
+    global _azure_model
+    if _azure_model is None:
+        load_dotenv()
+        model = get_model_router()
+        if model is None:
+            from langchain_openai.chat_models import AzureChatOpenAI
+            model = AzureChatOpenAI(
+                openai_api_key=os.getenv('LLM_MODEL_API_KEY'),
+                openai_api_version=os.getenv('LLM_MODEL_API_VERSION'),
+                azure_endpoint=os.getenv('LLM_MODEL_ENDPOINT'),
+                azure_deployment=os.getenv('LLM_MODEL_DEPLOYMENT'),
+                validate_base_url=False,
+            )
+        _azure_model = model
+    return _azure_model
+
+# Completion tokens assumed per quiz until the planner has observed real responses
+DEFAULT_TOKENS_PER_QUIZ = 250
+
+# Marks the start of each quiz in a streamed response
+QUESTION_FIELD = '"question"'
+
+# How MathQuizGenerator builds a quiz: with the language model or the local engine
+MathQuizMode = Literal["llm", "local"]
+
+# Which prompt templates a generator uses: the full ones with the JSON schema from JsonOutputParser,
+# or the compact ones with a minimal schema
+PromptMode = Literal["full", "compact"]
+
+@lru_cache(maxsize=None)
+def get_format_instructions(pydantic_object: Type[BaseModel]) -> str:
+    """
+    Render the JSON format instructions for a schema once per process.
+
+    Args:
+        pydantic_object (Type[BaseModel]): The schema the response must follow.
+
+    Returns:
+        str: The format instructions produced by JsonOutputParser.
+    """
+    return JsonOutputParser(pydantic_object=pydantic_object).get_format_instructions()
+
+def _compact_type(annotation) -> str:
+    """
+    Render a field type as a JSON example: objects with their fields, lists as [item, ...].
+    """
+    if get_origin(annotation) is Union:
+        return _compact_type(next(arg for arg in get_args(annotation) if arg is not type(None)))
+    if get_origin(annotation) is list:
+        return f"[{_compact_type(get_args(annotation)[0])}, ...]"
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        fields = ", ".join(f'"{name}": {_compact_type(field.annotation)}' for name, field in annotation.model_fields.items())
+        return "{" + fields + "}"
+    return {str: "string", bool: "true|false", int: "integer", float: "number"}.get(annotation, "value")
+
+@lru_cache(maxsize=None)
+def get_compact_format_instructions(pydantic_object: Type[BaseModel]) -> str:
+    """
+    Render a schema as a one-line JSON example without the field descriptions.
+
+    The compact templates state the rules the descriptions carry in their own wording, so only
+    the shape is needed, e.g. {"question": string, "options": [{...}, ...], "difficulty": string}.
+
+    Args:
+        pydantic_object (Type[BaseModel]): The schema the response must follow.
+
+    Returns:
+        str: The compact format instructions.
+    """
+    return _compact_type(pydantic_object)
 
 class QuizGenerator(ABC):
     """
@@ -34,18 +134,797 @@ class QuizGenerator(ABC):
 
     This abstract class defines the interface for generating quizzes. 
     It contains common functionality and properties that all quiz generators must implement.
+    Subclasses provide the prompt templates; the chains built from them are compiled
+    once per instance and reused for every call.
     """
 
-    def __init__(self, llm_model: AzureChatOpenAI = azure_model):
+    name: str
+    single_quiz_prompt: str
+    multiple_quizzes_prompt: str
+    compact_single_quiz_prompt: str
+    compact_multiple_quizzes_prompt: str
+
+    def __init__(
+        self,
+        llm_model: Optional[BaseChatModel] = None,
+        cache: Optional[QuizCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        planner: Optional[FanOutPlanner] = None,
+        deduplicator: Optional[QuizDeduplicator] = None,
+        prompt_mode: Optional[PromptMode] = None,
+        repairer: Optional[ResponseRepairer] = None,
+        hedging: Optional[HedgingPolicy] = None,
+        cascade: Optional[ModelCascade] = None,
+    ):
         """
         Initializes the QuizGenerator with a language model.
 
         Args:
-            llm_model (AzureChatOpenAI): An instance of the AzureChatOpenAI model.
+            llm_model (Optional[BaseChatModel]): The chat model, e.g. AzureChatOpenAI or a ModelRouter; the shared one from get_azure_model() when omitted.
+            cache (Optional[QuizCache]): Cache for parsed responses; None disables caching.
+            single_flight (Optional[SingleFlight]): Coalesces concurrent identical async calls; None disables coalescing.
+            planner (Optional[FanOutPlanner]): Splits large multi-quiz requests into parallel parts; a new one is created when omitted.
+            deduplicator (Optional[QuizDeduplicator]): Drops near-duplicate quizzes from multi-quiz responses; None disables it.
+            prompt_mode (Optional[PromptMode]): "full" or "compact" prompt templates (QUIZ_PROMPT_MODE, default "full").
+            repairer (Optional[ResponseRepairer]): Recovers malformed responses; a new one is created when omitted.
+            hedging (Optional[HedgingPolicy]): Sends backup requests for slow async model calls; None disables hedging.
+            cascade (Optional[ModelCascade]): Tries a fast model first and escalates to llm_model only what fails
+                its quality gate; None sends every call to llm_model.
         """
-        self.azure_model = llm_model
+        self.azure_model = llm_model or get_azure_model()
+        self.cache = cache
+        self.single_flight = single_flight
+        self.planner = planner or FanOutPlanner()
+        self.deduplicator = deduplicator
+        self.repairer = repairer or ResponseRepairer()
+        self.hedging = hedging
+        self.cascade = cascade
+        self.deployment = (
+            getattr(self.azure_model, "deployment_name", None)
+            or getattr(self.azure_model, "model_name", None)
+            or type(self.azure_model).__name__
+        )
         self.quiz_parser = JsonOutputParser(pydantic_object=Quiz)
         self.quizzes_parser = JsonOutputParser(pydantic_object=Quizzes)
+        self.prompt_mode = prompt_mode or os.getenv("QUIZ_PROMPT_MODE", "full")
+        if self.prompt_mode == "compact":
+            # Both templates describe a single quiz so that they share their static prefix
+            instructions = get_compact_format_instructions(Quiz)
+            self.quiz_prompt = self._build_prompt(self.compact_single_quiz_prompt, instructions)
+            self.quizzes_prompt = self._build_prompt(self.compact_multiple_quizzes_prompt, instructions)
+        else:
+            self.quiz_prompt = self._build_prompt(self.single_quiz_prompt, get_format_instructions(Quiz))
+            self.quizzes_prompt = self._build_prompt(self.multiple_quizzes_prompt, get_format_instructions(Quizzes))
+        self.fix_up_prompt = ChatPromptTemplate.from_template(JSON_FIX_UP_PROMPT)
+        self.quiz_chain = self._build_chain(self.quiz_prompt, self.quiz_parser)
+        self.quizzes_chain = self._build_chain(self.quizzes_prompt, self.quizzes_parser)
+
+    @staticmethod
+    def _build_prompt(template: str, format_instructions: str) -> ChatPromptTemplate:
+        """
+        Compile a prompt template with the format instructions pre-bound.
+
+        Args:
+            template (str): The prompt template text.
+            format_instructions (str): The rendered response schema.
+
+        Returns:
+            ChatPromptTemplate: The compiled prompt template.
+        """
+        return ChatPromptTemplate.from_template(template).partial(format_instructions=format_instructions)
+
+    def estimate_cost(self, inputs: dict, num_quizzes: Optional[int] = None) -> int:
+        """
+        Estimate the prompt and completion tokens of a request before it is sent.
+
+        Args:
+            inputs (dict): The prompt variables of the request.
+            num_quizzes (Optional[int]): The number of quizzes for a multiple-quiz request, None for a single quiz.
+
+        Returns:
+            int: The estimated tokens, counting the prompt once per fan-out part.
+        """
+        prompt = self.quiz_prompt if num_quizzes is None else self.quizzes_prompt
+        values = {**inputs, "num_quizzes": num_quizzes}
+        prompt_value = prompt.invoke({name: values.get(name, "") for name in prompt.input_variables})
+        parts = len(self.planner.plan(num_quizzes)) if num_quizzes else 1
+        tokens_per_quiz = self.planner.tokens_per_quiz or DEFAULT_TOKENS_PER_QUIZ
+        return estimate_tokens(prompt_value.to_string()) * parts + round(tokens_per_quiz * (num_quizzes or 1))
+
+    def _build_chain(self, prompt_template: ChatPromptTemplate, parser: JsonOutputParser) -> Runnable:
+        """
+        Compile a render -> cache -> model -> parse -> validate chain.
+
+        The chain takes the prompt variables as input, plus an optional "bypass_cache" flag
+        that skips the cache lookup (the fresh response is still stored), an optional
+        "part" number used by the fan-out planner, an optional "escalate" flag that skips
+        the fast model of the cascade and an optional "response_only" flag that de-duplicates
+        the quizzes only against each other. Every stage is timed for /metrics.
+
+        Args:
+            prompt_template (ChatPromptTemplate): The compiled prompt template.
+            parser (JsonOutputParser): The parser for the model response.
+
+        Returns:
+            Runnable: The compiled chain.
+        """
+        return RunnableLambda(
+            partial(self._generate, prompt_template, parser),
+            afunc=partial(self._agenerate, prompt_template, parser),
+        )
+
+    def _render(self, prompt_template: ChatPromptTemplate, inputs: dict) -> tuple:
+        """
+        Normalize the inputs, render the prompt and compute its cache key, which also names the model tier.
+
+        Surrounding whitespace in the content and keywords is dropped so that requests
+        differing only in formatting share a cache entry and an in-flight call.
+
+        Returns:
+            tuple: The rendered prompt, its cache key, whether the cache lookup is bypassed and
+            the topic whose quizzes must not repeat each other.
+        """
+        with stage_timer(self.name, "render"):
+            inputs = dict(inputs)
+            bypass_cache = inputs.pop("bypass_cache", False)
+            part = inputs.pop("part", None)
+            escalate = inputs.pop("escalate", False)
+            inputs.pop("response_only", None)
+            if "content" in inputs:
+                inputs["content"] = inputs["content"].strip()
+            if "keywords" in inputs:
+                inputs["keywords"] = [keyword.strip() for keyword in inputs["keywords"]]
+            prompt_value = prompt_template.invoke(inputs)
+            if part:
+                prompt_value = ChatPromptValue(
+                    messages=[*prompt_value.messages, HumanMessage(content=FAN_OUT_PART_HINT.format(part=part))]
+                )
+            # Fast-tier answers are keyed apart, so an escalated call is never served the response it replaces
+            tier = self.deployment if self.cascade is None or escalate else f"{self.cascade.deployment}>{self.deployment}"
+            key = make_cache_key(prompt_value.to_string(), tier)
+            topic = (self.name, inputs.get("content", ""), tuple(sorted(set(inputs.get("keywords", [])))))
+        return prompt_value, key, bypass_cache or self.cache is None, topic
+
+    def _generate(self, prompt_template: ChatPromptTemplate, parser: JsonOutputParser, inputs: dict):
+        """
+        Render the prompt, serve it from the cache if possible, otherwise call the model.
+        """
+        prompt_value, key, bypass_cache, topic = self._render(prompt_template, inputs)
+        if not bypass_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._from_cache(parser, cached)
+        return self._call(parser, prompt_value, key, topic, inputs.get("escalate", False), inputs.get("response_only", False))
+
+    async def _agenerate(self, prompt_template: ChatPromptTemplate, parser: JsonOutputParser, inputs: dict):
+        """
+        Asynchronous counterpart of _generate; cache misses for the same key that overlap
+        in time share one model call through the single-flight coalescer. A request that
+        bypasses the cache always makes its own call.
+        """
+        prompt_value, key, bypass_cache, topic = self._render(prompt_template, inputs)
+        if not bypass_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return self._from_cache(parser, cached)
+        call = partial(self._acall, parser, prompt_value, key, topic, inputs.get("escalate", False), inputs.get("response_only", False))
+        if self.single_flight is None or inputs.get("bypass_cache"):
+            return await call()
+        return await self.single_flight.do(key, call)
+
+    @staticmethod
+    def _from_cache(parser: JsonOutputParser, cached) -> BaseModel:
+        """
+        Return a cached response as its model; a cache shared between processes stores it as JSON.
+        """
+        return cached if isinstance(cached, BaseModel) else parser.pydantic_object.model_validate(cached)
+
+    def _call(self, parser: JsonOutputParser, prompt_value, key: str, topic: Topic, escalate: bool = False, response_only: bool = False):
+        """
+        Call the model for a rendered prompt, parse, de-duplicate and check the response and store it in the cache.
+
+        With a cascade the fast model is tried first unless escalate is set; with response_only the
+        quizzes are de-duplicated only against each other.
+        """
+        response = None
+        if self.cascade is not None and not escalate:
+            response = self._cascade(parser, prompt_value)
+        if response is None:
+            start = time.perf_counter()
+            message = self._invoke_model(prompt_value)
+            self._observe_strong(prompt_value, message, time.perf_counter() - start)
+            response = self._resolve(parser, prompt_value, message)
+        response = self._dedup(topic, response, response_only)
+        with stage_timer(self.name, "check"):
+            response = self._check(response)
+        if self.cache is not None:
+            self.cache.set(key, response)
+        return response
+
+    async def _acall(self, parser: JsonOutputParser, prompt_value, key: str, topic: Topic, escalate: bool = False, response_only: bool = False):
+        """
+        Asynchronous counterpart of _call.
+        """
+        response = None
+        if self.cascade is not None and not escalate:
+            response = await self._acascade(parser, prompt_value)
+        if response is None:
+            start = time.perf_counter()
+            message = await self._ainvoke_model(prompt_value, parser)
+            self._observe_strong(prompt_value, message, time.perf_counter() - start)
+            response = await self._aresolve(parser, prompt_value, message)
+        response = self._dedup(topic, response, response_only)
+        with stage_timer(self.name, "check"):
+            response = await self._acheck(response)
+        if self.cache is not None:
+            self.cache.set(key, response)
+        return response
+
+    def _cascade(self, parser: JsonOutputParser, prompt_value):
+        """
+        Ask the cascade's fast model and keep what passes its quality gate.
+
+        Returns:
+            The response with only the passing quizzes, or None if the request must go to the strong model.
+        """
+        start = time.perf_counter()
+        try:
+            message = self._invoke_model(prompt_value, self.cascade.model)
+        except Exception as e:
+            print(f"Error calling the fast {self.name} model: {e}")
+            return self.cascade.gate(None, parser is self.quizzes_parser, time.perf_counter() - start, 0)
+        return self._gate(parser, prompt_value, message, time.perf_counter() - start)
+
+    async def _acascade(self, parser: JsonOutputParser, prompt_value):
+        """
+        Asynchronous counterpart of _cascade.
+        """
+        start = time.perf_counter()
+        try:
+            message = self._join_chunks([chunk async for chunk in self._astream_model(prompt_value, self.cascade.model)])
+        except Exception as e:
+            print(f"Error calling the fast {self.name} model: {e}")
+            return self.cascade.gate(None, parser is self.quizzes_parser, time.perf_counter() - start, 0)
+        return self._gate(parser, prompt_value, message, time.perf_counter() - start)
+
+    def _gate(self, parser: JsonOutputParser, prompt_value, message: BaseMessage, seconds: float):
+        """
+        Parse a response of the fast model, repairing it locally only, and pass it through the quality gate.
+
+        Its latency is not fed to the fan-out planner, which sizes parts for the strong model.
+        """
+        response, _ = self._parse(parser, message)
+        return self.cascade.gate(response, parser is self.quizzes_parser, seconds, self._message_tokens(prompt_value, message))
+
+    def _observe_strong(self, prompt_value, message: BaseMessage, seconds: float) -> None:
+        """
+        Feed a call of the generator's own model to the fan-out planner and, with a cascade, to its strong tier.
+        """
+        self._observe(message, seconds)
+        if self.cascade is not None:
+            self.cascade.record_strong(seconds, self._message_tokens(prompt_value, message))
+
+    @staticmethod
+    def _message_tokens(prompt_value, message: BaseMessage) -> int:
+        """
+        The prompt and completion tokens of a call, estimated when the provider reports no usage.
+        """
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            return usage["total_tokens"]
+        return estimate_tokens(prompt_value.to_string()) + estimate_tokens(str(message.content))
+
+    def _invoke_model(self, prompt_value, model: Optional[BaseChatModel] = None) -> BaseMessage:
+        """
+        Call the model, or the given one, streaming the response to measure the time to first token.
+        """
+        chunks = []
+        with stage_timer(self.name, "llm_total"):
+            start = time.perf_counter()
+            for chunk in (model or self.azure_model).stream(prompt_value):
+                if not chunks:
+                    STAGE_SECONDS.labels(self.name, "llm_ttft").observe(time.perf_counter() - start)
+                chunks.append(chunk)
+        self._record_tokens(prompt_value, chunks)
+        return self._join_chunks(chunks)
+
+    async def _ainvoke_model(self, prompt_value, parser: Optional[JsonOutputParser] = None) -> BaseMessage:
+        """
+        Asynchronous counterpart of _invoke_model.
+
+        With a hedging policy and the parser of the response, a call slower than the learned
+        latency percentile for its kind gets a backup request; the first response that parses
+        and validates wins and the other call is cancelled.
+        """
+        async def call() -> BaseMessage:
+            chunks = [chunk async for chunk in self._astream_model(prompt_value)]
+            return self._join_chunks(chunks)
+
+        if self.hedging is None or parser is None:
+            return await call()
+        kind = f"{self.name}_{parser.pydantic_object.__name__.lower()}"
+        quizzes = self.planner.chunk_size if parser is self.quizzes_parser else 1
+        cost = estimate_tokens(prompt_value.to_string()) + round((self.planner.tokens_per_quiz or DEFAULT_TOKENS_PER_QUIZ) * quizzes)
+        return await self.hedging.run(kind, call, cost, accept=partial(self._acceptable, parser))
+
+    @staticmethod
+    def _acceptable(parser: JsonOutputParser, message: BaseMessage) -> bool:
+        """
+        Whether a response can be used without repair, so that it may win a hedged race.
+        """
+        if message.response_metadata.get("finish_reason") == "length":
+            return False
+        try:
+            parser.pydantic_object.model_validate_json(strip_code_fence(str(message.content)))
+            return True
+        except ValidationError:
+            return False
+
+    async def _astream_model(self, prompt_value, model: Optional[BaseChatModel] = None) -> AsyncIterator[BaseMessageChunk]:
+        """
+        Stream the response of the model, or the given one, recording the time to first token, total latency and token counts.
+        """
+        chunks = []
+        with stage_timer(self.name, "llm_total"):
+            start = time.perf_counter()
+            try:
+                async for chunk in (model or self.azure_model).astream(prompt_value):
+                    if not chunks:
+                        STAGE_SECONDS.labels(self.name, "llm_ttft").observe(time.perf_counter() - start)
+                    chunks.append(chunk)
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                # A cancelled call, e.g. the slower one of a hedged pair, still used tokens
+                self._record_tokens(prompt_value, chunks)
+                raise
+        self._record_tokens(prompt_value, chunks)
+
+    @staticmethod
+    def _join_chunks(chunks: List[BaseMessageChunk]) -> BaseMessage:
+        """
+        Merge streamed chunks into one message.
+        """
+        if not chunks:
+            return AIMessage(content="")
+        return chunks[0] + chunks[1:] if len(chunks) > 1 else chunks[0]
+
+    def _record_tokens(self, prompt_value, chunks: List[BaseMessageChunk]) -> None:
+        """
+        Count prompt and completion tokens, estimating them when the provider reports no usage.
+        """
+        usage = [chunk.usage_metadata for chunk in chunks if getattr(chunk, "usage_metadata", None)]
+        if usage:
+            prompt_tokens = sum(item["input_tokens"] for item in usage)
+            completion_tokens = sum(item["output_tokens"] for item in usage)
+        else:
+            prompt_tokens = estimate_tokens(prompt_value.to_string())
+            completion_tokens = estimate_tokens("".join(str(chunk.content) for chunk in chunks))
+        LLM_TOKENS.labels(self.name, "prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(self.name, "completion").inc(completion_tokens)
+
+    def _parse(self, parser: JsonOutputParser, message: BaseMessage) -> tuple:
+        """
+        Parse and validate the model's JSON in one pass, repairing it locally if needed.
+
+        The content, unwrapped from a Markdown code fence if it has one, is validated straight
+        from its JSON into the response model with pydantic's JSON mode. Anything else, e.g. a
+        response cut off at the token limit, goes through local repair.
+
+        Returns:
+            tuple: The Quiz or Quizzes, or None if nothing usable could be recovered, and whether it was repaired.
+        """
+        with stage_timer(self.name, "parse"):
+            try:
+                response = parser.pydantic_object.model_validate_json(strip_code_fence(str(message.content)))
+            except ValidationError:
+                response = None
+        valid = response is not None and message.response_metadata.get("finish_reason") != "length"
+        VALIDATION_RESULTS.labels(self.name, "valid" if valid else "invalid").inc()
+        if valid:
+            return response, False
+        with stage_timer(self.name, "repair"):
+            repaired = self.repairer.repair(str(message.content), parser.pydantic_object)
+        return (parser.pydantic_object.model_validate(repaired) if repaired is not None else None), True
+
+    def _fix_up_prompt(self, parser: JsonOutputParser, message: BaseMessage):
+        """
+        Render the prompt asking the model to fix a response that could not be repaired locally.
+        """
+        return self.fix_up_prompt.invoke({
+            "format_instructions": get_compact_format_instructions(parser.pydantic_object),
+            "text": str(message.content),
+        })
+
+    def _unresolved(self, parser: JsonOutputParser, tier: str) -> OutputParserException:
+        """
+        Count a response that is passed on unrecovered and build the error to raise.
+        """
+        self.repairer.record(tier)
+        return OutputParserException(f"The {self.name} model response is not valid JSON for {parser.pydantic_object.__name__}")
+
+    def _resolve(self, parser: JsonOutputParser, prompt_value, message: BaseMessage):
+        """
+        Parse a response, recovering it if it is malformed.
+
+        The tiers are tried from cheapest to most expensive: local repair, a short fix-up
+        prompt (skipped for responses cut off at the token limit, whose content is missing)
+        and regenerating the quiz. A multiple-quiz response is not regenerated here: whatever
+        quizzes were salvaged are returned, or the error is raised, and the fan-out top-up
+        requests only the missing quizzes.
+
+        Raises:
+            OutputParserException: If no tier produced a usable response.
+        """
+        response, repaired = self._parse(parser, message)
+        if not repaired:
+            return response
+        if response is not None:
+            self.repairer.record("local")
+            return response
+        if message.response_metadata.get("finish_reason") != "length":
+            with stage_timer(self.name, "fix_up"):
+                response, _ = self._parse(parser, self._invoke_model(self._fix_up_prompt(parser, message)))
+            if response is not None:
+                self.repairer.record("fix_up")
+                return response
+        if parser is self.quizzes_parser:
+            raise self._unresolved(parser, "regenerate_missing")
+        response, _ = self._parse(parser, self._invoke_model(prompt_value))
+        if response is None:
+            raise self._unresolved(parser, "unresolved")
+        self.repairer.record("regenerate")
+        return response
+
+    async def _aresolve(self, parser: JsonOutputParser, prompt_value, message: BaseMessage):
+        """
+        Asynchronous counterpart of _resolve.
+        """
+        response, repaired = self._parse(parser, message)
+        if not repaired:
+            return response
+        if response is not None:
+            self.repairer.record("local")
+            return response
+        if message.response_metadata.get("finish_reason") != "length":
+            with stage_timer(self.name, "fix_up"):
+                response, _ = self._parse(parser, await self._ainvoke_model(self._fix_up_prompt(parser, message)))
+            if response is not None:
+                self.repairer.record("fix_up")
+                return response
+        if parser is self.quizzes_parser:
+            raise self._unresolved(parser, "regenerate_missing")
+        response, _ = self._parse(parser, await self._ainvoke_model(prompt_value))
+        if response is None:
+            raise self._unresolved(parser, "unresolved")
+        self.repairer.record("regenerate")
+        return response
+
+    def _dedup(self, topic: Topic, response, response_only: bool = False):
+        """
+        Drop the quizzes of a multi-quiz response that repeat each other or, unless response_only is set, earlier quizzes for the topic.
+
+        The caller requests the missing ones again; single-quiz responses are left alone.
+        """
+        if self.deduplicator is None or not isinstance(response, Quizzes):
+            return response
+        with stage_timer(self.name, "dedup"):
+            return response.model_copy(update={"quizzes": self.deduplicator.filter(topic, response.quizzes, response_only)})
+
+    def _observe(self, message: BaseMessage, seconds: float) -> None:
+        """
+        Feed the latency and completion tokens of a multiple-quiz model call to the fan-out planner.
+        """
+        content = str(message.content)
+        usage = getattr(message, "usage_metadata", None)
+        quizzes = content.count(QUESTION_FIELD)
+        if quizzes > 1:
+            tokens = usage["output_tokens"] if usage else estimate_tokens(content)
+            self.planner.observe(quizzes, seconds, tokens)
+
+    def _create_many(self, inputs: dict, num_quizzes: int) -> Quizzes:
+        """
+        Generate num_quizzes quizzes, splitting large requests into parallel parts.
+
+        The parts run through the chain's batch API and their quizzes are merged. Any shortfall,
+        e.g. from near-duplicates that were dropped, a failed part or quizzes that failed the
+        cascade's quality gate, is requested again as additional parts for only the missing
+        quizzes; with a cascade these go straight to the strong model. A shortfall that is left
+        after the last round is logged and counted in the planner stats.
+
+        Args:
+            inputs (dict): The prompt variables other than num_quizzes, plus an optional "bypass_cache" flag.
+            num_quizzes (int): The number of quizzes to generate.
+
+        Returns:
+            Quizzes: The merged quizzes, fewer than num_quizzes if the top-up rounds could not fill the shortfall.
+
+        Raises:
+            Exception: If no quiz is left.
+        """
+        requests, part = self._first_requests(inputs, num_quizzes)
+        quizzes = []
+        results = self.quizzes_chain.batch(requests, return_exceptions=True)
+        chunks, error = self._merge_parts(quizzes, results, num_quizzes, None)
+        for attempt in range(1, self.planner.top_up_rounds + 1):
+            if not chunks:
+                break
+            requests = self._top_up_requests(inputs, chunks, part, attempt)
+            part += len(requests)
+            results = self.quizzes_chain.batch(requests, return_exceptions=True)
+            chunks, error = self._merge_parts(quizzes, results, num_quizzes, error)
+        return self._merged_response(quizzes, error, num_quizzes)
+
+    async def _acreate_many(self, inputs: dict, num_quizzes: int) -> Quizzes:
+        """
+        Asynchronous counterpart of _create_many; the parts run concurrently through abatch.
+        """
+        requests, part = self._first_requests(inputs, num_quizzes)
+        quizzes = []
+        results = await self.quizzes_chain.abatch(requests, return_exceptions=True)
+        chunks, error = self._merge_parts(quizzes, results, num_quizzes, None)
+        for attempt in range(1, self.planner.top_up_rounds + 1):
+            if not chunks:
+                break
+            requests = self._top_up_requests(inputs, chunks, part, attempt)
+            part += len(requests)
+            results = await self.quizzes_chain.abatch(requests, return_exceptions=True)
+            chunks, error = self._merge_parts(quizzes, results, num_quizzes, error)
+        return self._merged_response(quizzes, error, num_quizzes)
+
+    def _first_requests(self, inputs: dict, num_quizzes: int) -> tuple:
+        """
+        Build the chain inputs of the first round: one plain request, or parallel parts for large requests.
+
+        Returns:
+            tuple: The chain inputs and the number of parts used so far.
+        """
+        chunks = self.planner.plan(num_quizzes)
+        if len(chunks) <= 1:
+            return [{**inputs, "num_quizzes": num_quizzes}], 0
+        self.planner.fan_outs += 1
+        return self._part_requests(inputs, chunks, 0), len(chunks)
+
+    def _part_requests(self, inputs: dict, chunks: List[int], part: int) -> List[dict]:
+        """
+        Build the chain inputs for one round of parallel parts, numbering the parts after part.
+        """
+        self.planner.sub_requests += len(chunks)
+        return [
+            {**inputs, "num_quizzes": size, "part": part + i + 1}
+            for i, size in enumerate(chunks)
+        ]
+
+    def _top_up_requests(self, inputs: dict, chunks: List[int], part: int, attempt: int) -> List[dict]:
+        """
+        Build the chain inputs of a top-up round for the missing quizzes.
+
+        Top-ups go straight to the strong model, as quizzes the fast model got wrong are not asked
+        of it again. The last round is de-duplicated only within its own responses, since the
+        history of a popular topic could otherwise drop every quiz it returns.
+        """
+        self.planner.top_ups += 1
+        last = attempt == self.planner.top_up_rounds
+        return self._part_requests({**inputs, "escalate": True, "response_only": last}, chunks, part)
+
+    def _merge_parts(self, quizzes: List[Quiz], results: list, num_quizzes: int, error: Optional[Exception]) -> tuple:
+        """
+        Merge the quizzes of finished parts and plan a top-up for any shortfall.
+
+        Returns:
+            tuple: The chunks of the top-up round (empty when complete) and the last error seen.
+        """
+        for result in results:
+            if isinstance(result, Exception):
+                error = result
+            elif isinstance(result, Quizzes):
+                self.planner.merge(quizzes, result.quizzes, num_quizzes)
+        shortfall = num_quizzes - len(quizzes)
+        if shortfall <= 0:
+            return [], error
+        return self.planner.plan(shortfall), error
+
+    def _merged_response(self, quizzes: List[Quiz], error: Optional[Exception], num_quizzes: int) -> Quizzes:
+        """
+        Return the merged quizzes, reporting a shortfall the top-up rounds could not fill.
+
+        Raises:
+            Exception: The last error of a part, or RuntimeError if no quiz is left, e.g. because
+                every one was dropped as a near-duplicate.
+        """
+        self._report_shortfall(len(quizzes), num_quizzes)
+        if not quizzes:
+            raise error or RuntimeError(f"No {self.name} quiz was left after de-duplication and the top-up rounds")
+        return Quizzes(quizzes=quizzes)
+
+    def _report_shortfall(self, generated: int, num_quizzes: int) -> None:
+        """
+        Log and count a request that ends with fewer quizzes than it asked for.
+        """
+        if generated < num_quizzes:
+            self.planner.shortfalls += 1
+            print(f"Generated {generated} of {num_quizzes} {self.name} quizzes after {self.planner.top_up_rounds} top-up rounds")
+
+    async def _astream_quizzes(self, inputs: dict) -> AsyncIterator[Quiz]:
+        """
+        Stream the quizzes of a multiple-quiz request, yielding each one as soon as it is complete.
+
+        The request is split into the same parts as a non-streaming one and the parts are streamed
+        concurrently. Any shortfall, e.g. from quizzes that were cut off or did not match the schema,
+        or near-duplicates that were dropped, is requested again from the strong model in top-up
+        rounds. Concurrent identical streams share one generation. Only a complete result is
+        cached; if the quizzes are still short after the last round, fewer are yielded.
+
+        Args:
+            inputs (dict): The prompt variables including num_quizzes, plus an optional "bypass_cache" flag.
+
+        Yields:
+            Quiz: Each generated quiz.
+        """
+        _, key, bypass_cache, topic = self._render(self.quizzes_prompt, inputs)
+        if not bypass_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                for quiz in self._from_cache(self.quizzes_parser, cached).quizzes:
+                    yield quiz
+                return
+
+        inputs = dict(inputs)
+        num_quizzes = inputs.pop("num_quizzes")
+        stream = partial(self._astream_many, inputs, num_quizzes, key)
+        quizzes = stream() if self.single_flight is None or inputs.get("bypass_cache") else self.single_flight.stream(key, stream)
+        async for quiz in quizzes:
+            yield quiz
+
+    async def _astream_many(self, inputs: dict, num_quizzes: int, key: str) -> AsyncIterator[Quiz]:
+        """
+        Stream num_quizzes quizzes from parallel parts, then top up any shortfall.
+        """
+        requests, part = self._first_requests(inputs, num_quizzes)
+        quizzes, error = [], None
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def produce(request: dict) -> None:
+            try:
+                async for quiz in self._astream_part(request):
+                    await queue.put(quiz)
+            except Exception as e:
+                await queue.put(e)
+            await queue.put(None)  # Signal that this part is finished
+
+        tasks = [asyncio.create_task(produce(request)) for request in requests]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await queue.get()
+                if item is None:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    error = item
+                else:
+                    merged = len(quizzes)
+                    self.planner.merge(quizzes, [item], num_quizzes)
+                    if len(quizzes) > merged:
+                        yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        shortfall = num_quizzes - len(quizzes)
+        chunks = self.planner.plan(shortfall) if shortfall > 0 else []
+        for attempt in range(1, self.planner.top_up_rounds + 1):
+            if not chunks:
+                break
+            requests = self._top_up_requests(inputs, chunks, part, attempt)
+            part += len(requests)
+            merged = len(quizzes)
+            results = await self.quizzes_chain.abatch(requests, return_exceptions=True)
+            chunks, error = self._merge_parts(quizzes, results, num_quizzes, error)
+            for quiz in quizzes[merged:]:
+                yield quiz
+
+        if not quizzes and error is not None:
+            raise error
+        self._report_shortfall(len(quizzes), num_quizzes)
+        if len(quizzes) == num_quizzes and self.cache is not None:
+            self.cache.set(key, Quizzes(quizzes=quizzes))
+
+    async def _astream_part(self, inputs: dict) -> AsyncIterator[Quiz]:
+        """
+        Stream one multiple-quiz model call, yielding each quiz as soon as it is complete.
+
+        A quiz is complete once the model has started the next one; the response text is only
+        parsed as partial JSON at those points, not on every chunk. Streamed quizzes that do
+        not match the schema are skipped. When the stream ends, the whole response goes through
+        the same parsing and repair as a non-streaming one, and its quizzes that were not
+        streamed yet, including the last one, are yielded.
+        """
+        prompt_value, _, _, topic = self._render(self.quizzes_prompt, inputs)
+        chunks, text, started, done, seen = [], "", 0, 0, set()
+        start = time.perf_counter()
+        async for chunk in self._astream_model(prompt_value):
+            chunks.append(chunk)
+            scanned = max(0, len(text) - len(QUESTION_FIELD) + 1)
+            text += str(chunk.content)
+            started += text.count(QUESTION_FIELD, scanned)
+            if started - 1 <= done:
+                continue
+            try:
+                quizzes = (parse_json_markdown(text) or {}).get("quizzes") or []
+            except (ValueError, AttributeError):
+                continue
+            complete, done = quizzes[done:started - 1], started - 1
+            seen.update(question_key(quiz) for quiz in complete if isinstance(quiz, dict))
+            for quiz in self._dedup(topic, Quizzes(quizzes=self._valid_quizzes(complete))).quizzes:
+                yield await self._acheck(quiz)
+
+        message = self._join_chunks(chunks)
+        self._observe_strong(prompt_value, message, time.perf_counter() - start)
+        response = await self._aresolve(self.quizzes_parser, prompt_value, message)
+        rest = [quiz for quiz in response.quizzes if question_key(quiz) not in seen]
+        for quiz in self._dedup(topic, Quizzes(quizzes=rest)).quizzes:
+            yield await self._acheck(quiz)
+
+    @staticmethod
+    def _valid_quizzes(quizzes: List[dict]) -> List[Quiz]:
+        """
+        Validate the streamed quizzes, dropping the ones that do not match the schema.
+        """
+        valid = []
+        for quiz in quizzes:
+            try:
+                valid.append(Quiz.model_validate(quiz))
+            except ValidationError:
+                continue
+        return valid
+
+    def _check(self, response):
+        """
+        Check a freshly parsed response before it is cached and returned.
+
+        Subclasses override this to verify, repair or replace generated quizzes.
+
+        Args:
+            response: A parsed Quiz or Quizzes.
+
+        Returns:
+            The checked response.
+        """
+        return response
+
+    async def _acheck(self, response):
+        """
+        Asynchronous counterpart of _check.
+        """
+        return response
+
+    @staticmethod
+    def _as_quiz(response) -> Quiz:
+        """
+        Return a response as a Quiz; the pipeline passes models through, dicts (e.g. from the local engine) are validated.
+        """
+        return response if isinstance(response, Quiz) else Quiz.model_validate(response)
+
+    @staticmethod
+    def _as_quizzes(response) -> Quizzes:
+        """
+        Return a response as Quizzes, validating a {"quizzes": [...]} dict.
+        """
+        return response if isinstance(response, Quizzes) else Quizzes.model_validate(response)
+
+    @classmethod
+    def _as_quiz_results(cls, results: list) -> List[Union[Quiz, Exception]]:
+        """
+        Validate the results of a batch, keeping the exceptions of failed cases in their slots.
+        """
+        typed = []
+        for result in results:
+            if not isinstance(result, Exception):
+                try:
+                    result = cls._as_quiz(result)
+                except ValidationError as e:
+                    result = e
+            typed.append(result)
+        return typed
 
     @abstractmethod
     def create_quiz(self):
@@ -68,39 +947,62 @@ class QuizGenerator(ABC):
         """
         pass
 
+    @abstractmethod
+    async def acreate_quiz(self):
+        """
+        Abstract method to create a single quiz asynchronously.
+
+        This method must be implemented by subclasses.
+        """
+        pass
+
+    @abstractmethod
+    async def acreate_quizzes(self, num_quizzes: int):
+        """
+        Abstract method to create multiple quizzes asynchronously.
+
+        Args:
+            num_quizzes (int): The number of quizzes to generate.
+
+        This method must be implemented by subclasses.
+        """
+        pass
+
 class HistoryQuizGenerator(QuizGenerator):
     """
     A quiz generator for creating history quizzes based on given content and keywords.
     """
 
-    def create_quiz(self, content: str, keywords: List[str]) -> Quiz:
+    name = "history"
+    single_quiz_prompt = HISTORY_SINGLE_QUIZ_PROMPT
+    multiple_quizzes_prompt = HISTORY_MULTIPLE_QUIZZES_PROMPT
+    compact_single_quiz_prompt = HISTORY_COMPACT_SINGLE_QUIZ_PROMPT
+    compact_multiple_quizzes_prompt = HISTORY_COMPACT_MULTIPLE_QUIZZES_PROMPT
+
+    def create_quiz(self, content: str, keywords: List[str], bypass_cache: bool = False) -> Quiz:
         """
         Create a single history quiz based on the provided content and keywords.
 
         Args:
             content (str): The content for the quiz.
             keywords (List[str]): A list of keywords related to the content.
+            bypass_cache (bool): Skip the response cache and always call the model.
 
         Returns:
             Quiz: The generated history quiz or an empty quiz object with an error message.
         """
-        prompt_template = ChatPromptTemplate.from_template(
-            HISTORY_SINGLE_QUIZ_PROMPT
-        )
-        chain = prompt_template | self.azure_model | self.quiz_parser
-        
         try:
-            response = chain.invoke({
+            response = self.quiz_chain.invoke({
                 "content": content, 
                 "keywords": keywords,
-                "format_instructions": self.quiz_parser.get_format_instructions()
+                "bypass_cache": bypass_cache,
             })
-            return response
+            return self._as_quiz(response)
         except Exception as e:
             print(f"Error generating history quiz: {e}")
             return Quiz(question="Error generating quiz", options=[])  # Return an empty Quiz object with an error message
 
-    def create_quizzes(self, content: str, keywords: List[str], num_quizzes: int) -> Quizzes:
+    def create_quizzes(self, content: str, keywords: List[str], num_quizzes: int, bypass_cache: bool = False) -> Quizzes:
         """
         Create multiple history quizzes based on the provided content and keywords.
 
@@ -108,74 +1010,394 @@ class HistoryQuizGenerator(QuizGenerator):
             content (str): The content for the quizzes.
             keywords (List[str]): A list of keywords related to the content.
             num_quizzes (int): The number of quizzes to generate.
+            bypass_cache (bool): Skip the response cache and always call the model.
 
         Returns:
             Quizzes: The generated multiple history quizzes or an empty quizzes object with an error message.
         """
-        prompt_template = ChatPromptTemplate.from_template(
-            HISTORY_MULTIPLE_QUIZZES_PROMPT
-        )
-        chain = prompt_template | self.azure_model | self.quizzes_parser
-        
         try:
-            response = chain.invoke({
+            response = self._create_many({
                 "content": content, 
                 "keywords": keywords, 
-                "num_quizzes": num_quizzes,
-                "format_instructions": self.quizzes_parser.get_format_instructions()
+                "bypass_cache": bypass_cache,
+            }, num_quizzes)
+            return self._as_quizzes(response)
+        except Exception as e:
+            print(f"Error generating multiple history quizzes: {e}")
+            return Quizzes(quizzes=[Quiz(question="Error generating quiz", options=[])])  # Return an empty Quizzes object with an error message
+
+    async def acreate_quiz(self, content: str, keywords: List[str], bypass_cache: bool = False) -> Quiz:
+        """
+        Asynchronously create a single history quiz based on the provided content and keywords.
+
+        Args:
+            content (str): The content for the quiz.
+            keywords (List[str]): A list of keywords related to the content.
+            bypass_cache (bool): Skip the response cache and always call the model.
+
+        Returns:
+            Quiz: The generated history quiz or an empty quiz object with an error message.
+        """
+        try:
+            response = await self.quiz_chain.ainvoke({
+                "content": content,
+                "keywords": keywords,
+                "bypass_cache": bypass_cache,
             })
-            return response
+            return self._as_quiz(response)
+        except Exception as e:
+            print(f"Error generating history quiz: {e}")
+            return Quiz(question="Error generating quiz", options=[])  # Return an empty Quiz object with an error message
+
+    async def acreate_quizzes(self, content: str, keywords: List[str], num_quizzes: int, bypass_cache: bool = False) -> Quizzes:
+        """
+        Asynchronously create multiple history quizzes based on the provided content and keywords.
+
+        Args:
+            content (str): The content for the quizzes.
+            keywords (List[str]): A list of keywords related to the content.
+            num_quizzes (int): The number of quizzes to generate.
+            bypass_cache (bool): Skip the response cache and always call the model.
+
+        Returns:
+            Quizzes: The generated multiple history quizzes or an empty quizzes object with an error message.
+        """
+        try:
+            response = await self._acreate_many({
+                "content": content,
+                "keywords": keywords,
+                "bypass_cache": bypass_cache,
+            }, num_quizzes)
+            return self._as_quizzes(response)
         except Exception as e:
             print(f"Error generating multiple history quizzes: {e}")
             return Quizzes(quizzes=[Quiz(question="Error generating quiz", options=[])])  # Return an empty Quizzes object with an error message
 
+    def astream_quizzes(self, content: str, keywords: List[str], num_quizzes: int, bypass_cache: bool = False) -> AsyncIterator[Quiz]:
+        """
+        Stream multiple history quizzes, yielding each quiz as soon as the model has finished it.
+
+        Args:
+            content (str): The content for the quizzes.
+            keywords (List[str]): A list of keywords related to the content.
+            num_quizzes (int): The number of quizzes to generate.
+            bypass_cache (bool): Skip the response cache and always call the model.
+
+        Returns:
+            AsyncIterator[Quiz]: The generated quizzes, in order.
+        """
+        return self._astream_quizzes({
+            "content": content,
+            "keywords": keywords,
+            "num_quizzes": num_quizzes,
+            "bypass_cache": bypass_cache,
+        })
+
+    def create_quiz_batch(self, cases: List[dict], max_concurrency: Optional[int] = None) -> List[Union[Quiz, Exception]]:
+        """
+        Create one history quiz per case, running the cases through the chain's batch API.
+
+        Args:
+            cases (List[dict]): Test cases, each with "content", "keywords" and an optional "bypass_cache".
+            max_concurrency (Optional[int]): Maximum number of LLM calls in flight at once.
+
+        Returns:
+            List[Union[Quiz, Exception]]: One result per case in input order; failed cases hold the raised exception.
+        """
+        return self._as_quiz_results(self.quiz_chain.batch(
+            self._batch_inputs(cases),
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        ))
+
+    async def acreate_quiz_batch(self, cases: List[dict], max_concurrency: Optional[int] = None) -> List[Union[Quiz, Exception]]:
+        """
+        Asynchronously create one history quiz per case, running the cases through the chain's abatch API.
+
+        Args:
+            cases (List[dict]): Test cases, each with "content", "keywords" and an optional "bypass_cache".
+            max_concurrency (Optional[int]): Maximum number of LLM calls in flight at once.
+
+        Returns:
+            List[Union[Quiz, Exception]]: One result per case in input order; failed cases hold the raised exception.
+        """
+        return self._as_quiz_results(await self.quiz_chain.abatch(
+            self._batch_inputs(cases),
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        ))
+
+    @staticmethod
+    def _batch_inputs(cases: List[dict]) -> List[dict]:
+        """
+        Reduce test cases to the chain's input variables.
+        """
+        return [
+            {
+                "content": case["content"],
+                "keywords": case["keywords"],
+                "bypass_cache": case.get("bypass_cache", False),
+            }
+            for case in cases
+        ]
+
 class MathQuizGenerator(QuizGenerator):
     """
     A quiz generator for creating math word quizzes involving linear equations with two variables.
+
+    Every method takes a mode: "llm" asks the language model, "local" builds the quiz with the
+    deterministic LocalMathQuizEngine without any LLM call. LLM-generated quizzes are verified
+    against the system of equations they state before they are cached or returned.
     """
 
-    def create_quiz(self) -> Quiz:
+    name = "math"
+    single_quiz_prompt = MATH_SINGLE_QUIZ_PROMPT
+    multiple_quizzes_prompt = MATH_MULTIPLE_QUIZZES_PROMPT
+    compact_single_quiz_prompt = MATH_COMPACT_SINGLE_QUIZ_PROMPT
+    compact_multiple_quizzes_prompt = MATH_COMPACT_MULTIPLE_QUIZZES_PROMPT
+
+    def __init__(
+        self,
+        *args,
+        local_engine: Optional[LocalMathQuizEngine] = None,
+        verifier: Optional[MathQuizVerifier] = None,
+        regeneration_rounds: int = 1,
+        **kwargs,
+    ):
+        """
+        Initializes the MathQuizGenerator.
+
+        Args:
+            local_engine (Optional[LocalMathQuizEngine]): Engine used for mode="local"; a new one is created when omitted.
+            verifier (Optional[MathQuizVerifier]): Checks LLM-generated quizzes; a new one is created when omitted.
+            regeneration_rounds (int): How often quizzes that fail verification are regenerated with the LLM
+                before they are replaced by locally generated ones.
+            *args, **kwargs: Passed on to QuizGenerator.
+        """
+        super().__init__(*args, **kwargs)
+        self.local_engine = local_engine or LocalMathQuizEngine()
+        self.verifier = verifier or MathQuizVerifier()
+        self.regeneration_rounds = regeneration_rounds
+        # Single-quiz chain without cache or checks, used to regenerate quizzes that fail verification
+        self.regeneration_chain = self.quiz_prompt | self.azure_model | self.quiz_parser
+
+    def _check(self, response):
+        """
+        Verify LLM-generated quizzes and replace only the ones that fail.
+        """
+        quizzes = self._unpack(response)
+        failing = self._verify(quizzes)
+        for _ in range(self.regeneration_rounds):
+            if not failing:
+                break
+            fresh = self.regeneration_chain.batch([{}] * len(failing), return_exceptions=True)
+            failing = self._merge_regenerated(quizzes, failing, fresh)
+        return self._repack(response, quizzes, failing)
+
+    async def _acheck(self, response):
+        """
+        Asynchronous counterpart of _check; the failing quizzes are regenerated concurrently.
+        """
+        quizzes = self._unpack(response)
+        failing = self._verify(quizzes)
+        for _ in range(self.regeneration_rounds):
+            if not failing:
+                break
+            fresh = await self.regeneration_chain.abatch([{}] * len(failing), return_exceptions=True)
+            failing = self._merge_regenerated(quizzes, failing, fresh)
+        return self._repack(response, quizzes, failing)
+
+    def _verify(self, quizzes: List[Quiz]) -> List[int]:
+        """
+        Run the verifier over the quizzes and copy the isCorrect flags it repaired back into them.
+
+        Returns:
+            List[int]: Indexes of the quizzes that failed.
+        """
+        dumped = [quiz.model_dump() for quiz in quizzes]
+        failing = self.verifier.failing(dumped)
+        for quiz, checked in zip(quizzes, dumped):
+            for option, flags in zip(quiz.options, checked["options"]):
+                option.isCorrect = flags["isCorrect"]
+        return failing
+
+    @staticmethod
+    def _unpack(response) -> List[Quiz]:
+        """
+        Return the quizzes of a Quiz or Quizzes response as a list.
+        """
+        return list(response.quizzes) if isinstance(response, Quizzes) else [response]
+
+    def _merge_regenerated(self, quizzes: List[Quiz], failing: List[int], fresh: list) -> List[int]:
+        """
+        Put regenerated quizzes into the failing slots and verify them.
+
+        Returns:
+            List[int]: The slots that still fail.
+        """
+        self.verifier.regenerated += len(failing)
+        slots = []
+        for index, quiz in zip(failing, fresh):
+            try:
+                quizzes[index] = self._as_quiz(quiz)
+                slots.append(index)
+            except ValidationError:
+                continue  # The regeneration call failed or returned something that is not a quiz
+        still_failing = {slots[i] for i in self._verify([quizzes[index] for index in slots])}
+        return [index for index in failing if index in still_failing or index not in slots]
+
+    def _repack(self, response, quizzes: List[Quiz], failing: List[int]):
+        """
+        Replace quizzes that still fail with locally generated ones and rebuild the response.
+        """
+        self.verifier.replaced_locally += len(failing)
+        for index in failing:
+            quizzes[index] = self._as_quiz(self.local_engine.create_quiz())
+        if isinstance(response, Quizzes):
+            return response.model_copy(update={"quizzes": quizzes})
+        return quizzes[0]
+
+    def create_quiz(self, bypass_cache: bool = False, mode: MathQuizMode = "llm") -> Quiz:
         """
         Create a single math quiz.
 
+        Args:
+            bypass_cache (bool): Skip the response cache and always call the model.
+            mode (MathQuizMode): "llm" (default) or "local".
+
         Returns:
             Quiz: The generated math quiz or an empty quiz object with an error message.
         """
-        prompt_template = ChatPromptTemplate.from_template(
-            MATH_SINGLE_QUIZ_PROMPT
-        )
-        chain = prompt_template | self.azure_model | self.quiz_parser
-        
+        if mode == "local":
+            return self._as_quiz(self.local_engine.create_quiz())
         try:
-            response = chain.invoke({
-                "format_instructions": self.quiz_parser.get_format_instructions()
-            })
-            return response
+            response = self.quiz_chain.invoke({"bypass_cache": bypass_cache})
+            return self._as_quiz(response)
         except Exception as e:
             print(f"Error generating math quiz: {e}")
             return Quiz(question="Error generating quiz", options=[])  # Return an empty Quiz object with an error message
 
-    def create_quizzes(self, num_quizzes: int) -> Quizzes:
+    def create_quizzes(self, num_quizzes: int, bypass_cache: bool = False, mode: MathQuizMode = "llm") -> Quizzes:
         """
         Create multiple math quizzes.
 
         Args:
             num_quizzes (int): The number of quizzes to generate.
+            bypass_cache (bool): Skip the response cache and always call the model.
+            mode (MathQuizMode): "llm" (default) or "local".
 
         Returns:
             Quizzes: The generated multiple math quizzes or an empty quizzes object with an error message.
         """
-        prompt_template = ChatPromptTemplate.from_template(
-            MATH_MULTIPLE_QUIZZES_PROMPT
-        )
-        chain = prompt_template | self.azure_model | self.quizzes_parser
-        
+        if mode == "local":
+            return self._as_quizzes(self.local_engine.create_quizzes(num_quizzes))
         try:
-            response = chain.invoke({
-                "num_quizzes": num_quizzes,
-                "format_instructions": self.quizzes_parser.get_format_instructions()
-            })
-            return response
+            response = self._create_many({"bypass_cache": bypass_cache}, num_quizzes)
+            return self._as_quizzes(response)
         except Exception as e:
             print(f"Error generating multiple math quizzes: {e}")
             return Quizzes(quizzes=[Quiz(question="Error generating quiz", options=[])])  # Return an empty Quizzes object with an error message
+
+    async def acreate_quiz(self, bypass_cache: bool = False, mode: MathQuizMode = "llm") -> Quiz:
+        """
+        Asynchronously create a single math quiz.
+
+        Args:
+            bypass_cache (bool): Skip the response cache and always call the model.
+            mode (MathQuizMode): "llm" (default) or "local".
+
+        Returns:
+            Quiz: The generated math quiz or an empty quiz object with an error message.
+        """
+        if mode == "local":
+            return self._as_quiz(self.local_engine.create_quiz())
+        try:
+            response = await self.quiz_chain.ainvoke({"bypass_cache": bypass_cache})
+            return self._as_quiz(response)
+        except Exception as e:
+            print(f"Error generating math quiz: {e}")
+            return Quiz(question="Error generating quiz", options=[])  # Return an empty Quiz object with an error message
+
+    async def acreate_quizzes(self, num_quizzes: int, bypass_cache: bool = False, mode: MathQuizMode = "llm") -> Quizzes:
+        """
+        Asynchronously create multiple math quizzes.
+
+        Args:
+            num_quizzes (int): The number of quizzes to generate.
+            bypass_cache (bool): Skip the response cache and always call the model.
+            mode (MathQuizMode): "llm" (default) or "local".
+
+        Returns:
+            Quizzes: The generated multiple math quizzes or an empty quizzes object with an error message.
+        """
+        if mode == "local":
+            return self._as_quizzes(self.local_engine.create_quizzes(num_quizzes))
+        try:
+            response = await self._acreate_many({"bypass_cache": bypass_cache}, num_quizzes)
+            return self._as_quizzes(response)
+        except Exception as e:
+            print(f"Error generating multiple math quizzes: {e}")
+            return Quizzes(quizzes=[Quiz(question="Error generating quiz", options=[])])  # Return an empty Quizzes object with an error message
+
+    def astream_quizzes(self, num_quizzes: int, bypass_cache: bool = False, mode: MathQuizMode = "llm") -> AsyncIterator[Quiz]:
+        """
+        Stream multiple math quizzes, yielding each quiz as soon as it is finished.
+
+        Args:
+            num_quizzes (int): The number of quizzes to generate.
+            bypass_cache (bool): Skip the response cache and always call the model.
+            mode (MathQuizMode): "llm" (default) or "local".
+
+        Returns:
+            AsyncIterator[Quiz]: The generated quizzes, in order.
+        """
+        if mode == "local":
+            return self._astream_local(num_quizzes)
+        return self._astream_quizzes({
+            "num_quizzes": num_quizzes,
+            "bypass_cache": bypass_cache,
+        })
+
+    async def _astream_local(self, num_quizzes: int) -> AsyncIterator[Quiz]:
+        """
+        Yield locally generated quizzes one at a time.
+        """
+        for quiz in self.local_engine.create_quizzes(num_quizzes)["quizzes"]:
+            yield self._as_quiz(quiz)
+
+# Generator classes available through the process-wide registry
+GENERATOR_TYPES: Dict[str, Type[QuizGenerator]] = {
+    "history": HistoryQuizGenerator,
+    "math": MathQuizGenerator,
+}
+
+# Shared generator instances, one per generator type
+_generator_registry: Dict[str, QuizGenerator] = {}
+
+def get_generator(name: str) -> QuizGenerator:
+    """
+    Return the shared generator for the given type, creating it on first use.
+
+    Args:
+        name (str): The generator type, e.g. "history" or "math".
+
+    Returns:
+        QuizGenerator: The process-wide generator instance.
+    """
+    generator = _generator_registry.get(name)
+    if generator is None:
+        generator = _generator_registry.setdefault(name, GENERATOR_TYPES[name](
+            cache=get_cache(), single_flight=get_single_flight(), deduplicator=get_deduplicator(),
+            hedging=get_hedging_policy(), cascade=get_model_cascade(),
+        ))
+    return generator
+
+def set_generator(name: str, generator: QuizGenerator) -> None:
+    """
+    Replace the shared generator for the given type, e.g. to inject a different model.
+
+    Args:
+        name (str): The generator type, e.g. "history" or "math".
+        generator (QuizGenerator): The generator instance to share.
+    """
+    _generator_registry[name] = generator
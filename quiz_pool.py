@@ -0,0 +1,357 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+import asyncio
+import math
+import os
+import time
+
+from planner import question_key
+from quiz_generator import get_generator
+from quiz_store import get_quiz_store
+from scheduler import admit_bulk
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+class PoolKey(NamedTuple):
+    """
+    Identifies a pool of interchangeable quizzes.
+
+    difficulty None means any difficulty; such a request is served from whichever
+    difficulty of the topic has the most quizzes ready.
+    """
+    subject: str
+    content: str = ""
+    keywords: Tuple[str, ...] = ()
+    difficulty: Optional[str] = None
+
+    @property
+    def topic(self) -> "PoolKey":
+        return self._replace(difficulty=None)
+
+
+def history_key(content: str, keywords: List[str], difficulty: Optional[str] = None) -> PoolKey:
+    """
+    Build the pool key for a history test case, ignoring surrounding whitespace and keyword order.
+    """
+    return PoolKey("history", content.strip(), tuple(sorted(keyword.strip() for keyword in keywords)), difficulty)
+
+
+MATH_KEY = PoolKey("math")
+
+
+def _field(quiz: Any, name: str) -> Any:
+    return quiz.get(name) if isinstance(quiz, dict) else getattr(quiz, name, None)
+
+
+class QuizPool:
+    """
+    Keeps quizzes for popular topics generated ahead of time so they can be served instantly.
+
+    Ready quizzes are held in one deque per topic and difficulty; taking one is a popleft.
+    Background workers refill the pools through the shared generators, always picking the key
+    with the highest demand-weighted shortfall first. Demand is a per-key request rate that
+    decays over time, so topics that stop being requested are no longer refilled ahead of others.
+    """
+
+    def __init__(
+        self,
+        target_depth: Optional[int] = None,
+        refill_batch: Optional[int] = None,
+        workers: Optional[int] = None,
+        demand_half_life: float = 600.0,
+        min_demand: float = 2.0,
+        max_keys: int = 1024,
+        idle_seconds: float = 5.0,
+    ):
+        """
+        Initializes the pool.
+
+        Args:
+            target_depth (Optional[int]): Ready quizzes to keep per key (QUIZ_POOL_TARGET_DEPTH, default 10).
+            refill_batch (Optional[int]): Quizzes requested per refill call (QUIZ_POOL_REFILL_BATCH, default 5).
+            workers (Optional[int]): Concurrent refill workers (QUIZ_POOL_WORKERS, default 2).
+            demand_half_life (float): Seconds after which a request counts half as much towards demand.
+            min_demand (float): Decayed request count from which a topic not kept warm at startup is refilled.
+            max_keys (int): Keys tracked before the least requested ones without ready quizzes are forgotten.
+            idle_seconds (float): How long an idle worker waits before checking the pools again.
+        """
+        self.target_depth = target_depth or int(os.getenv("QUIZ_POOL_TARGET_DEPTH", "10"))
+        self.refill_batch = refill_batch or int(os.getenv("QUIZ_POOL_REFILL_BATCH", "5"))
+        self.workers = workers or int(os.getenv("QUIZ_POOL_WORKERS", "2"))
+        self.demand_half_life = demand_half_life
+        self.min_demand = min_demand
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+        self.pools: Dict[PoolKey, Dict[Optional[str], Deque]] = {}
+        self.seen: Dict[PoolKey, Set[str]] = {}
+        self.demand: Dict[PoolKey, Tuple[float, float]] = {}  # key -> (rate, last update)
+        self.refilling: Set[PoolKey] = set()
+        self.pinned: Set[PoolKey] = set()
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.refill_errors = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, key: PoolKey) -> None:
+        """
+        Start keeping quizzes ready for a key, without counting a request.
+        """
+        if key not in self.demand and len(self.demand) >= self.max_keys:
+            self._forget_idle_keys()
+        self.pools.setdefault(key.topic, {})
+        self.demand.setdefault(key, (0.0, time.monotonic()))
+
+    def _forget_idle_keys(self) -> None:
+        """
+        Drop the least requested half of the keys that have no quizzes ready and are not kept warm.
+        """
+        now = time.monotonic()
+        idle = sorted(
+            (key for key in self.demand if key not in self.pinned and not self.depth(key) and key.topic not in self.refilling),
+            key=lambda key: self._decayed(*self.demand[key], now),
+        )
+        for key in idle[: max(1, len(idle) // 2)]:
+            del self.demand[key]
+        topics = {key.topic for key in self.demand} | self.refilling
+        for topic in [topic for topic in self.pools if topic not in topics and not self.depth(topic)]:
+            del self.pools[topic]
+            self.seen.pop(topic, None)
+
+    def take(self, key: PoolKey) -> Optional[Any]:
+        """
+        Pop a ready quiz for a key, recording the request as demand.
+
+        Args:
+            key (PoolKey): The topic and, optionally, the difficulty requested.
+
+        Returns:
+            Optional[Any]: A quiz, or None if the pool is empty and the caller must generate one live.
+        """
+        quizzes = self.take_many(key, 1)
+        return quizzes[0] if quizzes else None
+
+    def take_many(self, key: PoolKey, count: int) -> List[Any]:
+        """
+        Pop up to count ready quizzes for a key, recording the request as demand.
+
+        Args:
+            key (PoolKey): The topic and, optionally, the difficulty requested.
+            count (int): The number of quizzes wanted.
+
+        Returns:
+            List[Any]: Between 0 and count quizzes; the caller generates the rest live.
+        """
+        self.register(key)
+        self._record_demand(key, count)
+        taken = []
+        while len(taken) < count:
+            ready = self._ready(key)
+            if not ready:
+                break
+            taken.append(ready.popleft())
+        self.hits += len(taken)
+        self.misses += count - len(taken)
+        if len(taken) < count or self.depth(key) < self.target_depth:
+            self._wake()
+        return taken
+
+    def put(self, topic: PoolKey, quizzes: List[Any]) -> int:
+        """
+        Add generated quizzes to a topic's pools, sorted by their difficulty label.
+
+        Error placeholders and questions already generated for the topic are dropped.
+
+        Returns:
+            int: The number of quizzes added.
+        """
+        pools = self.pools.setdefault(topic, {})
+        seen = self.seen.setdefault(topic, set())
+        added = 0
+        for quiz in quizzes:
+            if not _field(quiz, "options"):
+                continue
+            question = question_key({"question": _field(quiz, "question") or ""})
+            if question in seen:
+                self.duplicates += 1
+                continue
+            seen.add(question)
+            difficulty = (_field(quiz, "difficulty") or "").lower()
+            pools.setdefault(difficulty if difficulty in DIFFICULTIES else None, deque()).append(quiz)
+            added += 1
+        self.generated += added
+        return added
+
+    def depth(self, key: PoolKey) -> int:
+        """
+        Number of quizzes ready for a key; for difficulty None, across all difficulties.
+        """
+        pools = self.pools.get(key.topic, {})
+        if key.difficulty is None:
+            return sum(len(ready) for ready in pools.values())
+        return len(pools.get(key.difficulty, ()))
+
+    def _ready(self, key: PoolKey) -> Optional[Deque]:
+        pools = self.pools.get(key.topic, {})
+        if key.difficulty is not None:
+            return pools.get(key.difficulty) or None
+        return max(pools.values(), key=len, default=None) or None
+
+    def _record_demand(self, key: PoolKey, count: int) -> None:
+        now = time.monotonic()
+        rate, updated = self.demand.get(key, (0.0, now))
+        self.demand[key] = (self._decayed(rate, updated, now) + count, now)
+
+    def _decayed(self, rate: float, updated: float, now: float) -> float:
+        return rate * math.pow(0.5, (now - updated) / self.demand_half_life)
+
+    def next_refill(self) -> Optional[PoolKey]:
+        """
+        Pick the key to refill next: the one with the largest shortfall weighted by demand.
+
+        Keys kept warm since startup are refilled even without demand; any other key only
+        while it has been requested at least min_demand times recently.
+
+        Returns:
+            Optional[PoolKey]: The key to refill, or None if every pool is at its target depth.
+        """
+        now = time.monotonic()
+        best, best_priority = None, -1.0
+        for key, (rate, updated) in self.demand.items():
+            shortfall = self.target_depth - self.depth(key)
+            if shortfall <= 0 or key.topic in self.refilling:
+                continue
+            demand = self._decayed(rate, updated, now)
+            if key not in self.pinned and demand < self.min_demand:
+                continue
+            if self.depth(key.topic) >= self.target_depth * len(DIFFICULTIES):
+                continue  # Refills return mixed difficulties; stop before the other ones pile up
+            priority = (1.0 + demand) * shortfall / self.target_depth
+            if priority > best_priority:
+                best, best_priority = key, priority
+        return best
+
+    async def refill(self, key: PoolKey) -> int:
+        """
+        Generate one batch of quizzes for a key's topic through the shared generator.
+
+        The batch is admitted by the shared scheduler as bulk work first, so refills stay within
+        the global token budget and always yield to interactive requests.
+
+        Returns:
+            int: The number of quizzes added to the pool.
+        """
+        topic = key.topic
+        self.refilling.add(topic)
+        try:
+            generator = get_generator(topic.subject)
+            inputs = {"content": topic.content, "keywords": list(topic.keywords)} if topic.subject == "history" else {}
+            await admit_bulk(generator.estimate_cost(inputs, self.refill_batch))
+            if topic.subject == "history":
+                response = await generator.acreate_quizzes(
+                    topic.content, list(topic.keywords), self.refill_batch, bypass_cache=True
+                )
+            else:
+                response = await generator.acreate_quizzes(self.refill_batch, bypass_cache=True)
+            quizzes = list(_field(response, "quizzes") or [])
+            added = self.put(topic, quizzes)
+            store = get_quiz_store()
+            if store is not None:
+                store.record(topic.subject, quizzes, topic.content, list(topic.keywords))
+            if not added:
+                self.refill_errors += 1
+            return added
+        finally:
+            self.refilling.discard(topic)
+
+    async def _worker(self) -> None:
+        while True:
+            key = self.next_refill()
+            if key is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.idle_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                if not await self.refill(key):
+                    await asyncio.sleep(self.idle_seconds)  # Back off while generation keeps failing
+            except Exception as e:
+                print(f"Error refilling quiz pool for {key}: {e}")
+                self.refill_errors += 1
+                await asyncio.sleep(self.idle_seconds)
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self, keys: List[PoolKey] = ()) -> None:
+        """
+        Register keys to keep warm and start the background refill workers on the running loop.
+        """
+        for key in keys:
+            self.register(key)
+            self.pinned.add(key)
+        if not self._tasks:
+            self._wakeup = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """
+        Cancel the background refill workers.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks, self._wakeup = [], None
+
+    def stats(self) -> dict:
+        """
+        Report the pool depths and counters.
+
+        Returns:
+            dict: Hits, misses and hit rate of requests, quizzes generated ahead of time, and the
+            ready depth and current demand per key.
+        """
+        now = time.monotonic()
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "ready": sum(self.depth(topic) for topic in self.pools),
+            "generated": self.generated,
+            "duplicates_dropped": self.duplicates,
+            "refill_errors": self.refill_errors,
+            "workers": len(self._tasks),
+            "keys": {
+                "/".join(filter(None, (key.subject, key.content, ", ".join(key.keywords), key.difficulty))): {
+                    "depth": self.depth(key),
+                    "demand": round(self._decayed(rate, updated, now), 3),
+                }
+                for key, (rate, updated) in self.demand.items()
+            },
+        }
+
+
+# Process-wide quiz pool; its workers are started by the FastAPI lifespan
+_shared_pool: Optional[QuizPool] = None
+
+def get_quiz_pool() -> Optional[QuizPool]:
+    """
+    Return the process-wide quiz pool, creating it on first use.
+
+    Pre-generation spends LLM tokens in the background from the moment the server starts, so it
+    is opt-in: QUIZ_POOL_ENABLED=true enables it; otherwise requests are always generated live.
+
+    Returns:
+        Optional[QuizPool]: The shared pool, or None if it is disabled.
+    """
+    global _shared_pool
+    if _shared_pool is None and os.getenv("QUIZ_POOL_ENABLED", "false").lower() in ("1", "true", "yes"):
+        _shared_pool = QuizPool()
+    return _shared_pool
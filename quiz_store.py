@@ -0,0 +1,393 @@
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from pydantic import BaseModel
+
+# Rows fetched per query while exporting, so an export never holds the whole table in memory
+EXPORT_PAGE_SIZE = 1000
+
+
+class StoredQuiz(NamedTuple):
+    """
+    A quiz queued for storage with the request it was generated for.
+    """
+    generator: str
+    topic: str
+    keywords: Tuple[str, ...]
+    difficulty: Optional[str]
+    question: str
+    quiz: str  # JSON in the schema.Quiz shape
+    created_at: float
+
+
+class QuizFilter(NamedTuple):
+    """
+    Optional conditions for querying and exporting stored quizzes.
+    """
+    topic: Optional[str] = None
+    keyword: Optional[str] = None
+    difficulty: Optional[str] = None
+    generator: Optional[str] = None
+    since: Optional[float] = None
+    until: Optional[float] = None
+
+
+def _to_dict(quiz: Any) -> dict:
+    return quiz.model_dump() if isinstance(quiz, BaseModel) else quiz
+
+
+class QuizStore:
+    """
+    Keeps every generated quiz in SQLite for later lookup and bulk export.
+
+    Writes never block a request: record() only queues the quizzes, and a background thread
+    commits them in batched transactions. The database runs in WAL mode so queries and exports
+    read while the writer commits. Quizzes are indexed by topic, keyword, difficulty, generator
+    type and creation time, and pages are fetched with keyset pagination on the row id, so a
+    page costs the same no matter how deep into the table it is.
+    """
+
+    def __init__(self, path: str = "quiz_store.sqlite3", batch_size: int = 256, flush_interval: float = 1.0):
+        """
+        Initializes the store and creates the tables and indexes if needed.
+
+        Args:
+            path (str): The SQLite database file.
+            batch_size (int): Maximum quizzes committed in one transaction.
+            flush_interval (float): Seconds queued quizzes wait at most before they are committed.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.recorded = 0
+        self.written = 0
+        self.duplicates = 0
+        self.batches = 0
+        self.write_errors = 0
+        self._queue: "queue.Queue[Optional[StoredQuiz]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        # One connection for the writer thread and one for queries, so reads do not wait for commits
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS quizzes (
+                id INTEGER PRIMARY KEY,
+                generator TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                difficulty TEXT,
+                question TEXT NOT NULL,
+                quiz TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                UNIQUE (generator, topic, question)
+            );
+            CREATE TABLE IF NOT EXISTS quiz_keywords (
+                keyword TEXT NOT NULL,
+                quiz_id INTEGER NOT NULL REFERENCES quizzes (id) ON DELETE CASCADE,
+                PRIMARY KEY (keyword, quiz_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS quizzes_topic ON quizzes (topic, id);
+            CREATE INDEX IF NOT EXISTS quizzes_difficulty ON quizzes (difficulty, id);
+            CREATE INDEX IF NOT EXISTS quizzes_generator ON quizzes (generator, id);
+            CREATE INDEX IF NOT EXISTS quizzes_created ON quizzes (created_at, id);
+            CREATE INDEX IF NOT EXISTS quiz_keywords_quiz ON quiz_keywords (quiz_id);
+            """
+        )
+        self._reader = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+
+    def record(self, generator: str, quizzes: List[Any], topic: str = "", keywords: List[str] = ()) -> int:
+        """
+        Queue generated quizzes for storage.
+
+        Error placeholders are skipped. A question already stored for the same generator and
+        topic is not stored again.
+
+        Args:
+            generator (str): The generator type, e.g. "history".
+            quizzes (List[Any]): Quizzes as dicts or schema.Quiz objects.
+            topic (str): The content the quizzes were generated for.
+            keywords (List[str]): The keywords the quizzes were generated for.
+
+        Returns:
+            int: The number of quizzes queued.
+        """
+        now = time.time()
+        queued = 0
+        for quiz in quizzes:
+            quiz = _to_dict(quiz)
+            if not isinstance(quiz, dict) or not quiz.get("options"):
+                continue
+            difficulty = quiz.get("difficulty")
+            self._queue.put(StoredQuiz(
+                generator,
+                topic.strip(),
+                tuple(sorted({keyword.strip() for keyword in keywords})),
+                difficulty.lower() if isinstance(difficulty, str) else None,
+                str(quiz.get("question", "")),
+                json.dumps(quiz),
+                now,
+            ))
+            queued += 1
+        if queued:
+            self.recorded += queued
+            self._ensure_writer()
+        return queued
+
+    def _ensure_writer(self) -> None:
+        if self._writer is None or not self._writer.is_alive():
+            with self._start_lock:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._write_loop, name="quiz-store-writer", daemon=True)
+                    self._writer.start()
+
+    def _write_loop(self) -> None:
+        """
+        Commit queued quizzes in batches until close() queues the stop marker.
+        """
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if stop:
+                return
+
+    def _write(self, batch: List[StoredQuiz]) -> None:
+        """
+        Insert a batch of quizzes and their keywords in one transaction.
+        """
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                written = 0
+                for item in batch:
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO quizzes (generator, topic, difficulty, question, quiz, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (item.generator, item.topic, item.difficulty, item.question, item.quiz, item.created_at),
+                    )
+                    if not cursor.rowcount:
+                        continue
+                    written += 1
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO quiz_keywords (keyword, quiz_id) VALUES (?, ?)",
+                        [(keyword, cursor.lastrowid) for keyword in item.keywords],
+                    )
+                self._conn.execute("COMMIT")
+            self.written += written
+            self.duplicates += len(batch) - written
+            self.batches += 1
+        except sqlite3.Error as e:
+            print(f"Error writing {len(batch)} quizzes to the quiz store: {e}")
+            self.write_errors += 1
+            with self._lock:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+
+    def flush(self, timeout: float = 30.0) -> None:
+        """
+        Wait until every quiz queued so far has been committed.
+        """
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout)
+        if not self._queue.empty():
+            self._ensure_writer()
+
+    def close(self) -> None:
+        """
+        Commit the queued quizzes and close the database.
+        """
+        self.flush()
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)  # Quizzes recorded during the flush
+            self._writer.join()
+        with self._lock:
+            self._conn.close()
+        with self._read_lock:
+            self._reader.close()
+
+    def _where(self, filters: QuizFilter, before_id: Optional[int]) -> Tuple[str, list]:
+        """
+        Build the FROM, WHERE and ORDER BY clauses for a filtered, keyset-paginated query.
+
+        With a keyword filter the pages are walked along the keyword index, which already holds
+        the quiz ids of a keyword in order, so SQLite does not have to sort.
+        """
+        clauses, params = [], []
+        source, order = "quizzes q", "q.id"
+        if filters.keyword is not None:
+            source, order = "quiz_keywords k JOIN quizzes q ON q.id = k.quiz_id", "k.quiz_id"
+            clauses.append("k.keyword = ?")
+            params.append(filters.keyword)
+        for column in ("topic", "difficulty", "generator"):
+            value = getattr(filters, column)
+            if value is not None:
+                clauses.append(f"q.{column} = ?")
+                params.append(value)
+        if filters.since is not None:
+            clauses.append("q.created_at >= ?")
+            params.append(filters.since)
+        if filters.until is not None:
+            clauses.append("q.created_at < ?")
+            params.append(filters.until)
+        if before_id is not None:
+            clauses.append(f"{order} < ?")
+            params.append(before_id)
+        return source + (" WHERE " + " AND ".join(clauses) if clauses else "") + f" ORDER BY {order} DESC", params
+
+    def query(self, filters: QuizFilter = QuizFilter(), cursor: Optional[int] = None, limit: int = 50) -> Tuple[List[dict], Optional[int]]:
+        """
+        Fetch one page of stored quizzes, newest first.
+
+        Args:
+            filters (QuizFilter): Conditions the quizzes must match.
+            cursor (Optional[int]): The next_cursor of the previous page, or None for the first page.
+            limit (int): Maximum quizzes per page.
+
+        Returns:
+            Tuple[List[dict], Optional[int]]: The stored quizzes with their metadata, and the cursor
+            of the next page (None on the last page).
+        """
+        source, params = self._where(filters, cursor)
+        with self._read_lock:
+            rows = self._reader.execute(
+                f"SELECT q.id, q.generator, q.topic, q.difficulty, q.quiz, q.created_at FROM {source} LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+            keywords = self._keywords([row[0] for row in rows[:limit]])
+        records = [
+            {
+                "id": row[0],
+                "generator": row[1],
+                "topic": row[2],
+                "keywords": keywords.get(row[0], []),
+                "difficulty": row[3],
+                "created_at": row[5],
+                "quiz": json.loads(row[4]),
+            }
+            for row in rows[:limit]
+        ]
+        return records, records[-1]["id"] if len(rows) > limit else None
+
+    def topic_quizzes(self, generator: str, topic: str, keywords: Tuple[str, ...], limit: int) -> List[dict]:
+        """
+        Fetch the quizzes most recently stored for exactly one request: a generator, topic and keyword set.
+
+        Args:
+            generator (str): The generator type, e.g. "history".
+            topic (str): The content the quizzes were generated for.
+            keywords (Tuple[str, ...]): The keywords the quizzes were generated for.
+            limit (int): Maximum quizzes returned.
+
+        Returns:
+            List[dict]: The quizzes, newest first.
+        """
+        with self._read_lock:
+            rows = self._reader.execute(
+                """
+                SELECT q.quiz FROM quizzes q
+                WHERE q.generator = ? AND q.topic = ? AND IFNULL((
+                    SELECT group_concat(keyword, char(31)) FROM (
+                        SELECT keyword FROM quiz_keywords WHERE quiz_id = q.id ORDER BY keyword
+                    )
+                ), '') = ?
+                ORDER BY q.id DESC LIMIT ?
+                """,
+                (generator, topic.strip(), "\x1f".join(sorted({keyword.strip() for keyword in keywords})), limit),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def _keywords(self, ids: List[int]) -> dict:
+        if not ids:
+            return {}
+        keywords = {}
+        rows = self._reader.execute(
+            f"SELECT quiz_id, keyword FROM quiz_keywords WHERE quiz_id IN ({', '.join('?' * len(ids))})", ids
+        )
+        for quiz_id, keyword in rows:
+            keywords.setdefault(quiz_id, []).append(keyword)
+        return keywords
+
+    def export(self, filters: QuizFilter = QuizFilter()) -> Iterator[str]:
+        """
+        Stream every matching quiz as JSON Lines, one page at a time.
+
+        Args:
+            filters (QuizFilter): Conditions the quizzes must match.
+
+        Yields:
+            str: One stored quiz with its metadata per line.
+        """
+        cursor = None
+        while True:
+            records, cursor = self.query(filters, cursor, EXPORT_PAGE_SIZE)
+            for record in records:
+                yield json.dumps(record) + "\n"
+            if cursor is None:
+                return
+
+    def __len__(self) -> int:
+        with self._read_lock:
+            return self._reader.execute("SELECT COUNT(*) FROM quizzes").fetchone()[0]
+
+    def stats(self) -> dict:
+        """
+        Report the store counters.
+
+        Returns:
+            dict: Quizzes recorded, written, skipped as duplicates and still queued, the number of
+            write transactions and failed writes, and the stored total.
+        """
+        return {
+            "recorded": self.recorded,
+            "written": self.written,
+            "duplicates": self.duplicates,
+            "pending": self._queue.qsize(),
+            "batches": self.batches,
+            "write_errors": self.write_errors,
+            "stored": len(self),
+        }
+
+
+# Process-wide quiz store
+_shared_store: Optional[QuizStore] = None
+_shared_store_loaded = False
+
+def get_quiz_store() -> Optional[QuizStore]:
+    """
+    Return the process-wide quiz store configured from the environment, creating it on first use.
+
+    QUIZ_STORE_PATH sets the database file (default quiz_store.sqlite3); QUIZ_STORE_ENABLED=false
+    disables storing generated quizzes.
+
+    Returns:
+        Optional[QuizStore]: The shared store, or None if it is disabled.
+    """
+    global _shared_store, _shared_store_loaded
+    if not _shared_store_loaded:
+        if os.getenv("QUIZ_STORE_ENABLED", "true").lower() not in ("0", "false", "no"):
+            _shared_store = QuizStore(os.getenv("QUIZ_STORE_PATH", "quiz_store.sqlite3"))
+        _shared_store_loaded = True
+    return _shared_store
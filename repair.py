@@ -0,0 +1,157 @@
+from typing import Any, Dict, List, Optional, Type
+import json
+import re
+
+from pydantic import BaseModel, ValidationError
+
+from schema import Quiz, Quizzes
+
+# The JSON inside a Markdown code fence; an unterminated fence runs to the end of the text
+CODE_FENCE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL)
+# A comma directly before a closing bracket, which JSON does not allow
+TRAILING_COMMA = re.compile(r",(\s*[}\]])")
+
+# How a response that could not be used as returned was recovered, in the order the tiers are tried;
+# "regenerate_missing" leaves the missing quizzes of a multiple-quiz response to the fan-out top-up
+TIERS = ("local", "fix_up", "regenerate", "regenerate_missing")
+
+_decoder = json.JSONDecoder(strict=False)
+
+
+def _clean(text: str) -> str:
+    """
+    Drop code fences, prose before the JSON and trailing commas.
+    """
+    fenced = CODE_FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        return ""
+    return TRAILING_COMMA.sub(r"\1", text[min(starts):])
+
+
+def _decode(text: str, start: int = 0) -> Optional[tuple]:
+    """
+    Decode the complete JSON value at start, ignoring anything after it.
+
+    Returns:
+        Optional[tuple]: The value and the index after it, or None if it is malformed or cut off.
+    """
+    try:
+        return _decoder.raw_decode(text, start)
+    except json.JSONDecodeError:
+        return None
+
+
+def strip_code_fence(text: str) -> str:
+    """
+    Return the content of a Markdown code fence, or the text unchanged if it has none.
+    """
+    if "```" not in text:
+        return text
+    return CODE_FENCE.search(text).group(1)
+
+
+def _complete_items(text: str) -> List[Any]:
+    """
+    Decode the complete elements of the quiz array of a response that is cut off or broken
+    part way through, stopping at the first element that is not valid JSON.
+    """
+    key = text.find('"quizzes"')
+    start = text.find("[", key if key >= 0 else 0)
+    if start < 0:
+        return []
+    items, index = [], start + 1
+    while True:
+        while index < len(text) and text[index] in " \t\r\n,":
+            index += 1
+        decoded = _decode(text, index)
+        if decoded is None:
+            return items
+        item, index = decoded
+        items.append(item)
+
+
+def is_valid(value: Any, pydantic_object: Type[BaseModel]) -> bool:
+    """
+    Check a parsed response against its schema.
+    """
+    try:
+        pydantic_object.model_validate(value)
+        return True
+    except ValidationError:
+        return False
+
+
+class ResponseRepairer:
+    """
+    Recovers usable quizzes from malformed model responses and counts how each failure was resolved.
+
+    repair() is the cheap local tier: it strips code fences and surrounding prose, removes
+    trailing commas and ignores text after the JSON. For a multiple-quiz response that is cut
+    off or broken part way through, the complete quizzes before the damage are salvaged. The
+    generators try a short fix-up prompt and regeneration when local repair finds nothing usable,
+    and record which tier resolved the failure.
+    """
+
+    def __init__(self):
+        self.failures = 0
+        self.resolved: Dict[str, int] = {tier: 0 for tier in TIERS}
+        self.unresolved = 0
+        self.salvaged = 0
+
+    def repair(self, text: str, pydantic_object: Type[BaseModel]) -> Optional[Any]:
+        """
+        Repair a response locally.
+
+        Args:
+            text (str): The raw model output.
+            pydantic_object (Type[BaseModel]): schema.Quiz or schema.Quizzes.
+
+        Returns:
+            Optional[Any]: The repaired response; for Quizzes only the valid quizzes. None if
+            nothing usable was found.
+        """
+        text = _clean(text)
+        decoded = _decode(text) if text else None
+        value = decoded[0] if decoded else None
+        if pydantic_object is not Quizzes:
+            return value if value is not None and is_valid(value, pydantic_object) else None
+
+        if isinstance(value, dict) and isinstance(value.get("quizzes"), list):
+            items = value["quizzes"]
+        elif isinstance(value, list):
+            items = value
+        else:
+            items = _complete_items(text)
+        quizzes = [item for item in items if is_valid(item, Quiz)]
+        if not quizzes:
+            return None
+        self.salvaged += len(quizzes)
+        return {"quizzes": quizzes}
+
+    def record(self, tier: str) -> None:
+        """
+        Count a failed response and the tier that resolved it, or "unresolved".
+        """
+        self.failures += 1
+        if tier in self.resolved:
+            self.resolved[tier] += 1
+        else:
+            self.unresolved += 1
+
+    def stats(self) -> dict:
+        """
+        Report how often each recovery tier resolved a malformed response.
+
+        Returns:
+            dict: Responses that needed recovery, how many each tier resolved, how many were not
+            resolved, and the quizzes salvaged locally.
+        """
+        return {
+            "failures": self.failures,
+            **{f"resolved_{tier}": count for tier, count in self.resolved.items()},
+            "unresolved": self.unresolved,
+            "quizzes_salvaged": self.salvaged,
+        }
@@ -0,0 +1,240 @@
+from typing import Dict, List, Literal, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+
+from model_router import get_model_router
+
+# Priority classes, served in this order
+Priority = Literal["interactive", "bulk"]
+PRIORITIES: Tuple[Priority, ...] = ("interactive", "bulk")
+
+
+class SchedulerOverloaded(Exception):
+    """
+    Raised when a request would wait longer than its priority class allows.
+    """
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Token budget exhausted, retry in {math.ceil(retry_after)} seconds")
+        self.retry_after = retry_after
+
+
+class AdmissionScheduler:
+    """
+    Admits generation requests against a global tokens-per-minute budget.
+
+    The budget is a token bucket that refills continuously at tpm / 60 tokens per second and holds
+    at most burst_seconds worth of tokens. A request is charged its estimated token cost when it is
+    admitted. Requests that cannot be admitted at once wait in a queue ordered by priority class,
+    so interactive requests always go before queued bulk work. A request whose expected wait
+    exceeds its class's limit is rejected straight away with the time after which a retry should
+    succeed, instead of queuing until the client times out.
+    """
+
+    def __init__(
+        self,
+        tpm: float,
+        burst_seconds: float = 10.0,
+        max_wait: Optional[Dict[str, float]] = None,
+        bulk_tokens: Optional[int] = None,
+    ):
+        """
+        Initializes the scheduler.
+
+        Args:
+            tpm (float): Tokens per minute admitted on average.
+            burst_seconds (float): Seconds of budget that may be spent at once after an idle period.
+            max_wait (Optional[Dict[str, float]]): Longest expected queueing time per priority class
+                before a request is rejected (QUIZ_SCHEDULER_INTERACTIVE_WAIT, default 5, and
+                QUIZ_SCHEDULER_BULK_WAIT, default 60).
+            bulk_tokens (Optional[int]): Estimated cost from which a request without an explicit
+                priority counts as bulk (QUIZ_SCHEDULER_BULK_TOKENS, default 8000).
+        """
+        self.rate = tpm / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.max_wait = max_wait or {
+            "interactive": float(os.getenv("QUIZ_SCHEDULER_INTERACTIVE_WAIT", "5")),
+            "bulk": float(os.getenv("QUIZ_SCHEDULER_BULK_WAIT", "60")),
+        }
+        self.bulk_tokens = bulk_tokens or int(os.getenv("QUIZ_SCHEDULER_BULK_TOKENS", "8000"))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._queue: List[tuple] = []  # (priority rank, arrival, cost, future)
+        self._arrivals = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.rejected = {priority: 0 for priority in PRIORITIES}
+        self.queued = {priority: 0 for priority in PRIORITIES}
+        self.wait_seconds = {priority: 0.0 for priority in PRIORITIES}
+        self.tokens_admitted = 0
+
+    def classify(self, cost: int, requested: Optional[str] = None) -> Priority:
+        """
+        Pick the priority class of a request: the requested one, or bulk for expensive requests.
+        """
+        if requested in PRIORITIES:
+            return requested
+        return "bulk" if cost >= self.bulk_tokens else "interactive"
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _fits(self, cost: float) -> bool:
+        # Requests larger than the bucket are admitted once it is full and leave it in debt
+        return self.tokens >= min(cost, self.capacity)
+
+    def _expected_wait(self, cost: float, rank: int) -> float:
+        """
+        Seconds until the bucket has refilled enough for this request and every queued one ahead of it.
+        """
+        ahead = sum(entry[2] for entry in self._queue if entry[0] <= rank and not entry[3].done())
+        return max(0.0, ahead + min(cost, self.capacity) - self.tokens) / self.rate
+
+    async def acquire(self, cost: int, priority: Priority = "interactive") -> None:
+        """
+        Wait until a request may be sent to the model and charge its estimated tokens.
+
+        Args:
+            cost (int): The estimated prompt and completion tokens of the request.
+            priority (Priority): "interactive" or "bulk".
+
+        Raises:
+            SchedulerOverloaded: If the expected wait exceeds the limit of the priority class.
+        """
+        if cost <= 0:
+            return
+        self._refill()
+        rank = PRIORITIES.index(priority)
+        if not any(entry[0] <= rank and not entry[3].done() for entry in self._queue) and self._fits(cost):
+            self._admit(cost, priority)
+            return
+        wait = self._expected_wait(cost, rank)
+        if wait > self.max_wait[priority]:
+            self.rejected[priority] += 1
+            raise SchedulerOverloaded(wait)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (rank, next(self._arrivals), cost, future))
+        self.queued[priority] += 1
+        start = time.monotonic()
+        try:
+            self._schedule()
+            await future
+        finally:
+            self.queued[priority] -= 1
+            if not future.done():
+                future.cancel()  # The client went away; _dispatch skips it
+        self.wait_seconds[priority] += time.monotonic() - start
+
+    def _admit(self, cost: float, priority: Priority) -> None:
+        self.tokens -= cost
+        self.tokens_admitted += cost
+        self.admitted[priority] += 1
+
+    def _dispatch(self) -> None:
+        """
+        Admit queued requests in priority order while the bucket has tokens for them.
+        """
+        self._timer = None
+        self._refill()
+        while self._queue:
+            rank, _, cost, future = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            if not self._fits(cost):
+                break
+            heapq.heappop(self._queue)
+            self._admit(cost, PRIORITIES[rank])
+            future.set_result(None)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        """
+        Wake the dispatcher once the bucket holds enough tokens for the request at the head of the queue.
+        """
+        if self._timer is not None or not self._queue:
+            return
+        _, _, cost, _ = self._queue[0]
+        delay = max(0.0, min(cost, self.capacity) - self.tokens) / self.rate
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def stats(self) -> dict:
+        """
+        Report the admission counters.
+
+        Returns:
+            dict: Tokens available and admitted, and requests admitted, rejected and queued with
+            their mean queueing time, per priority class.
+        """
+        self._refill()
+        stats = {
+            "tpm": self.rate * 60,
+            "tokens_available": round(self.tokens),
+            "tokens_admitted": round(self.tokens_admitted),
+        }
+        for priority in PRIORITIES:
+            stats[f"{priority}_admitted"] = self.admitted[priority]
+            stats[f"{priority}_rejected"] = self.rejected[priority]
+            stats[f"{priority}_queued"] = self.queued[priority]
+            stats[f"{priority}_mean_wait_seconds"] = (
+                self.wait_seconds[priority] / self.admitted[priority] if self.admitted[priority] else 0.0
+            )
+        return stats
+
+
+def budget_from_env() -> float:
+    """
+    The tokens-per-minute budget: QUIZ_SCHEDULER_TPM, or the sum of the budgets of the routed
+    deployments when every one of them has one.
+    """
+    if os.getenv("QUIZ_SCHEDULER_TPM"):
+        return float(os.getenv("QUIZ_SCHEDULER_TPM"))
+    router = get_model_router()
+    budgets = [deployment["tpm"] for deployment in router.stats().values()] if router is not None else []
+    return float(sum(budgets)) if budgets and all(budgets) else 0.0
+
+
+# Process-wide scheduler shared by the API routes, quiz jobs, pool refills and bulk generation
+_shared_scheduler: Optional[AdmissionScheduler] = None
+
+def get_scheduler() -> Optional[AdmissionScheduler]:
+    """
+    Return the process-wide admission scheduler, creating it on first use.
+
+    Returns:
+        Optional[AdmissionScheduler]: The shared scheduler, or None if no tokens-per-minute budget is configured.
+    """
+    global _shared_scheduler
+    if _shared_scheduler is None:
+        tpm = budget_from_env()
+        if tpm > 0:
+            _shared_scheduler = AdmissionScheduler(tpm)
+    return _shared_scheduler
+
+
+async def admit_bulk(cost: int) -> None:
+    """
+    Wait until the shared scheduler, if any, admits background work of the given cost.
+
+    Background work is never dropped: while the expected wait exceeds the bulk limit, it is
+    retried after the suggested delay.
+
+    Args:
+        cost (int): The estimated prompt and completion tokens of the work.
+    """
+    scheduler = get_scheduler()
+    if scheduler is None:
+        return
+    while True:
+        try:
+            await scheduler.acquire(cost, "bulk")
+            return
+        except SchedulerOverloaded as e:
+            await asyncio.sleep(e.retry_after)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 
 
 class Option(BaseModel):
@@ -15,6 +15,9 @@ class Option(BaseModel):
 class Quiz(BaseModel):
     question: str = Field(..., description="The content of the question.")
     options: List[Option] = Field(..., description="Four options of the question.")
+    difficulty: Optional[str] = Field(
+        None, description="The difficulty level of the question: easy, medium or hard."
+    )
 
 
 class Quizzes(BaseModel):
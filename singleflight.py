@@ -0,0 +1,146 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import asyncio
+
+
+class _SharedStream:
+    """
+    The items a coalesced stream has produced so far, and whether it has finished.
+    """
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.error: Optional[BaseException] = None
+        self.finished = False
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        """
+        Wake the callers waiting for the next item; each wait uses the event current when it started.
+        """
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight call.
+
+    The first caller for a key (the leader) starts the work as its own task; callers that arrive
+    while it is running (followers) await the same task and receive the same result or exception.
+    Because the work runs in a separate task, a cancelled caller does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func once for all concurrent callers with the same key.
+
+        Args:
+            key (str): Identifies calls that can share a result.
+            func (Callable[[], Awaitable[Any]]): Starts the work when no call for key is in flight.
+
+        Returns:
+            Any: The result of the shared call.
+        """
+        task = self._inflight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.followers += 1
+        else:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.leaders += 1
+        return await asyncio.shield(task)
+
+    async def stream(self, key: str, func: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Run the stream func once for all concurrent callers with the same key.
+
+        The leader's stream is consumed by its own task; every caller receives all of its
+        items in order, so a follower that arrives late first gets the items produced so far.
+
+        Args:
+            key (str): Identifies streams that can share their items.
+            func (Callable[[], AsyncIterator[Any]]): Starts the stream when none for key is in flight.
+
+        Yields:
+            Any: The items of the shared stream.
+        """
+        shared = self._streams.get(key)
+        if shared is not None and shared.task.get_loop() is asyncio.get_running_loop():
+            self.followers += 1
+        else:
+            shared = _SharedStream()
+            self._streams[key] = shared
+            shared.task = asyncio.ensure_future(self._pump(key, shared, func))
+            self.leaders += 1
+        index = 0
+        while True:
+            changed = shared.changed
+            while index < len(shared.items):
+                yield shared.items[index]
+                index += 1
+            if shared.finished:
+                if shared.error is not None:
+                    raise shared.error
+                return
+            await changed.wait()
+
+    async def _pump(self, key: str, shared: _SharedStream, func: Callable[[], AsyncIterator[Any]]) -> None:
+        """
+        Consume a shared stream, publishing each item to its callers.
+        """
+        try:
+            async for item in func():
+                shared.items.append(item)
+                shared.notify()
+        except BaseException as e:  # Passed on to the callers, including a cancellation
+            shared.error = e
+        finally:
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+            shared.finished = True
+            shared.notify()
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        """
+        Forget a finished call so the next caller starts a new one.
+        """
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark the exception as retrieved if every caller went away
+
+    def stats(self) -> dict:
+        """
+        Report the coalescing counters.
+
+        Returns:
+            dict: Calls that ran (leaders), calls served a coalesced result (followers) and calls in flight.
+        """
+        calls = self.leaders + self.followers
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "coalesced_rate": self.followers / calls if calls else 0.0,
+            "in_flight": len(self._inflight) + len(self._streams),
+        }
+
+
+# Process-wide coalescer shared by the registered generators
+_shared_single_flight = SingleFlight()
+
+def get_single_flight() -> SingleFlight:
+    """
+    Return the process-wide request coalescer.
+
+    Returns:
+        SingleFlight: The shared coalescer.
+    """
+    return _shared_single_flight
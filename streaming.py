@@ -0,0 +1,54 @@
+from typing import Any, AsyncIterator, Literal
+
+from pydantic import BaseModel
+import orjson
+
+StreamFormat = Literal["ndjson", "sse"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+
+def _encode_model(value: Any) -> Any:
+    """
+    Let orjson encode pydantic models, e.g. the quizzes inside an event.
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def encode_event(data: Any, stream_format: StreamFormat) -> str:
+    """
+    Encode one streamed item as an NDJSON line or a server-sent event.
+
+    Args:
+        data (Any): The item to send; pydantic models are encoded as JSON objects.
+        stream_format (StreamFormat): "ndjson" or "sse".
+
+    Returns:
+        str: The encoded item, including its trailing delimiter.
+    """
+    payload = orjson.dumps(data, default=_encode_model).decode()
+    if stream_format == "sse":
+        return f"data: {payload}\n\n"
+    return payload + "\n"
+
+
+async def encode_stream(items: AsyncIterator[Any], stream_format: StreamFormat) -> AsyncIterator[str]:
+    """
+    Encode an async stream of items, closing SSE streams with a "done" event.
+
+    Args:
+        items (AsyncIterator[Any]): The items to send.
+        stream_format (StreamFormat): "ndjson" or "sse".
+
+    Yields:
+        str: The encoded items.
+    """
+    async for item in items:
+        yield encode_event(item, stream_format)
+    if stream_format == "sse":
+        yield "event: done\ndata: {}\n\n"
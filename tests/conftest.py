@@ -0,0 +1,41 @@
+"""
+Shared helpers for the unit tests.
+
+The tests run offline: generators answer from benchmarks.fake_llm.FakeQuizChatModel, and the
+components that keep state on disk or in the background are switched off unless a test builds
+its own instance.
+"""
+from pathlib import Path
+from typing import Type
+import os
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import benchmarks  # noqa: E402,F401  (placeholder Azure settings)
+
+os.environ.setdefault("QUIZ_POOL_ENABLED", "false")
+os.environ.setdefault("QUIZ_JOBS_ENABLED", "false")
+os.environ.setdefault("QUIZ_STORE_ENABLED", "false")
+
+from benchmarks.fake_llm import FakeQuizChatModel  # noqa: E402
+
+
+class CountingModel(FakeQuizChatModel):
+    """
+    Counts the calls that reach the model.
+    """
+
+    calls: int = 0
+
+    def respond(self, messages) -> str:
+        self.calls += 1
+        return super().respond(messages)
+
+
+def fake_model(model_type: Type[FakeQuizChatModel] = FakeQuizChatModel, **kwargs) -> FakeQuizChatModel:
+    """
+    A fake chat model that answers within a few milliseconds; kwargs override its settings.
+    """
+    settings = {"ttft_ms": 1.0, "ttft_sigma": 0.0, "tokens_per_second": 1_000_000.0, "seed": 1}
+    return model_type(**{**settings, **kwargs})
@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+from cache import MemoryCache, SQLiteCache, make_cache_key
+from quiz_generator import HistoryQuizGenerator
+from schema import Quiz
+
+from conftest import CountingModel, fake_model
+
+QUIZ = Quiz(question="Who posted the Ninety-five Theses?", options=[{"content": "Luther", "reason": "r", "isCorrect": True}])
+
+
+def test_key_covers_prompt_and_deployment():
+    key = make_cache_key("prompt", "gpt-4o")
+    assert key == make_cache_key("prompt", "gpt-4o")
+    assert key != make_cache_key("prompt", "gpt-4o-mini")
+    assert key != make_cache_key("prompt ", "gpt-4o")
+
+
+def test_memory_cache_expires_entries_after_the_ttl():
+    cache = MemoryCache(ttl=0.05)
+    cache.set("key", QUIZ)
+    assert cache.get("key") is QUIZ
+    time.sleep(0.06)
+    assert cache.get("key") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_memory_cache_evicts_the_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+def test_sqlite_cache_is_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    SQLiteCache(path).set("key", QUIZ)
+    assert Quiz.model_validate(SQLiteCache(path).get("key")) == QUIZ
+
+
+def test_sqlite_cache_expires_entries_after_the_ttl(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), ttl=0.05)
+    cache.set("key", QUIZ)
+    time.sleep(0.06)
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_generator_serves_equivalent_requests_from_the_cache():
+    model = fake_model(CountingModel)
+    generator = HistoryQuizGenerator(llm_model=model, cache=MemoryCache())
+
+    async def run():
+        first = await generator.acreate_quiz("Reformation", ["Martin Luther", "Roman Catholic Church"])
+        again = await generator.acreate_quiz(" Reformation ", ["Martin Luther ", "Roman Catholic Church"])
+        other = await generator.acreate_quiz("Reformation", ["Calvin"])
+        fresh = await generator.acreate_quiz("Reformation", ["Martin Luther", "Roman Catholic Church"], bypass_cache=True)
+        return first, again, other, fresh
+
+    first, again, other, fresh = asyncio.run(run())
+    assert again == first
+    assert other != first and fresh != first
+    assert model.calls == 3
+    assert generator.cache.hits == 1
+
+
+class OtherDeployment(CountingModel):
+    """
+    A model that the generator names differently, as it would a second deployment.
+    """
+
+
+def test_generators_with_different_models_do_not_share_entries():
+    cache = MemoryCache()
+    first = HistoryQuizGenerator(llm_model=fake_model(CountingModel), cache=cache)
+    second = HistoryQuizGenerator(llm_model=fake_model(OtherDeployment), cache=cache)
+    first.create_quiz("Reformation", ["Martin Luther"])
+    second.create_quiz("Reformation", ["Martin Luther"])
+    assert first.azure_model.calls == second.azure_model.calls == 1
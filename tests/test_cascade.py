@@ -0,0 +1,105 @@
+import asyncio
+import copy
+import re
+
+from cascade import ModelCascade, quality_issue
+from quiz_generator import HistoryQuizGenerator
+from schema import Quiz, Quizzes
+
+from conftest import CountingModel, fake_model
+
+QUIZ = {
+    "question": "Who posted the Ninety-five Theses?",
+    "options": [
+        {"content": "Martin Luther", "reason": "He posted them in Wittenberg in 1517.", "isCorrect": True},
+        {"content": "John Calvin", "reason": "He led the Reformation in Geneva.", "isCorrect": False},
+        {"content": "Pope Leo X", "reason": "He excommunicated Luther.", "isCorrect": False},
+        {"content": "Charles V", "reason": "He presided over the Diet of Worms.", "isCorrect": False},
+    ],
+}
+
+
+def flawed(change) -> Quiz:
+    quiz = copy.deepcopy(QUIZ)
+    change(quiz["options"])
+    return Quiz.model_validate(quiz)
+
+
+class FlawedModel(CountingModel):
+    """
+    Marks every option of every second history quiz correct.
+    """
+
+    def _quiz(self, prompt: str, math: bool) -> dict:
+        quiz = super()._quiz(prompt, math)
+        if int(re.search(r"variant (\d+)", quiz["question"]).group(1)) % 2:
+            for option in quiz["options"]:
+                option["isCorrect"] = True
+        return quiz
+
+
+class AlwaysFlawedModel(CountingModel):
+    """
+    Marks every option of every history quiz correct.
+    """
+
+    def _quiz(self, prompt: str, math: bool) -> dict:
+        quiz = super()._quiz(prompt, math)
+        for option in quiz["options"]:
+            option["isCorrect"] = True
+        return quiz
+
+
+def test_quality_issues():
+    assert quality_issue(Quiz.model_validate(QUIZ)) is None
+    assert quality_issue(flawed(lambda options: options[1].update(isCorrect=True))) == "correct_options"
+    assert quality_issue(flawed(lambda options: options[2].update(content=" martin  LUTHER"))) == "distinct_options"
+    assert quality_issue(flawed(lambda options: options.pop())) == "distinct_options"
+    assert quality_issue(flawed(lambda options: options[3].update(reason=" "))) == "empty_reason"
+
+
+def test_gate_keeps_only_the_passing_quizzes():
+    cascade = ModelCascade(fake_model(), cost_ratio=0.2)
+    bad = flawed(lambda options: options[1].update(isCorrect=True))
+    kept = cascade.gate(Quizzes(quizzes=[Quiz.model_validate(QUIZ), bad]), multiple=True, seconds=0.1, tokens=100)
+    assert kept.quizzes == [Quiz.model_validate(QUIZ)]
+    assert (cascade.quizzes_passed, cascade.quizzes_failed, cascade.served["fast"]) == (1, 1, 1)
+
+
+def test_gate_escalates_what_cannot_be_served():
+    cascade = ModelCascade(fake_model())
+    bad = flawed(lambda options: options[3].update(reason=""))
+    assert cascade.gate(bad, multiple=False, seconds=0.1, tokens=100) is None
+    assert cascade.gate(None, multiple=False, seconds=0.1, tokens=50) is None
+    assert cascade.escalated == 2
+    assert cascade.wasted_tokens == 150
+    assert cascade.issues["empty_reason"] == cascade.issues["schema"] == 1
+
+
+def test_generator_serves_passing_quizzes_from_the_fast_model():
+    fast, strong = fake_model(CountingModel), fake_model(CountingModel)
+    generator = HistoryQuizGenerator(llm_model=strong, cascade=ModelCascade(fast))
+    quiz = asyncio.run(generator.acreate_quiz("Reformation", ["Martin Luther"]))
+    assert quality_issue(quiz) is None
+    assert (fast.calls, strong.calls) == (1, 0)
+
+
+def test_generator_escalates_failing_quizzes_to_the_strong_model():
+    fast, strong = fake_model(AlwaysFlawedModel), fake_model(CountingModel)
+    cascade = ModelCascade(fast)
+    generator = HistoryQuizGenerator(llm_model=strong, cascade=cascade)
+    quiz = generator.create_quiz("Reformation", ["Martin Luther"])
+    assert quality_issue(quiz) is None
+    assert (fast.calls, strong.calls) == (1, 1)
+    assert cascade.served == {"fast": 0, "strong": 1}
+
+
+def test_generator_tops_up_failing_quizzes_of_a_batch_from_the_strong_model():
+    fast, strong = fake_model(FlawedModel), fake_model(CountingModel)
+    cascade = ModelCascade(fast)
+    generator = HistoryQuizGenerator(llm_model=strong, cascade=cascade)
+    response = asyncio.run(generator.acreate_quizzes("Reformation", ["Martin Luther"], 4))
+    assert len(response.quizzes) == 4
+    assert all(quality_issue(quiz) is None for quiz in response.quizzes)
+    assert cascade.quizzes_failed > 0
+    assert strong.calls == generator.planner.top_ups
@@ -0,0 +1,128 @@
+import asyncio
+import copy
+
+import numpy as np
+
+from benchmarks.fake_llm import FakeQuizChatModel
+from dedup import PRIME, MinHasher, QuizDeduplicator, shingles
+from quiz_generator import HistoryQuizGenerator
+
+from conftest import fake_model
+
+TOPIC = ("history", "Reformation", ("Martin Luther",))
+OTHER_TOPIC = ("history", "World War II", ("J. Robert Oppenheimer",))
+
+
+def quizzes(count: int, seed: int = 1) -> list:
+    model = fake_model(seed=seed)
+    return [model._quiz('Based on the following content: "Reformation"', math=False) for _ in range(count)]
+
+
+def reworded(quiz: dict) -> dict:
+    copied = copy.deepcopy(quiz)
+    copied["options"].reverse()
+    copied["question"] = copied["question"].replace("Which statement", "What statement")
+    return copied
+
+
+def test_signature_matches_exact_integer_arithmetic():
+    hasher = MinHasher(120)
+    hashes = np.array([0xFFFFFFFF, 0xFFFFFFFE, 12345, PRIME, PRIME + 3], dtype=np.uint64)
+    exact = [
+        min((int(a) * (int(value) % PRIME) + int(b)) % PRIME for value in hashes)
+        for a, b in zip(hasher.a[:, 0], hasher.b[:, 0])
+    ]
+    assert hasher.signature(hashes).tolist() == exact
+
+
+def test_shingles_ignore_option_order():
+    quiz = quizzes(1)[0]
+    shuffled = copy.deepcopy(quiz)
+    shuffled["options"].reverse()
+    assert set(shingles(quiz).tolist()) == set(shingles(shuffled).tolist())
+
+
+def test_drops_reworded_copies_and_keeps_distinct_quizzes():
+    deduplicator = QuizDeduplicator()
+    fresh = quizzes(5)
+    kept = deduplicator.filter(TOPIC, fresh + [reworded(fresh[0])])
+    assert kept == fresh
+    assert deduplicator.stats()["duplicates"] == 1
+
+
+def test_remembers_quizzes_per_topic():
+    deduplicator = QuizDeduplicator()
+    first = quizzes(3)
+    deduplicator.filter(TOPIC, first)
+    assert deduplicator.filter(TOPIC, [reworded(first[1])]) == []
+    assert deduplicator.filter(OTHER_TOPIC, [reworded(first[1])]) == [reworded(first[1])]
+
+
+def test_threshold_decides_what_counts_as_a_duplicate():
+    quiz = quizzes(1)[0]
+    changed = copy.deepcopy(quiz)
+    changed["options"][0]["content"] = "An entirely different statement about guild charters"
+    assert QuizDeduplicator(threshold=0.45).filter(TOPIC, [quiz, changed]) == [quiz]
+    assert QuizDeduplicator(threshold=0.99).filter(TOPIC, [quiz, changed]) == [quiz, changed]
+
+
+def test_response_only_ignores_earlier_quizzes_but_remembers_the_kept_ones():
+    deduplicator = QuizDeduplicator()
+    earlier = quizzes(2)
+    deduplicator.filter(TOPIC, earlier)
+    fresh = [reworded(earlier[0]), reworded(reworded(earlier[0])), reworded(earlier[1])]
+    kept = deduplicator.filter(TOPIC, fresh, response_only=True)
+    assert kept == [fresh[0], fresh[2]]
+    assert len(deduplicator.indexes[TOPIC]) == 4
+
+
+def test_seeds_a_topic_from_its_history_once():
+    stored = quizzes(3, seed=7)
+    loads = []
+
+    def history(topic):
+        loads.append(topic)
+        return stored
+
+    deduplicator = QuizDeduplicator(history=history)
+    fresh = quizzes(2)
+    assert deduplicator.filter(TOPIC, [reworded(stored[0])] + fresh) == fresh
+    deduplicator.filter(TOPIC, quizzes(2, seed=8))
+    assert loads == [TOPIC]
+    assert deduplicator.stats()["seeded"] == 3
+
+
+def test_history_errors_start_the_topic_empty():
+    def history(topic):
+        raise OSError("database is locked")
+
+    fresh = quizzes(2)
+    assert QuizDeduplicator(history=history).filter(TOPIC, fresh) == fresh
+
+
+class RepeatingModel(FakeQuizChatModel):
+    """
+    Answers every history prompt with rewordings of the same quiz.
+    """
+
+    def _quiz(self, prompt: str, math: bool) -> dict:
+        quiz = super()._quiz(prompt, math)
+        quiz["question"] = f"Which statement about the printing press is accurate? (variant {next(self._serial)})"
+        for option, content in zip(quiz["options"], ("Luther", "Calvin", "Zwingli", "Knox")):
+            option["content"] = f"{content} used the printing press to spread his writings"
+        return quiz
+
+
+def test_generator_reports_a_shortfall_it_cannot_top_up():
+    generator = HistoryQuizGenerator(llm_model=fake_model(RepeatingModel), deduplicator=QuizDeduplicator())
+    response = asyncio.run(generator.acreate_quizzes("Reformation", ["Martin Luther"], 4, bypass_cache=True))
+    assert 0 < len(response.quizzes) < 4
+    assert generator.planner.shortfalls == 1
+    assert generator.planner.top_ups == generator.planner.top_up_rounds
+
+
+def test_generator_fills_the_request_with_distinct_quizzes():
+    generator = HistoryQuizGenerator(llm_model=fake_model(), deduplicator=QuizDeduplicator())
+    response = asyncio.run(generator.acreate_quizzes("Reformation", ["Martin Luther"], 6, bypass_cache=True))
+    assert len(response.quizzes) == 6
+    assert generator.planner.shortfalls == 0
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from hedging import HedgingPolicy
+from quiz_generator import HistoryQuizGenerator
+
+from conftest import CountingModel, fake_model
+
+
+def warmed_up(budget: float, samples: int = 5, seconds: float = 0.01) -> HedgingPolicy:
+    """
+    A policy that has observed enough calls of kind "quiz" to hedge them after about seconds.
+    """
+    policy = HedgingPolicy(percentile=95.0, budget=budget, min_samples=samples)
+    for _ in range(samples):
+        policy.calls += 1
+        policy.tokens += 100
+        policy.observe("quiz", seconds)
+    return policy
+
+
+def attempts(*seconds: float):
+    """
+    A call whose successive attempts take the given times and return their attempt number.
+    """
+    started = []
+
+    async def call():
+        attempt = len(started)
+        started.append(attempt)
+        await asyncio.sleep(seconds[attempt])
+        return attempt
+
+    return call, started
+
+
+def test_calls_are_not_hedged_until_enough_were_observed():
+    policy = HedgingPolicy(min_samples=3, budget=1.0)
+    call, started = attempts(0.05)
+    assert asyncio.run(policy.run("quiz", call, cost=100)) == 0
+    assert policy.delay("quiz") is None
+    assert policy.hedged == 0 and len(started) == 1
+
+
+def test_a_slow_call_gets_a_backup_that_wins():
+    policy = warmed_up(budget=0.5)
+    call, started = attempts(0.2, 0.001)
+    assert asyncio.run(policy.run("quiz", call, cost=100)) == 1
+    assert len(started) == 2
+    assert (policy.hedged, policy.backup_wins, policy.backup_tokens) == (1, 1, 100)
+
+
+def test_backups_stay_within_the_budget():
+    policy = warmed_up(budget=0.1)
+    call, started = attempts(0.05, 0.001)
+    assert asyncio.run(policy.run("quiz", call, cost=100)) == 0
+    assert len(started) == 1
+    assert (policy.hedged, policy.over_budget) == (0, 1)
+
+
+def test_budget_counts_the_backups_already_sent():
+    policy = warmed_up(budget=0.25)
+    for expected in (1, 1, 0):
+        call, _ = attempts(0.05, 0.001)
+        assert asyncio.run(policy.run("quiz", call, cost=100)) == expected
+    assert (policy.hedged, policy.over_budget) == (2, 1)
+    assert policy.backup_tokens <= policy.budget * policy.tokens
+
+
+def test_an_unacceptable_result_does_not_win_the_race():
+    policy = warmed_up(budget=1.0)
+    call, _ = attempts(0.05, 0.001)
+    assert asyncio.run(policy.run("quiz", call, cost=100, accept=lambda attempt: attempt == 0)) == 0
+    assert policy.backup_wins == 0
+
+
+def test_a_failed_attempt_leaves_the_race_to_the_other():
+    policy = warmed_up(budget=1.0)
+    started = []
+
+    async def call():
+        started.append(1)
+        if len(started) == 1:
+            await asyncio.sleep(0.05)
+            raise ConnectionError("reset by peer")
+        await asyncio.sleep(0.1)
+        return "backup"
+
+    assert asyncio.run(policy.run("quiz", call, cost=100)) == "backup"
+
+
+def test_the_error_is_raised_when_every_attempt_fails():
+    policy = warmed_up(budget=1.0)
+
+    async def call():
+        await asyncio.sleep(0.03)
+        raise ConnectionError("reset by peer")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(policy.run("quiz", call, cost=100))
+
+
+def test_generator_hedges_slow_model_calls_within_the_budget():
+    model = fake_model(CountingModel, ttft_ms=5.0, ttft_sigma=1.0)
+    policy = HedgingPolicy(percentile=50.0, budget=0.2, min_samples=5)
+    generator = HistoryQuizGenerator(llm_model=model, hedging=policy)
+
+    async def run():
+        return [await generator.acreate_quiz("Reformation", ["Martin Luther"], bypass_cache=True) for _ in range(40)]
+
+    quizzes = asyncio.run(run())
+    assert all(quiz.options for quiz in quizzes)
+    assert policy.hedged > 0
+    assert model.calls <= 40 + policy.hedged  # A losing attempt may be cancelled before it reaches the model
+    assert policy.backup_tokens <= policy.budget * policy.tokens
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+import quiz_generator
+from jobs import JobRunner, JobStore
+from quiz_generator import HistoryQuizGenerator, MathQuizGenerator
+
+from conftest import fake_model
+
+ITEMS = [
+    ("history", {"content": "Reformation", "keywords": ["Martin Luther"]}),
+    ("history", {"content": "World War II", "keywords": ["J. Robert Oppenheimer"]}),
+    ("math", {}),
+    ("math", {"mode": "local"}),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def generators(monkeypatch):
+    def use(**settings):
+        model = fake_model(**settings)
+        monkeypatch.setattr(quiz_generator, "_generator_registry", {
+            "history": HistoryQuizGenerator(llm_model=model),
+            "math": MathQuizGenerator(llm_model=model),
+        })
+    use()
+    return use
+
+
+def run_until_finished(runner: JobRunner, job_id: str) -> dict:
+    async def run():
+        runner.start()
+        try:
+            for _ in range(500):
+                job = runner.store.job(job_id)
+                if not job["pending"]:
+                    return job
+                await asyncio.sleep(0.01)
+            raise TimeoutError(f"Job {job_id} did not finish")
+        finally:
+            await runner.stop()
+
+    return asyncio.run(run())
+
+
+def test_store_keeps_pending_items_across_reopening(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    store = JobStore(path)
+    job_id = store.create(ITEMS)
+    store.finish(job_id, 1, "done", {"question": "Q?", "options": []})
+    store.retry(job_id, 2)
+    store.close()
+
+    reopened = JobStore(path)
+    pending = reopened.pending()
+    assert [(index, subject, attempts) for _, index, subject, _, attempts in pending] == [
+        (0, "history", 0), (2, "math", 1), (3, "math", 0),
+    ]
+    assert pending[0][3] == ITEMS[0][1]
+    assert reopened.job(job_id)["status"] == "running"
+    assert [item["index"] for item in reopened.results(job_id)] == [1]
+    reopened.close()
+
+
+def test_results_page_in_completion_order(store):
+    job_id = store.create(ITEMS)
+    for index in (2, 0, 3, 1):
+        store.finish(job_id, index, "done", {"question": f"Q{index}", "options": []})
+    first = store.results(job_id, limit=2)
+    assert [item["index"] for item in first] == [2, 0]
+    assert [item["index"] for item in store.results(job_id, after=first[-1]["seq"])] == [3, 1]
+    assert store.job(job_id)["status"] == "completed"
+
+
+def test_runner_resumes_the_items_left_pending(store, generators):
+    job_id = store.create(ITEMS)
+    store.finish(job_id, 0, "done", {"question": "Q?", "options": [{"content": "a", "reason": "r", "isCorrect": True}]})
+
+    runner = JobRunner(store, workers=2)
+    job = run_until_finished(runner, job_id)
+    assert runner.resumed == 3
+    assert job["done"] == 4
+    assert all(item["quiz"]["options"] for item in store.results(job_id))
+
+
+def test_runner_runs_submitted_jobs(store, generators):
+    runner = JobRunner(store, workers=2)
+
+    async def run():
+        runner.start()
+        job_id = runner.submit([case for subject, case in ITEMS if subject == "history"], [{"mode": "local"}])["job_id"]
+        await runner.stop()
+        return job_id
+
+    job_id = asyncio.run(run())
+    assert run_until_finished(JobRunner(store, workers=2), job_id)["done"] == 3
+
+
+def test_items_that_keep_failing_are_marked_failed(store, generators):
+    generators(error_rate=1.0)
+    job_id = store.create(ITEMS[:2])
+    runner = JobRunner(store, workers=2, max_attempts=2)
+    job = run_until_finished(runner, job_id)
+    assert job["failed"] == 2
+    assert runner.retried == 2
+    assert all(item["quiz"]["question"] == "Error generating quiz" for item in store.results(job_id))
+
+
+def test_worker_survives_a_failed_store_write(store, generators, monkeypatch):
+    job_id = store.create(ITEMS[2:])
+    finish = store.finish
+    calls = []
+
+    def flaky_finish(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise OSError("disk I/O error")
+        finish(*args)
+
+    monkeypatch.setattr(store, "finish", flaky_finish)
+    runner = JobRunner(store, workers=1, max_attempts=2, store_retry_seconds=0.0)
+    job = run_until_finished(runner, job_id)
+    assert job["done"] == 2
+    assert runner.store_errors == 1
@@ -0,0 +1,113 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fake_llm import FakeQuizChatModel
+from model_router import Deployment, ModelRouter
+from quiz_generator import HistoryQuizGenerator
+
+from conftest import CountingModel, fake_model
+
+PROMPT = [HumanMessage(content='Based on the following content: "Reformation"')]
+
+
+class StatusError(Exception):
+    """
+    An API error carrying an HTTP status and, optionally, a Retry-After header.
+    """
+
+    def __init__(self, status_code: int, retry_after: str = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        if retry_after is not None:
+            self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+class FailingModel(CountingModel):
+    """
+    Fails every call with the given HTTP status before streaming anything.
+    """
+
+    status_code: int = 429
+
+    def respond(self, messages) -> str:
+        self.calls += 1
+        raise StatusError(self.status_code)
+
+
+def router(*models: FakeQuizChatModel, **kwargs) -> ModelRouter:
+    return ModelRouter([Deployment(f"deployment-{i}", model) for i, model in enumerate(models)], **kwargs)
+
+
+def test_weights_scale_the_load_of_a_deployment():
+    now = time.monotonic()
+    light = Deployment("light", fake_model(), weight=1.0, max_concurrency=4)
+    heavy = Deployment("heavy", fake_model(), weight=2.0, max_concurrency=4)
+    assert heavy.load(100, now) == light.load(100, now) / 2
+
+
+def test_a_deployment_over_its_token_budget_takes_no_calls():
+    now = time.monotonic()
+    deployment = Deployment("small", fake_model(), tpm=1000)
+    deployment.usage.append([now, 900])
+    deployment.tokens_in_window = 900
+    assert deployment.load(200, now) is None
+    assert deployment.load(50, now) is not None
+
+
+def test_rate_limited_deployment_is_ejected_and_the_call_retried_elsewhere():
+    failing, healthy = fake_model(FailingModel), fake_model(CountingModel)
+    models = router(failing, healthy, backoff_seconds=30.0)
+    assert models.invoke(PROMPT).content
+    assert models.invoke(PROMPT).content
+    stats = models.stats()
+    assert (failing.calls, healthy.calls) == (1, 2)
+    assert stats["deployment-0"]["ejections"] == 1
+    assert not stats["deployment-0"]["healthy"]
+    assert stats["deployment-0"]["ejected_seconds"] == pytest.approx(30.0, abs=1.0)
+
+
+def test_backoff_grows_exponentially_up_to_the_limit():
+    models = router(fake_model(), backoff_seconds=1.0, max_backoff_seconds=3.0)
+    deployment = models._deployments[0]
+    backoffs = []
+    for _ in range(3):
+        deployment.ejected_until = 0.0  # The previous ejection ran out
+        models._failed(deployment, StatusError(503))
+        backoffs.append(deployment.ejected_until - time.monotonic())
+    assert backoffs == pytest.approx([1.0, 2.0, 3.0], abs=0.1)
+
+
+def test_retry_after_extends_the_backoff():
+    models = router(fake_model(), backoff_seconds=1.0)
+    deployment = models._deployments[0]
+    models._failed(deployment, StatusError(429, retry_after="20"))
+    assert deployment.ejected_until - time.monotonic() == pytest.approx(20.0, abs=0.1)
+
+
+def test_failures_while_ejected_do_not_extend_the_backoff():
+    models = router(fake_model(), backoff_seconds=1.0)
+    deployment = models._deployments[0]
+    models._failed(deployment, StatusError(429))
+    ejected_until = deployment.ejected_until
+    assert models._failed(deployment, StatusError(429))
+    assert deployment.ejected_until == ejected_until
+    assert deployment.ejections == 1
+
+
+def test_client_errors_are_raised_without_retrying():
+    failing, healthy = fake_model(FailingModel, status_code=400), fake_model(CountingModel)
+    models = router(failing, healthy)
+    with pytest.raises(StatusError):
+        models.invoke(PROMPT)
+    assert (failing.calls, healthy.calls) == (1, 0)
+    assert models.stats()["deployment-0"]["healthy"]
+
+
+def test_generator_keeps_serving_through_an_ejected_deployment():
+    models = router(fake_model(FailingModel), fake_model(), backoff_seconds=30.0)
+    generator = HistoryQuizGenerator(llm_model=models)
+    quizzes = generator.create_quizzes("Reformation", ["Martin Luther"], 3, bypass_cache=True)
+    assert len(quizzes.quizzes) == 3
@@ -0,0 +1,98 @@
+import asyncio
+import json
+from typing import Any, Callable, List
+
+from benchmarks.fake_llm import FakeQuizChatModel
+from quiz_generator import HistoryQuizGenerator
+from repair import ResponseRepairer
+from schema import Quiz, Quizzes
+
+from conftest import fake_model
+
+QUIZ = {"question": "Who posted the Ninety-five Theses?", "options": [{"content": "Luther", "reason": "r", "isCorrect": True}]}
+
+
+class DamagingModel(FakeQuizChatModel):
+    """
+    Passes its next responses through the queued damage functions, e.g. to cut them off.
+    """
+
+    damage: List[Callable[[str], str]] = []
+
+    def respond(self, messages) -> str:
+        text = super().respond(messages)
+        return self.damage.pop(0)(text) if self.damage else text
+
+
+def not_json(text: str) -> str:
+    return "I am sorry, but I cannot answer that in JSON."
+
+
+def after_quizzes(count: int) -> Callable[[str], str]:
+    """
+    Cut a Quizzes response off in the middle of the quiz after the first count quizzes.
+    """
+    def cut(text: str) -> str:
+        start = 0
+        for _ in range(count + 1):
+            start = text.index('{"question"', start) + 1
+        return text[:start + 20]
+    return cut
+
+
+def generate(damage: List[Callable[[str], str]], num_quizzes: int = 1) -> tuple:
+    generator = HistoryQuizGenerator(llm_model=fake_model(DamagingModel, damage=damage))
+    if num_quizzes == 1:
+        response: Any = asyncio.run(generator.acreate_quiz("Reformation", ["Martin Luther"], bypass_cache=True))
+    else:
+        response = asyncio.run(generator.acreate_quizzes("Reformation", ["Martin Luther"], num_quizzes, bypass_cache=True))
+    return response, generator
+
+
+def test_strips_fences_prose_and_trailing_commas():
+    text = 'Sure! ```json\n{"question": "Q?", "options": [{"content": "a", "reason": "r", "isCorrect": true},],}\n``` Hope it helps'
+    assert ResponseRepairer().repair(text, Quiz) == {"question": "Q?", "options": [{"content": "a", "reason": "r", "isCorrect": True}]}
+
+
+def test_salvages_the_complete_quizzes_of_a_cut_off_response():
+    repairer = ResponseRepairer()
+    text = '{"quizzes": [' + json.dumps(QUIZ) + ", " + json.dumps(QUIZ) + ', {"question": "Wh'
+    assert repairer.repair(text, Quizzes) == {"quizzes": [QUIZ, QUIZ]}
+    assert repairer.salvaged == 2
+
+
+def test_returns_none_when_nothing_is_usable():
+    repairer = ResponseRepairer()
+    assert repairer.repair('{"question": "Q?"', Quiz) is None
+    assert repairer.repair("no JSON here", Quizzes) is None
+
+
+def test_local_tier_repairs_without_another_call():
+    quiz, generator = generate([lambda text: f"Here is the quiz:\n```json\n{text[:-1]},}}\n```"])
+    assert quiz.options
+    assert generator.repairer.resolved["local"] == 1
+
+
+def test_fix_up_tier_asks_the_model_to_fix_the_json():
+    quiz, generator = generate([not_json])
+    assert quiz.options
+    assert generator.repairer.resolved["fix_up"] == 1
+
+
+def test_regenerate_tier_requests_the_quiz_again():
+    quiz, generator = generate([not_json, not_json])
+    assert quiz.options
+    assert generator.repairer.resolved["regenerate"] == 1
+
+
+def test_unresolved_response_becomes_the_error_placeholder():
+    quiz, generator = generate([not_json, not_json, not_json])
+    assert quiz.question == "Error generating quiz"
+    assert generator.repairer.unresolved == 1
+
+
+def test_missing_quizzes_of_a_cut_off_response_are_topped_up():
+    response, generator = generate([after_quizzes(2)], num_quizzes=4)
+    assert len(response.quizzes) == 4
+    assert generator.repairer.resolved["local"] == 1
+    assert generator.planner.top_ups == 1
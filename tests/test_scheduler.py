@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import scheduler
+from quiz_generator import HistoryQuizGenerator, MathQuizGenerator
+from scheduler import AdmissionScheduler, SchedulerOverloaded, admit_bulk
+
+from conftest import fake_model
+
+# 100 tokens per second, 1000 tokens of burst
+TPM = 6000
+MAX_WAIT = {"interactive": 1.0, "bulk": 10.0}
+
+
+def test_classifies_expensive_requests_as_bulk():
+    budget = AdmissionScheduler(TPM, bulk_tokens=8000)
+    assert budget.classify(500) == "interactive"
+    assert budget.classify(9000) == "bulk"
+    assert budget.classify(9000, "interactive") == "interactive"
+    assert budget.classify(500, "bulk") == "bulk"
+
+
+def test_admits_within_the_burst_at_once():
+    async def run():
+        budget = AdmissionScheduler(TPM, max_wait=MAX_WAIT)
+        await asyncio.wait_for(budget.acquire(600), timeout=0.1)
+        await asyncio.wait_for(budget.acquire(400, "bulk"), timeout=0.1)
+        return budget.stats()
+
+    stats = asyncio.run(run())
+    assert stats["interactive_admitted"] == 1
+    assert stats["bulk_admitted"] == 1
+    assert stats["tokens_admitted"] == 1000
+
+
+def test_queued_interactive_requests_go_before_bulk_work():
+    async def run():
+        budget = AdmissionScheduler(TPM, max_wait=MAX_WAIT)
+        await budget.acquire(1000)
+        order = []
+
+        async def request(priority):
+            await budget.acquire(40, priority)
+            order.append(priority)
+
+        bulk = asyncio.create_task(request("bulk"))
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(request("interactive"))
+        await asyncio.gather(bulk, interactive)
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "bulk"]
+
+
+def test_rejects_when_the_expected_wait_is_too_long():
+    async def run():
+        budget = AdmissionScheduler(TPM, max_wait=MAX_WAIT)
+        await budget.acquire(1000)
+        with pytest.raises(SchedulerOverloaded) as rejected:
+            await budget.acquire(500)
+        return budget, rejected.value
+
+    budget, error = asyncio.run(run())
+    assert error.retry_after == pytest.approx(5.0, abs=0.1)
+    assert budget.rejected["interactive"] == 1
+
+
+def test_bulk_work_waits_instead_of_being_rejected(monkeypatch):
+    async def run():
+        budget = AdmissionScheduler(TPM, max_wait={"interactive": 1.0, "bulk": 0.1})
+        monkeypatch.setattr(scheduler, "_shared_scheduler", budget)
+        await budget.acquire(1000)
+        await asyncio.wait_for(admit_bulk(20), timeout=2.0)
+        return budget
+
+    budget = asyncio.run(run())
+    assert budget.rejected["bulk"] >= 1
+    assert budget.admitted["bulk"] == 1
+
+
+def test_route_answers_429_with_retry_after(monkeypatch):
+    import app
+    import quiz_generator
+
+    model = fake_model()
+    monkeypatch.setattr(quiz_generator, "_generator_registry", {
+        "history": HistoryQuizGenerator(llm_model=model),
+        "math": MathQuizGenerator(llm_model=model),
+    })
+    monkeypatch.setattr(scheduler, "_shared_scheduler", AdmissionScheduler(60, burst_seconds=1.0, max_wait=MAX_WAIT))
+    with TestClient(app.app) as client:
+        assert client.post("/generate/math/", json={"bypass_cache": True}).status_code == 200
+        response = client.post("/generate/math/", json={"bypass_cache": True})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 1
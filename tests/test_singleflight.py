@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from quiz_generator import HistoryQuizGenerator
+from singleflight import SingleFlight
+
+from conftest import CountingModel, fake_model
+
+
+def test_concurrent_calls_share_one_result():
+    flight = SingleFlight()
+    started = []
+
+    async def work():
+        started.append(1)
+        await asyncio.sleep(0.01)
+        return object()
+
+    async def run():
+        return await asyncio.gather(*[flight.do("key", work) for _ in range(5)])
+
+    results = asyncio.run(run())
+    assert len(started) == 1
+    assert all(result is results[0] for result in results)
+    assert (flight.leaders, flight.followers) == (1, 4)
+
+
+def test_errors_reach_every_caller_and_are_not_remembered():
+    flight = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("model unavailable")
+
+    async def run():
+        results = await asyncio.gather(*[flight.do("key", failing) for _ in range(3)], return_exceptions=True)
+        retried = await asyncio.gather(flight.do("key", failing), return_exceptions=True)
+        return results + retried
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(calls) == 2
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "quiz"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("key", work))
+        follower = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0.005)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == "quiz"
+
+
+def test_streams_are_shared_including_their_errors():
+    flight = SingleFlight()
+
+    async def items():
+        for item in range(3):
+            await asyncio.sleep(0.005)
+            yield item
+        raise ValueError("cut off")
+
+    async def consume():
+        received = []
+        with pytest.raises(ValueError):
+            async for item in flight.stream("key", items):
+                received.append(item)
+        return received
+
+    async def run():
+        return await asyncio.gather(consume(), consume())
+
+    assert asyncio.run(run()) == [[0, 1, 2], [0, 1, 2]]
+    assert flight.followers == 1
+
+
+def test_generator_coalesces_identical_requests_but_not_cache_bypasses():
+    model = fake_model(CountingModel, ttft_ms=20.0)
+    generator = HistoryQuizGenerator(llm_model=model, single_flight=SingleFlight())
+
+    async def run(bypass_cache):
+        return await asyncio.gather(*[
+            generator.acreate_quiz("Reformation", ["Martin Luther"], bypass_cache=bypass_cache) for _ in range(4)
+        ])
+
+    shared = asyncio.run(run(False))
+    assert model.calls == 1
+    assert all(quiz == shared[0] for quiz in shared)
+    asyncio.run(run(True))
+    assert model.calls == 5
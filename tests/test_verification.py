@@ -0,0 +1,98 @@
+import asyncio
+import copy
+
+from benchmarks.fake_llm import FakeQuizChatModel
+from math_engine import LocalMathQuizEngine
+from quiz_generator import MathQuizGenerator
+from verification import MathQuizVerifier, extract_candidate, extract_system
+
+from conftest import fake_model
+
+
+FARM = {
+    "question": "A farm has 30 animals and 74 legs in total. How many chickens (x) and cows (y) are there? "
+    "x + y = 30 and 2x + 4y = 74.",
+    "options": [
+        {"content": "x = 23, y = 7", "reason": "Both equations hold.", "isCorrect": True},
+        {"content": "x = 20, y = 10", "reason": "That makes 80 legs.", "isCorrect": False},
+        {"content": "x = 25, y = 5", "reason": "That makes 70 legs.", "isCorrect": False},
+        {"content": "x = 15, y = 15", "reason": "That makes 90 legs.", "isCorrect": False},
+    ],
+}
+
+
+def test_extracts_the_stated_system_and_option_values():
+    system = extract_system(FARM)
+    assert system.tolist() == [[1, 1, 30], [2, 4, 74]]
+    assert extract_candidate(FARM["options"][0]) == (23, 7)
+
+
+def test_local_quizzes_pass():
+    quizzes = LocalMathQuizEngine(seed=3).create_quizzes(30)["quizzes"]
+    verifier = MathQuizVerifier()
+    assert verifier.failing(quizzes) == []
+    assert verifier.stats()["passed"] == 30
+
+
+def test_fake_model_math_quizzes_pass():
+    model = fake_model()
+    quizzes = [model._quiz("math word problems", math=True) for _ in range(10)]
+    assert MathQuizVerifier().failing(quizzes) == []
+
+
+def test_mislabeled_answer_is_repaired_in_place():
+    quiz = copy.deepcopy(FARM)
+    quiz["options"][0]["isCorrect"], quiz["options"][1]["isCorrect"] = False, True
+    verifier = MathQuizVerifier()
+    assert verifier.failing([quiz]) == []
+    assert [option["isCorrect"] for option in quiz["options"]] == [True, False, False, False]
+    assert verifier.repaired == 1
+
+
+def test_quiz_without_a_valid_answer_fails():
+    quiz = copy.deepcopy(FARM)
+    quiz["options"][0]["content"] = "x = 22, y = 8"
+    verifier = MathQuizVerifier()
+    assert verifier.failing([copy.deepcopy(FARM), quiz]) == [1]
+    assert verifier.failed == 1
+
+
+def test_quiz_with_several_marked_answers_fails_when_unverifiable():
+    quiz = {
+        "question": "Which treaty ended the war?",
+        "options": [{"content": f"Option {i}", "reason": "r", "isCorrect": True} for i in range(4)],
+    }
+    assert MathQuizVerifier().failing([quiz]) == [0]
+
+
+def test_unreadable_quiz_is_served_on_the_structural_check():
+    quiz = copy.deepcopy(FARM)
+    quiz["question"] = "A farm has chickens and cows. How many of each are there?"
+    for option, words in zip(quiz["options"], ("23 and 7", "20 and 10", "25 and 5", "15 and 15")):
+        option["content"] = words
+    verifier = MathQuizVerifier()
+    assert verifier.failing([quiz]) == []
+    assert verifier.unverifiable == 1
+    assert verifier.failed == 0
+
+
+class WrongAnswers(FakeQuizChatModel):
+    """
+    Answers math prompts with quizzes whose correct option has been replaced by a wrong value.
+    """
+
+    def _quiz(self, prompt: str, math: bool) -> dict:
+        quiz = super()._quiz(prompt, math)
+        for option in quiz["options"]:
+            if option["isCorrect"]:
+                option["content"] = "x = 9999, y = 9999"
+        return quiz
+
+
+def test_generator_replaces_quizzes_that_keep_failing():
+    generator = MathQuizGenerator(llm_model=fake_model(WrongAnswers))
+    quizzes = asyncio.run(generator.acreate_quizzes(3, bypass_cache=True)).quizzes
+    assert len(quizzes) == 3
+    assert generator.verifier.failing([quiz.model_dump() for quiz in quizzes]) == []
+    assert generator.verifier.regenerated >= 3
+    assert generator.verifier.replaced_locally == 3
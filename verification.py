@@ -0,0 +1,251 @@
+from collections import Counter
+from fractions import Fraction
+from typing import List, Optional, Tuple
+import re
+import time
+
+import numpy as np
+
+# A linear equation in x and y, e.g. "3x + 2y = 18", "x + 4*y = 22" or "y = 3"
+EQUATION = re.compile(r"((?:[+-]?\s*(?:\d+(?:\.\d+)?)?\s*\*?\s*[xy]\b\s*)+)=\s*(\d+(?:\.\d+)?)")
+TERM = re.compile(r"([+-]?)\s*(\d+(?:\.\d+)?)?\s*\*?\s*([xy])")
+NUMBER = r"(-?\d+(?:\.\d+)?(?:/\d+)?)"
+VALUE = {name: re.compile(rf"\b{name}\s*=\s*{NUMBER}") for name in ("x", "y")}
+PAIR = re.compile(rf"\(\s*x\s*,\s*y\s*\)\s*=\s*\(\s*{NUMBER}\s*,\s*{NUMBER}\s*\)")
+# The quantity a variable stands for in a word problem, e.g. "one adult ticket (x)"
+VARIABLE = re.compile(r"\b(?:one|a|an|each|per)\s+([a-z][a-z -]*?)\s*\(\s*([xy])\s*\)", re.IGNORECASE)
+SENTENCE_END = re.compile(r"(?<=[.?!])\s+")
+AMOUNT = re.compile(r"\d+(?:\.\d+)?")
+
+Equation = Tuple[float, float, float]
+
+
+def parse_equations(text: str) -> List[Equation]:
+    """
+    Extract the linear equations a*x + b*y = c stated in a piece of text.
+
+    Args:
+        text (str): Question or explanation text.
+
+    Returns:
+        List[Equation]: The (a, b, c) coefficients of each equation, in order of appearance.
+    """
+    equations = []
+    for lhs, rhs in EQUATION.findall(text):
+        coefficients = {"x": 0.0, "y": 0.0}
+        for sign, number, name in TERM.findall(lhs):
+            value = float(number) if number else 1.0
+            coefficients[name] += -value if sign == "-" else value
+        if coefficients["x"] or coefficients["y"]:
+            equations.append((coefficients["x"], coefficients["y"], float(rhs)))
+    return equations
+
+
+def parse_statements(text: str) -> List[Equation]:
+    """
+    Rebuild the linear equations a word problem states in prose.
+
+    The question has to name what x and y stand for, e.g. "one adult ticket (x)". A sentence
+    that counts those items and states one total, e.g. "4 adult tickets and 1 child ticket cost
+    $68 in total.", becomes the equation 4x + 1y = 68.
+
+    Args:
+        text (str): Question text.
+
+    Returns:
+        List[Equation]: The (a, b, c) coefficients of each statement, in order of appearance.
+    """
+    names = {variable.lower(): name.strip().lower() for name, variable in VARIABLE.findall(text)}
+    if set(names) != {"x", "y"}:
+        return []
+    # Match plurals by the stem (ticket/tickets, party/parties); longer names first so neither claims the other's count
+    counts = [
+        (variable, re.compile(rf"\b(\d+(?:\.\d+)?)\s+{re.escape(name[:-1] if len(name) > 3 else name)}", re.IGNORECASE))
+        for variable, name in sorted(names.items(), key=lambda item: -len(item[1]))
+    ]
+    equations = []
+    for sentence in SENTENCE_END.split(text):
+        coefficients = {"x": 0.0, "y": 0.0}
+        claimed = []
+        for variable, pattern in counts:
+            for match in pattern.finditer(sentence):
+                if not any(start <= match.start() < end for start, end in claimed):
+                    coefficients[variable] += float(match.group(1))
+                    claimed.append(match.span())
+        totals = [
+            match for match in AMOUNT.finditer(sentence)
+            if not any(start <= match.start() < end for start, end in claimed)
+        ]
+        if claimed and len(totals) == 1 and totals[0].start() > max(end for _, end in claimed):
+            equations.append((coefficients["x"], coefficients["y"], float(totals[0].group())))
+    return equations
+
+
+def extract_system(quiz: dict) -> Optional[np.ndarray]:
+    """
+    Find the 2x2 system a quiz is about.
+
+    Equations stated in the question are used first, then the ones its prose states (see
+    parse_statements). Otherwise the remaining equations are taken from the option reasons, preferring
+    the ones restated most often; equations that only appear in one (possibly wrong) working are
+    the least trusted.
+
+    Args:
+        quiz (dict): A quiz in the schema.Quiz shape.
+
+    Returns:
+        Optional[np.ndarray]: A 2x3 array [[a1, b1, c1], [a2, b2, c2]], or None if no independent pair was found.
+    """
+    candidates = parse_equations(quiz.get("question", "")) + parse_statements(quiz.get("question", ""))
+    restated = Counter(
+        equation
+        for option in quiz.get("options", [])
+        for equation in set(parse_equations(option.get("reason", "")))
+        if equation[0] and equation[1]
+    )
+    candidates += [equation for equation, _ in restated.most_common()]
+
+    for i, first in enumerate(candidates):
+        for second in candidates[i + 1:]:
+            if abs(first[0] * second[1] - first[1] * second[0]) > 1e-9:
+                return np.array([first, second], dtype=float)
+    return None
+
+
+def extract_candidate(option: dict) -> Tuple[float, float]:
+    """
+    Read the x and y values an option proposes.
+
+    Args:
+        option (dict): An option in the schema.Option shape.
+
+    Returns:
+        Tuple[float, float]: The proposed (x, y); NaN for a value the option does not state.
+    """
+    content = option.get("content", "")
+    pair = PAIR.search(content)
+    if pair:
+        return float(Fraction(pair.group(1))), float(Fraction(pair.group(2)))
+    values = []
+    for name in ("x", "y"):
+        match = VALUE[name].search(content)
+        values.append(float(Fraction(match.group(1))) if match else np.nan)
+    return values[0], values[1]
+
+
+class MathQuizVerifier:
+    """
+    Checks math quizzes against the system of equations they state.
+
+    All quizzes of a batch are checked in one NumPy pass: the 2x2 systems are solved together,
+    every option's values are substituted back into both equations, and the options that actually
+    satisfy the system are compared with the ones marked isCorrect.
+    """
+
+    def __init__(self, tolerance: float = 1e-6):
+        """
+        Initializes the verifier.
+
+        Args:
+            tolerance (float): Maximum residual for a candidate to count as a solution.
+        """
+        self.tolerance = tolerance
+        self.checked = 0
+        self.passed = 0
+        self.repaired = 0
+        self.unverifiable = 0
+        self.failed = 0
+        self.regenerated = 0
+        self.replaced_locally = 0
+        self.seconds = 0.0
+
+    def failing(self, quizzes: List[dict]) -> List[int]:
+        """
+        Verify a batch of quizzes, repairing the isCorrect flags where the right answer is among the options.
+
+        A quiz passes when exactly one option solves its system and that option is the only one
+        marked correct. If exactly one option solves it but the flags disagree, the flags are fixed
+        in place. A quiz whose system or options cannot be read is not proven wrong: it is served
+        if it has four options with exactly one marked correct and counted as unverifiable.
+        Only the quizzes that fail are regenerated.
+
+        Args:
+            quizzes (List[dict]): Quizzes in the schema.Quiz shape; repaired in place.
+
+        Returns:
+            List[int]: Indexes of the quizzes that failed and must be replaced.
+        """
+        if not quizzes:
+            return []
+        start = time.perf_counter()
+        count = len(quizzes)
+        width = max(4, max(len(quiz.get("options", [])) for quiz in quizzes))
+
+        systems = np.zeros((count, 2, 3))
+        has_system = np.zeros(count, dtype=bool)
+        candidates = np.full((count, width, 2), np.nan)
+        marked = np.zeros((count, width), dtype=bool)
+        present = np.zeros((count, width), dtype=bool)
+        for i, quiz in enumerate(quizzes):
+            system = extract_system(quiz)
+            if system is not None:
+                systems[i], has_system[i] = system, True
+            for j, option in enumerate(quiz.get("options", [])):
+                candidates[i, j] = extract_candidate(option)
+                marked[i, j] = bool(option.get("isCorrect"))
+                present[i, j] = True
+
+        coefficients, constants = systems[:, :, :2], systems[:, :, 2]
+        solvable = has_system & (np.abs(np.linalg.det(coefficients)) > 1e-9)
+        solutions = np.full((count, 2), np.nan)
+        if solvable.any():
+            solutions[solvable] = np.linalg.solve(coefficients[solvable], constants[solvable][..., None])[..., 0]
+
+        # Substitute every option into its quiz's system; a value the option leaves out is taken from the solution
+        filled = np.where(np.isnan(candidates), solutions[:, None, :], candidates)
+        residuals = np.einsum("nij,nkj->nki", coefficients, filled) - constants[:, None, :]
+        has_value = ~np.all(np.isnan(candidates), axis=2)
+        solves = solvable[:, None] & has_value & np.all(np.abs(residuals) <= self.tolerance, axis=2)
+
+        four_options = present.sum(axis=1) == 4
+        verifiable = solvable & np.all(has_value == present, axis=1)
+        single_answer = solves.sum(axis=1) == 1
+        flags_match = np.all(marked == solves, axis=1)
+
+        passed = four_options & verifiable & single_answer & flags_match
+        repaired = four_options & verifiable & single_answer & ~flags_match
+        unverifiable = four_options & ~verifiable & (marked.sum(axis=1) == 1)
+        failed = ~(passed | repaired | unverifiable)
+
+        for i in np.flatnonzero(repaired):
+            for j, option in enumerate(quizzes[i]["options"]):
+                option["isCorrect"] = bool(solves[i, j])
+
+        self.checked += count
+        self.passed += int(passed.sum())
+        self.repaired += int(repaired.sum())
+        self.unverifiable += int(unverifiable.sum())
+        self.failed += int(failed.sum())
+        self.seconds += time.perf_counter() - start
+        return [int(i) for i in np.flatnonzero(failed)]
+
+    def stats(self) -> dict:
+        """
+        Report the verification counters.
+
+        Returns:
+            dict: Quiz counts per outcome, the failure rate, the share of quizzes that could not be
+            verified and were served on the structural check alone, and the time spent verifying.
+        """
+        return {
+            "checked": self.checked,
+            "passed": self.passed,
+            "repaired": self.repaired,
+            "unverifiable": self.unverifiable,
+            "failed": self.failed,
+            "failure_rate": self.failed / self.checked if self.checked else 0.0,
+            "unverifiable_rate": self.unverifiable / self.checked if self.checked else 0.0,
+            "regenerated": self.regenerated,
+            "replaced_locally": self.replaced_locally,
+            "verification_seconds": self.seconds,
+        }